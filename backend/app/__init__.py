@@ -1,11 +1,16 @@
 import os
 from flask import Flask, send_from_directory
 from flask_cors import CORS
+from app.config import Settings
 
 def create_app():
     app = Flask(__name__, instance_relative_config=True)
     CORS(app, supports_credentials=True)
 
+    from app.db import open_pool, register_request_scope
+    open_pool()
+    register_request_scope(app)
+
     from app.routes.auth_routes import bp as auth_bp
     from app.routes.users_routes import bp as users_bp
     from app.routes.reports_routes import bp as reports_bp
@@ -19,6 +24,7 @@ def create_app():
     from app.routes.profile_routes import bp as profile_bp
     from app.routes.debug_mail_routes import bp as debug_mail_bp
     from app.routes.admin_jobs_routes import bp as jobs_bp  # <<--- NUEVO
+    from app.routes.admin_metrics_routes import bp as metrics_bp
 
     app.register_blueprint(spec_bp)
     app.register_blueprint(media_bp)
@@ -33,6 +39,20 @@ def create_app():
     app.register_blueprint(profile_bp)
     app.register_blueprint(debug_mail_bp)
     app.register_blueprint(jobs_bp)  # <<--- NUEVO
+    app.register_blueprint(metrics_bp)
+
+    from app.cli import register_cli
+    register_cli(app)
+
+    # Entrega de correos fuera de las transacciones (outbox)
+    if Settings.MAIL_WORKER_ENABLED:
+        from app.jobs.mail_worker import start_mail_worker
+        start_mail_worker()
+
+    # Meses futuros de movimientos / audit_log (sql/007, sin partición DEFAULT)
+    if Settings.PARTITIONS_ENSURE_ENABLED:
+        from app.jobs.partitions_job import start_partitions_worker
+        start_partitions_worker()
 
     @app.get("/health")
     def health(): 
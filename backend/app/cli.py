@@ -0,0 +1,83 @@
+# app/cli.py
+import click
+from flask import Flask
+
+
+def register_cli(app: Flask) -> None:
+    """Comandos `flask <cmd>` de mantenimiento (FLASK_APP=wsgi:app)."""
+
+    @app.cli.command("mail-worker")
+    @click.option("--once", is_flag=True, help="Procesa un lote y termina.")
+    def mail_worker_cmd(once: bool):
+        """Entrega el outbox de correos (proceso dedicado)."""
+        from app.jobs.mail_worker import MailWorker, start_mail_worker
+        if once:
+            click.echo(f"enviados: {MailWorker().run_once()}")
+            return
+        # reutiliza el hilo del proceso si create_app ya lo arrancó
+        w = start_mail_worker()
+        click.echo(f"mail-worker: cada {w.interval}s, lotes de {w.batch}")
+        try:
+            while w.is_alive():
+                w.join(timeout=1)
+        except KeyboardInterrupt:
+            w.stop()
+
+    @app.cli.command("prestamos-rebuild")
+    def prestamos_rebuild_cmd():
+        """Reconstruye inv.prestamos_activos desde inv.movimientos."""
+        from app.jobs.prestamos_job import rebuild_prestamos_activos
+        click.echo(f"préstamos activos: {rebuild_prestamos_activos('cli')}")
+
+    @app.cli.command("reparaciones-rebuild")
+    def reparaciones_rebuild_cmd():
+        """Reconstruye inv.equipo_reparaciones desde inv.movimientos."""
+        from app.jobs.reparaciones_job import rebuild_equipo_reparaciones
+        click.echo(f"ciclos de reparación: {rebuild_equipo_reparaciones('cli')}")
+
+    @app.cli.command("items-json-rebuild")
+    def items_json_rebuild_cmd():
+        """Recalcula ficha_json/fotos_json de inv.items desde specs y fotos."""
+        from app.jobs.items_job import rebuild_items_json
+        click.echo(f"ítems actualizados: {rebuild_items_json('cli')}")
+
+    @app.cli.command("items-import")
+    @click.argument("path", type=click.Path(exists=True, dir_okay=False))
+    @click.option("--format", "fmt", type=click.Choice(["csv", "ndjson"]), default=None,
+                  help="Formato del archivo (def. según la extensión).")
+    @click.option("--dry-run", is_flag=True, help="Valida y reporta sin guardar.")
+    @click.option("--strict", is_flag=True, help="No guarda nada si alguna fila tiene error.")
+    @click.option("--report", "report_path", default=None, help="Escribe el reporte completo (JSON) en este archivo.")
+    @click.option("--user", default="cli", help="Usuario para auditoría.")
+    def items_import_cmd(path, fmt, dry_run, strict, report_path, user):
+        """Importa ítems con specs desde un CSV o JSON lines."""
+        import json
+        from app.models.item_import import import_items
+        fmt = fmt or ("ndjson" if path.lower().endswith((".ndjson", ".jsonl")) else "csv")
+        with open(path, encoding="utf-8-sig", newline="") as fh:
+            report, err = import_items(user, fh, fmt, dry_run=dry_run, strict=strict)
+        if err:
+            raise click.ClickException(err)
+        if report_path:
+            with open(report_path, "w", encoding="utf-8") as out:
+                json.dump(report, out, ensure_ascii=False, indent=2)
+        for e in report["errors"][:20]:
+            click.echo(f"fila {e['fila']} ({e['codigo'] or '-'}): {e['error']}")
+        if len(report["errors"]) > 20:
+            click.echo(f"... y {len(report['errors']) - 20} errores más")
+        estado = " (revertido)" if report["rolled_back"] else ""
+        click.echo(f"filas: {report['total']}, válidas: {report['valid']}, "
+                   f"insertadas: {report['inserted']}{estado}, errores: {len(report['errors'])}")
+
+    @app.cli.command("partitions-maintain")
+    @click.option("--ahead", type=int, default=None, help="Meses futuros a crear (def. PARTITIONS_AHEAD_MONTHS).")
+    @click.option("--retain", type=int, default=None, help="Meses completos a conservar; 0 = no archivar (def. PARTITIONS_RETAIN_MONTHS).")
+    @click.option("--archive-dir", default=None, help="Carpeta de los .csv.gz (def. PARTITIONS_ARCHIVE_DIR).")
+    def partitions_maintain_cmd(ahead, retain, archive_dir):
+        """Crea particiones mensuales futuras y archiva/borra las que pasaron la retención."""
+        from app.jobs.partitions_job import maintain_partitions
+        res = maintain_partitions("cli", ahead, retain, archive_dir)
+        for table, n in res["created"].items():
+            click.echo(f"{table}: {n} particiones nuevas")
+        for a in res["archived"]:
+            click.echo(f"archivada {a['partition']} ({a['rows']} filas) -> {a['file']}")
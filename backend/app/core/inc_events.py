@@ -0,0 +1,138 @@
+# backend/app/core/inc_events.py
+import json
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+import psycopg
+
+from app.config import Settings
+
+CHANNEL = "inv_incidencias"
+
+
+class IncidenciaHub:
+    """
+    Hub de eventos de inv.incidencia_mensajes para el proceso.
+
+    - UNA conexión dedicada (fuera del pool) hace LISTEN en 'inv_incidencias'
+      (ver backend/sql/002_incidencia_mensajes_notify.sql).
+    - Los eventos se guardan en un buffer circular en memoria y despiertan a
+      los clientes en long-poll, que deciden visibilidad con su propio filtro
+      (mismas reglas que list_updates) sin tocar la BD.
+    - El buffer es completo solo para msg_id > floor: al (re)conectar, al
+      descartar eventos viejos o si el resync detecta notificaciones perdidas,
+      los clientes atrasados caen a una consulta normal.
+    - Mientras hay clientes esperando, cada `resync_interval` s se compara con
+      MAX(msg_id) por la misma conexión (cubre NOTIFY perdidos o trigger ausente).
+    """
+
+    def __init__(self, dsn: str = Settings.DATABASE_URL,
+                 resync_interval: float = Settings.INC_EVENTS_RESYNC_INTERVAL,
+                 buffer_size: int = 2000):
+        self.dsn = dsn
+        self.resync_interval = max(1.0, float(resync_interval))
+        self._cond = threading.Condition()
+        self._events: Deque[Dict[str, Any]] = deque(maxlen=max(10, int(buffer_size)))
+        self._last_id: Optional[int] = None
+        self._floor_id: Optional[int] = None
+        self._waiters = 0
+        self._thread: Optional[threading.Thread] = None
+
+    # ---------- publicación (hilo listener) ----------
+    def _publish(self, ev: Dict[str, Any]) -> None:
+        msg_id = int(ev["msg_id"])
+        with self._cond:
+            if len(self._events) == self._events.maxlen:
+                evicted = int(self._events[0]["msg_id"])
+                self._floor_id = max(self._floor_id or 0, evicted)
+            self._events.append(ev)
+            if self._last_id is None or msg_id > self._last_id:
+                self._last_id = msg_id
+            self._cond.notify_all()
+
+    def _resync(self, max_id: int, reset: bool = False) -> None:
+        """Si la BD va por delante de lo recibido, el tramo faltante no está en el buffer."""
+        with self._cond:
+            if reset:
+                self._events.clear()
+                self._floor_id = max_id
+                self._last_id = max_id
+                self._cond.notify_all()
+            elif self._last_id is None or max_id > self._last_id:
+                self._floor_id = max_id
+                self._last_id = max_id
+                self._cond.notify_all()
+
+    # ---------- espera (hilos de request) ----------
+    def wait_for(self, since_id: int, timeout: float,
+                 visible: Callable[[Dict[str, Any]], bool]) -> Tuple[bool, int]:
+        """
+        Espera eventos visibles con msg_id > since_id.
+        Devuelve (consultar, last_id):
+          - (True, last_id): hay algo para este usuario (o el buffer no alcanza);
+            el caller consulta list_updates(since_id, seen_upto=last_id).
+          - (False, last_id): nada visible hasta last_id; responder vacío.
+        """
+        deadline = time.monotonic() + max(0.0, timeout)
+        with self._cond:
+            self._ensure_thread()
+            self._waiters += 1
+            try:
+                while True:
+                    last = self._last_id
+                    if last is not None and last > since_id:
+                        if self._floor_id is not None and since_id < self._floor_id:
+                            return True, last
+                        for ev in self._events:
+                            if int(ev["msg_id"]) > since_id and visible(ev):
+                                return True, last
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        authoritative = (last is not None and self._floor_id is not None
+                                         and since_id >= self._floor_id)
+                        return False, (max(since_id, last) if authoritative else since_id)
+                    self._cond.wait(remaining)
+            finally:
+                self._waiters -= 1
+
+    # ---------- listener ----------
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="inc-listener", daemon=True)
+            self._thread.start()
+
+    @staticmethod
+    def _max_id(conn) -> int:
+        r = conn.execute("SELECT COALESCE(MAX(msg_id),0) FROM inv.incidencia_mensajes").fetchone()
+        return int(r[0] or 0)
+
+    def _run(self) -> None:
+        backoff = 1.0
+        while True:
+            try:
+                with psycopg.Connection.connect(self.dsn, autocommit=True) as conn:
+                    conn.execute(f"LISTEN {CHANNEL}")
+                    self._resync(self._max_id(conn), reset=True)
+                    backoff = 1.0
+                    while True:
+                        for n in conn.notifies(timeout=self.resync_interval):
+                            try:
+                                ev = json.loads(n.payload)
+                                int(ev["msg_id"])
+                            except Exception:
+                                continue
+                            self._publish(ev)
+                        if self._waiters:
+                            self._resync(self._max_id(conn))
+            except Exception as e:
+                print(f"[inc-events] listener desconectado: {e}")
+                with self._cond:
+                    self._floor_id = None  # sin garantías hasta reconectar
+                time.sleep(backoff)
+                backoff = min(30.0, backoff * 2)
+
+
+# Instancia del proceso (la conexión LISTEN se abre con el primer cliente)
+hub = IncidenciaHub()
@@ -1,16 +1,103 @@
 # backend/app/db.py
+import threading
+import time
+from collections import deque
 from contextlib import contextmanager
-from typing import Optional, Tuple
-from psycopg_pool import ConnectionPool
+from typing import Any, Callable, Dict, Optional, Tuple
+from flask import g, has_request_context
+from psycopg import sql
+from psycopg_pool import ConnectionPool, PoolTimeout
 from .config import Settings
 
-# Pool (psycopg3)
+# Pool (psycopg3). Se abre en create_app (open_pool) o, para scripts/CLI que
+# no pasan por la app, con el primer get_conn.
+# El tamaño es POR PROCESO: con gunicorn, workers * DB_POOL_MAX conexiones.
 pool = ConnectionPool(
     conninfo=Settings.DATABASE_URL,
-    min_size=1,
-    max_size=10,
-    open=True,
+    min_size=Settings.DB_POOL_MIN,
+    max_size=Settings.DB_POOL_MAX,
+    timeout=Settings.DB_POOL_TIMEOUT,
+    max_waiting=Settings.DB_POOL_MAX_WAITING,
+    max_idle=Settings.DB_POOL_MAX_IDLE,
+    max_lifetime=Settings.DB_POOL_MAX_LIFETIME,
+    name="inv",
+    open=False,
 )
+_open_lock = threading.Lock()
+
+
+def open_pool() -> None:
+    """Abre el pool una sola vez (idempotente, thread-safe)."""
+    if not pool.closed:
+        return
+    with _open_lock:
+        if pool.closed:
+            pool.open()
+
+
+# ---------- métricas de espera por conexión ----------
+# Muestras de los últimos N get_conn (ms hasta obtener conexión) + timeouts.
+_wait_ms: deque = deque(maxlen=2048)
+_timeouts = 0
+_metrics_lock = threading.Lock()
+
+
+def _record_wait(ms: float) -> None:
+    with _metrics_lock:
+        _wait_ms.append(ms)
+
+
+def _percentile(sorted_vals, q: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    k = min(len(sorted_vals) - 1, max(0, int(round(q * (len(sorted_vals) - 1)))))
+    return round(sorted_vals[k], 2)
+
+
+def pool_metrics() -> Dict[str, Any]:
+    """
+    Estado del pool para dimensionarlo: stats de psycopg_pool + percentiles
+    de espera medidos en get_conn (ventana de las últimas muestras).
+    """
+    stats = pool.get_stats() if not pool.closed else {}
+    with _metrics_lock:
+        samples = sorted(_wait_ms)
+        timeouts = _timeouts
+    size = int(stats.get("pool_size", 0))
+    available = int(stats.get("pool_available", 0))
+    return {
+        "name": pool.name,
+        "open": not pool.closed,
+        "config": {
+            "min_size": pool.min_size,
+            "max_size": pool.max_size,
+            "timeout": pool.timeout,
+            "max_waiting": pool.max_waiting,
+            "max_idle": pool.max_idle,
+            "max_lifetime": pool.max_lifetime,
+        },
+        "connections": {
+            "size": size,
+            "available": available,
+            "in_use": max(0, size - available),
+        },
+        "requests": {
+            "waiting": int(stats.get("requests_waiting", 0)),
+            "total": int(stats.get("requests_num", 0)),
+            "queued": int(stats.get("requests_queued", 0)),
+            "errors": int(stats.get("requests_errors", 0)),
+            "timeouts": timeouts,
+        },
+        "wait_ms": {
+            "samples": len(samples),
+            "p50": _percentile(samples, 0.50),
+            "p95": _percentile(samples, 0.95),
+            "p99": _percentile(samples, 0.99),
+            "max": round(samples[-1], 2) if samples else 0.0,
+        },
+        "raw": stats,
+    }
+
 
 def _set_app_user_local(cur, username: Optional[str]):
     """
@@ -24,21 +111,227 @@ def _set_app_user_local(cur, username: Optional[str]):
         # cur.execute("SELECT set_config('app.user', '', true);")
         pass
 
+
+def _set_context_local(cur, username: Optional[str], proc: Optional[str]) -> None:
+    """app.user y app.proc (auditoría) en UNA sola sentencia."""
+    if username and proc:
+        cur.execute("SELECT set_config('app.user', %s, true), set_config('app.proc', %s, true)",
+                    (username, proc))
+    elif proc:
+        cur.execute("SELECT set_config('app.proc', %s, true)", (proc,))
+    else:
+        _set_app_user_local(cur, username)
+
+# ---------- unidad de trabajo compartida ----------
+# Dentro de un request HTTP, todos los get_conn usan UNA conexión y UNA
+# transacción (se confirma en after_request). Fuera de un request, un get_conn
+# anidado se une al del nivel superior. En ambos casos cada bloque interno es
+# un SAVEPOINT: su rollback() deshace solo lo del bloque, como antes.
+_local = threading.local()
+
+
+class _Scope:
+    def __init__(self, conn, context: Tuple[Optional[str], Optional[str]] = (None, None)):
+        self.conn = conn
+        self.seq = 0
+        self.on_commit = []  # callbacks tras el COMMIT real (p.ej. invalidar cachés)
+        self.pending = set()  # marcas de escrituras aún sin confirmar (p.ej. "areas")
+        # (app.user, app.proc) vigentes en la transacción; None = sin setear
+        self.context = context
+
+    def run_on_commit(self) -> None:
+        callbacks, self.on_commit = self.on_commit, []
+        for fn in callbacks:
+            try:
+                fn()
+            except Exception as e:
+                print(f"[db] on_commit falló: {e}")
+
+
+class _SavepointConn:
+    """
+    La conexión compartida vista desde un bloque anidado: commit() confirma
+    el bloque (RELEASE + nuevo SAVEPOINT) y rollback() vuelve al SAVEPOINT.
+    El COMMIT real lo hace quien abrió la unidad de trabajo.
+    """
+
+    def __init__(self, conn, cur, name: str):
+        self._conn = conn
+        self._cur = cur
+        self._name = name
+
+    def commit(self) -> None:
+        self._cur.execute(f"RELEASE SAVEPOINT {self._name}")
+        self._cur.execute(f"SAVEPOINT {self._name}")
+
+    def rollback(self) -> None:
+        self._cur.execute(f"ROLLBACK TO SAVEPOINT {self._name}")
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def _current_scope() -> Optional[_Scope]:
+    if Settings.DB_REQUEST_SCOPE and has_request_context():
+        scope = g.get("_db_scope")
+        if scope is not None:
+            return scope
+    return getattr(_local, "scope", None)
+
+
+def _checkout():
+    global _timeouts
+    open_pool()
+    t0 = time.perf_counter()
+    try:
+        conn = pool.getconn()
+    except PoolTimeout:
+        with _metrics_lock:
+            _timeouts += 1
+        raise
+    _record_wait((time.perf_counter() - t0) * 1000.0)
+    return conn
+
+
+def after_commit(fn: Callable[[], None]) -> None:
+    """Ejecuta `fn` cuando la transacción en curso se confirme (o ya, si no hay)."""
+    scope = _current_scope()
+    if scope is None:
+        fn()
+    else:
+        scope.on_commit.append(fn)
+
+
+def mark_pending(tag: str) -> None:
+    """Marca que la transacción en curso escribió `tag` (sin confirmar aún)."""
+    scope = _current_scope()
+    if scope is not None:
+        scope.pending.add(tag)
+
+
+def has_pending(tag: str) -> bool:
+    """True si la transacción en curso escribió `tag` y todavía no confirmó."""
+    scope = _current_scope()
+    return scope is not None and tag in scope.pending
+
+
+def release_request_conn(commit: bool = True) -> None:
+    """
+    Cierra la unidad de trabajo del request y devuelve la conexión al pool.
+    Lo llama after/teardown_request; también conviene antes de una espera
+    larga (long-poll) para no retener un slot del pool.
+    """
+    if not has_request_context():
+        return
+    scope = g.pop("_db_scope", None)
+    if scope is None:
+        return
+    try:
+        if commit:
+            scope.conn.commit()
+        else:
+            scope.conn.rollback()
+    finally:
+        pool.putconn(scope.conn)
+    if commit:
+        scope.run_on_commit()
+
+
+def register_request_scope(app) -> None:
+    """Confirma la transacción del request antes de enviar la respuesta."""
+
+    @app.after_request
+    def _db_commit(response):
+        release_request_conn(commit=True)
+        return response
+
+    @app.teardown_request
+    def _db_release(exc):
+        # Solo queda algo si el request terminó en excepción: se revierte
+        release_request_conn(commit=False)
+
+
+def _set_context_sql(context: Tuple[Optional[str], Optional[str]]) -> sql.Composed:
+    # NULL = SET LOCAL ... TO DEFAULT: vuelve al valor de la sesión (sin setear)
+    return sql.SQL("SELECT set_config('app.user', {}, true), set_config('app.proc', {}, true)").format(
+        sql.Literal(context[0]), sql.Literal(context[1]))
+
+
+@contextmanager
+def _savepoint(scope: _Scope, app_user: Optional[str], proc: Optional[str]):
+    scope.seq += 1
+    name = sql.Identifier(f"uow_{scope.seq}")
+    prev = scope.context
+    context = (app_user or prev[0], proc or None)
+    # app.user/app.proc son LOCAL a la transacción y RELEASE no los revierte:
+    # el contexto del bloque exterior se conoce (scope.context) y se restaura al
+    # salir. Si el bloque no lo cambia (el caso común) no hay set_config; si lo
+    # cambia, viaja en la misma sentencia que el SAVEPOINT/RELEASE (protocolo
+    # simple, sin parámetros): un get_conn anidado cuesta 2 idas y vueltas.
+    # El set_config va ANTES del SAVEPOINT: rollback() del bloque no lo deshace.
+    changed = context != prev
+    restore = sql.SQL("; ") + _set_context_sql(prev) if changed else sql.SQL("")
+    cur = scope.conn.cursor()
+    try:
+        if changed:
+            cur.execute(sql.SQL("{}; SAVEPOINT {}").format(_set_context_sql(context), name))
+        else:
+            cur.execute(sql.SQL("SAVEPOINT {}").format(name))
+        scope.context = context
+        yield _SavepointConn(scope.conn, cur, name.as_string(scope.conn)), cur
+        cur.execute(sql.SQL("RELEASE SAVEPOINT {}{}").format(name, restore))
+    except Exception:
+        try:
+            cur.execute(sql.SQL("ROLLBACK TO SAVEPOINT {0}; RELEASE SAVEPOINT {0}{1}").format(name, restore))
+        except Exception:
+            pass  # conexión rota: el dueño de la unidad de trabajo la descarta
+        raise
+    finally:
+        scope.context = prev
+        cur.close()
+
+
 @contextmanager
-def get_conn(app_user: Optional[str] = None) -> Tuple:
+def get_conn(app_user: Optional[str] = None, isolated: bool = False,
+             proc: Optional[str] = None) -> Tuple:
     """
     Entrega (conn, cur) listo para usar. Maneja commit/rollback automáticamente.
-    Si se pasa app_user, se setea 'app.user' LOCAL en la transacción para auditoría.
+    Si se pasa app_user, se setea 'app.user' LOCAL en la transacción para auditoría;
+    `proc` setea 'app.proc' en la misma sentencia.
+
+    Dentro de un request (o de otro get_conn) se une a la transacción en curso
+    con un SAVEPOINT: un request usa como máximo una conexión del pool.
+    `isolated=True` fuerza conexión y transacción propias (p.ej. reservar el
+    outbox de correos, que debe confirmarse aunque el request falle).
     """
-    with pool.connection() as conn:
+    scope = None if isolated else _current_scope()
+    if scope is None and not isolated and Settings.DB_REQUEST_SCOPE and has_request_context():
+        scope = g._db_scope = _Scope(_checkout())
+
+    if scope is not None:
+        with _savepoint(scope, app_user, proc) as pair:
+            yield pair
+        return
+
+    conn = _checkout()
+    prev = getattr(_local, "scope", None)
+    own = _Scope(conn, (app_user or None, proc or None))
+    _local.scope = own
+    committed = False
+    try:
         cur = conn.cursor()
         try:
-            if app_user:
-                _set_app_user_local(cur, app_user)
+            _set_context_local(cur, app_user, proc)
             yield conn, cur
             conn.commit()
+            committed = True
         except Exception:
             conn.rollback()
             raise
         finally:
             cur.close()
+    finally:
+        _local.scope = prev
+        pool.putconn(conn)
+    if committed:
+        own.run_on_commit()
@@ -0,0 +1,12 @@
+from app.db import get_conn
+
+
+def rebuild_items_json(app_user: str = "system") -> int:
+    """
+    Recalcula inv.items.ficha_json/fotos_json de todos los ítems
+    (inv.fn_items_refresh_json, ver sql/010_items_ficha_json.sql).
+    Devuelve la cantidad de ítems actualizados.
+    """
+    with get_conn(app_user, proc='jobs.items_json_rebuild') as (conn, cur):
+        cur.execute("SELECT inv.fn_items_refresh_json(NULL)")
+        return int(cur.fetchone()[0] or 0)
@@ -0,0 +1,50 @@
+# app/jobs/mail_worker.py
+import threading
+from typing import Optional
+from app.config import Settings
+from app.jobs.notifs_job import send_pending_notifs
+
+_worker: Optional["MailWorker"] = None
+_worker_lock = threading.Lock()
+
+
+class MailWorker(threading.Thread):
+    """
+    Hilo que vacía el outbox de correos cada `interval` segundos.
+    Si un lote sale lleno, vuelve a intentar sin esperar.
+    Varios workers (uno por proceso) no se pisan: la reserva usa SKIP LOCKED.
+    """
+
+    def __init__(self, interval: float = Settings.MAIL_WORKER_INTERVAL,
+                 batch: int = Settings.MAIL_WORKER_BATCH):
+        super().__init__(name="mail-worker", daemon=True)
+        self.interval = max(0.5, float(interval))
+        self.batch = max(1, int(batch))
+        self._halt = threading.Event()
+
+    def run_once(self) -> int:
+        n, _ids = send_pending_notifs("mail-worker", limit=self.batch)
+        return n
+
+    def run(self):
+        while not self._halt.is_set():
+            n = 0
+            try:
+                n = self.run_once()
+            except Exception as e:
+                print(f"[mail-worker] error procesando outbox: {e}")
+            if n < self.batch:
+                self._halt.wait(self.interval)
+
+    def stop(self):
+        self._halt.set()
+
+
+def start_mail_worker() -> MailWorker:
+    """Arranca (una sola vez por proceso) el hilo de entrega del outbox."""
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = MailWorker()
+            _worker.start()
+        return _worker
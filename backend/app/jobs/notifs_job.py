@@ -1,38 +1,31 @@
 from typing import List, Tuple
-from app.db import get_conn
-from app.utils.mailer import send_mail_safe
+from app.config import Settings
+from app.models.notif_model import claim_pending, mark_sent, mark_failed
+from app.utils.mailer import send_batch
 
-def send_pending_notifs(app_user: str = "system") -> Tuple[int, List[int]]:
+def send_pending_notifs(app_user: str = "system", limit: int = Settings.MAIL_WORKER_BATCH) -> Tuple[int, List[int]]:
     """
     Envía correos pendientes en inv.notificaciones (sent_at IS NULL).
+    Reserva el lote en una transacción corta, lo envía por UNA sesión SMTP
+    (send_batch) sin conexión de BD tomada y marca el resultado en otra
+    transacción corta.
     Devuelve (enviadas, ids).
     """
-    sent_ids: List[int] = []
-    with get_conn(app_user) as (conn, cur):
-        cur.execute("""
-            SELECT n.notif_id, n.subject, n.body, u.usuario_email
-            FROM inv.notificaciones n
-            LEFT JOIN inv.usuarios u ON u.usuario_id = n.destinatario_usuario_id
-            WHERE n.sent_at IS NULL
-              AND COALESCE(u.usuario_email,'') <> ''
-            ORDER BY n.notif_id
-            LIMIT 100
-        """)
-        rows = cur.fetchall()
+    rows = claim_pending(app_user, limit=limit, max_intentos=Settings.MAIL_WORKER_MAX_INTENTOS)
 
-        for notif_id, subject, body, email in rows:
-            ok = False
-            try:
-                ok = send_mail_safe(subject=subject, body=body, to=email)
-            except Exception:
-                ok = False
-            if ok:
-                sent_ids.append(notif_id)
+    results = send_batch([{
+        "subject": n["subject"],
+        "body": n["body"],
+        "to": n["to"],
+        "reply_to": n["reply_to"],
+        "from_name_extra": n["from_name_extra"],
+        "extra_headers": n["extra_headers"],
+    } for n in rows]) if rows else []
 
-        if sent_ids:
-            cur.execute(
-                "UPDATE inv.notificaciones SET sent_at = now() WHERE notif_id = ANY(%s)",
-                (sent_ids,)
-            )
+    sent_ids = [n["notif_id"] for n, ok in zip(rows, results) if ok]
+    failed_ids = [n["notif_id"] for n, ok in zip(rows, results) if not ok]
+
+    mark_sent(app_user, sent_ids)
+    mark_failed(app_user, failed_ids, "envío SMTP fallido")
 
     return (len(sent_ids), sent_ids)
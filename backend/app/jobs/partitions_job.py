@@ -0,0 +1,133 @@
+import gzip
+import os
+import threading
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+from app.config import Settings
+from app.db import get_conn
+
+# Tablas particionadas por mes (ver sql/007_partition_mov_audit.sql)
+PARTITIONED = ("inv.movimientos", "inv.audit_log")
+
+
+def _add_months(d: date, months: int) -> date:
+    y, m = divmod(d.year * 12 + (d.month - 1) + months, 12)
+    return date(y, m + 1, 1)
+
+
+def ensure_future_partitions(app_user: str = "system",
+                             months_ahead: Optional[int] = None) -> Dict[str, int]:
+    """
+    Crea las particiones del mes actual y los `months_ahead` siguientes.
+    No hay partición DEFAULT: un INSERT fuera de rango falla, así que esto
+    tiene que correr antes de que se acaben los meses creados (lo hace
+    PartitionsWorker en cada proceso web, además del comando).
+    Devuelve {tabla: particiones creadas}.
+    """
+    ahead = Settings.PARTITIONS_AHEAD_MONTHS if months_ahead is None else months_ahead
+    first = date.today().replace(day=1)
+    out: Dict[str, int] = {}
+    with get_conn(app_user, proc='jobs.partitions_ensure') as (conn, cur):
+        # varios procesos arrancan a la vez: uno crea, los demás ya no encuentran huecos
+        cur.execute("SELECT pg_advisory_xact_lock(hashtext('inv.fn_ensure_month_partitions'))")
+        for table in PARTITIONED:
+            cur.execute("SELECT inv.fn_ensure_month_partitions(%s::regclass, %s, %s)",
+                        (table, first, _add_months(first, max(0, ahead) + 1)))
+            out[table] = int(cur.fetchone()[0] or 0)
+    return out
+
+
+class PartitionsWorker(threading.Thread):
+    """Hilo que asegura los meses futuros al arrancar y luego cada `interval` s."""
+
+    def __init__(self, interval: float = Settings.PARTITIONS_ENSURE_INTERVAL):
+        super().__init__(name="partitions-worker", daemon=True)
+        self.interval = max(60.0, float(interval))
+        self._halt = threading.Event()
+
+    def run(self):
+        while not self._halt.is_set():
+            try:
+                created = ensure_future_partitions("partitions-worker")
+                if any(created.values()):
+                    print(f"[partitions-worker] particiones creadas: {created}")
+            except Exception as e:
+                print(f"[partitions-worker] error creando particiones: {e}")
+            self._halt.wait(self.interval)
+
+    def stop(self):
+        self._halt.set()
+
+
+_worker: Optional[PartitionsWorker] = None
+_worker_lock = threading.Lock()
+
+
+def start_partitions_worker() -> PartitionsWorker:
+    """Arranca (una sola vez por proceso) el hilo de particiones futuras."""
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = PartitionsWorker()
+            _worker.start()
+        return _worker
+
+
+def archive_old_partitions(app_user: str = "system",
+                           retain_months: Optional[int] = None,
+                           archive_dir: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Exporta a <archive_dir>/<particion>.csv.gz (COPY, con encabezado) cada
+    partición que terminó antes de los últimos `retain_months` meses completos,
+    y recién entonces la separa (DETACH) y la borra. retain_months=0 → nada.
+    """
+    retain = Settings.PARTITIONS_RETAIN_MONTHS if retain_months is None else retain_months
+    if retain <= 0:
+        return []
+    folder = archive_dir or Settings.PARTITIONS_ARCHIVE_DIR
+    os.makedirs(folder, exist_ok=True)
+    cutoff = _add_months(date.today().replace(day=1), -retain)
+
+    archived: List[Dict[str, Any]] = []
+    for table in PARTITIONED:
+        with get_conn(app_user) as (conn, cur):
+            cur.execute("""
+              SELECT partition::text, desde, hasta
+                FROM inv.fn_month_partitions(%s::regclass)
+               WHERE hasta <= %s::date
+            """, (table, cutoff))
+            parts = cur.fetchall()
+
+        for part, desde, hasta in parts:
+            path = os.path.join(folder, f"{part}.csv.gz")
+            tmp = path + ".tmp"
+            rows = 0
+            with get_conn(app_user, proc='jobs.partitions_archive') as (conn, cur):
+                # 1) exportar completo a disco (tmp + rename: nunca queda un archivo a medias)
+                with gzip.open(tmp, "wb") as fh:
+                    with cur.copy(f"COPY (SELECT * FROM {part}) TO STDOUT WITH (FORMAT csv, HEADER)") as cp:
+                        for chunk in cp:
+                            fh.write(chunk)
+                os.replace(tmp, path)
+                cur.execute(f"SELECT count(*) FROM {part}")
+                rows = int(cur.fetchone()[0])
+                # 2) recién con el archivo escrito: separar y borrar (misma transacción)
+                cur.execute(f"ALTER TABLE {table} DETACH PARTITION {part}")
+                cur.execute(f"DROP TABLE {part}")
+            archived.append({
+                "partition": part, "desde": desde, "hasta": hasta,
+                "rows": rows, "file": path,
+            })
+    return archived
+
+
+def maintain_partitions(app_user: str = "system",
+                        months_ahead: Optional[int] = None,
+                        retain_months: Optional[int] = None,
+                        archive_dir: Optional[str] = None) -> Dict[str, Any]:
+    """Mantenimiento completo: particiones futuras + archivo de las viejas."""
+    return {
+        "created": ensure_future_partitions(app_user, months_ahead),
+        "archived": archive_old_partitions(app_user, retain_months, archive_dir),
+    }
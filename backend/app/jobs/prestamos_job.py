@@ -0,0 +1,12 @@
+from app.db import get_conn
+
+
+def rebuild_prestamos_activos(app_user: str = "system") -> int:
+    """
+    Reconstruye inv.prestamos_activos desde el historial de TRASLADOs
+    (inv.fn_prestamos_activos_rebuild, ver sql/003_prestamos_activos.sql).
+    Devuelve la cantidad de préstamos activos.
+    """
+    with get_conn(app_user, proc='jobs.prestamos_rebuild') as (conn, cur):
+        cur.execute("SELECT inv.fn_prestamos_activos_rebuild()")
+        return int(cur.fetchone()[0] or 0)
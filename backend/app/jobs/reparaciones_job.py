@@ -0,0 +1,12 @@
+from app.db import get_conn
+
+
+def rebuild_equipo_reparaciones(app_user: str = "system") -> int:
+    """
+    Reconstruye inv.equipo_reparaciones desde el historial de EQUIPO_ESTADO
+    (inv.fn_equipo_reparaciones_rebuild, ver sql/008_equipo_reparaciones.sql).
+    Devuelve la cantidad de ciclos (cerrados + en curso).
+    """
+    with get_conn(app_user, proc='jobs.reparaciones_rebuild') as (conn, cur):
+        cur.execute("SELECT inv.fn_equipo_reparaciones_rebuild()")
+        return int(cur.fetchone()[0] or 0)
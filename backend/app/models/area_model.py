@@ -1,33 +1,30 @@
 # app/models/area_model.py
-from typing import Optional, Any, Dict, List
+from typing import Optional, Any, Dict, FrozenSet, List
 from app.db import get_conn
+from app.models.area_tree import get_area_tree, invalidates_area_tree
+from app.models.item_model import ITEMS_BASE_SQL, load_item_extras
+from app.models.report_model import invalidates_counts
+from app.utils.filters import SqlFilters
+from app.utils.pagination import decode_cursor, estimate_count, keyset_predicate, needs_estimate, page_meta
 
 # -------------------------
 # Lecturas básicas de áreas
 # -------------------------
 
 def list_areas(app_user: Optional[str]):
-    SQL = """
-    SELECT area_id, area_nombre, area_padre_id
-    FROM inv.areas
-    ORDER BY COALESCE(area_padre_id, 0), lower(area_nombre)
-    """
-    with get_conn(app_user) as (conn, cur):
-        cur.execute(SQL)
-        rows = cur.fetchall()
-    return [{"id": r[0], "nombre": r[1], "padre_id": r[2]} for r in rows]
+    # Servido desde el árbol en memoria (ver app/models/area_tree.py)
+    tree = get_area_tree(app_user)
+    ids = sorted(tree.nodes, key=lambda aid: (tree.nodes[aid][1] or 0, tree.nodes[aid][0].lower(), aid))
+    return [tree.node(aid) for aid in ids]
 
 
 def list_root_areas(app_user: Optional[str]):
-    with get_conn(app_user) as (conn, cur):
-        cur.execute("""
-            SELECT area_id, area_nombre
-            FROM inv.areas
-            WHERE area_padre_id IS NULL
-            ORDER BY lower(area_nombre)
-        """)
-        rows = cur.fetchall()
-    return [{"id": r[0], "nombre": r[1]} for r in rows]
+    tree = get_area_tree(app_user)
+    return [{"id": aid, "nombre": tree.nodes[aid][0]} for aid in tree.roots]
+
+
+def area_exists(app_user: Optional[str], area_id: int) -> bool:
+    return area_id in get_area_tree(app_user)
 
 
 def list_area_items(
@@ -40,6 +37,10 @@ def list_area_items(
     tipo_nombre: Optional[str] = None,
     fecha_desde: Optional[str] = None,
     fecha_hasta: Optional[str] = None,
+    cursor: Optional[str] = None,
+    count: str = "exact",
+    include_descendants: bool = False,
+    fields: FrozenSet[str] = frozenset({"ficha"}),
 ):
     """
     Devuelve:
@@ -47,35 +48,30 @@ def list_area_items(
          arma 'prestamo_text' = 'a {destino} · PC-xxx' y puede_devolver = TRUE.
       B) Ítems prestados que este área está usando (estado PRESTAMO) detectados por
          equipos.equipo_area_id = area_id (destino). Arma 'prestamo_text' = 'de {origen} · PC-xxx'.
+    `cursor` (opcional): keyset sobre (orden de estado, lower(tipo), item_codigo, item_id);
+    ignora `page` y no calcula total. Lanza ValueError si el cursor no es válido.
+    `count`: exact | estimate | none (ver app.utils.pagination).
+    `include_descendants`: el área es toda la rama (área + subáreas, vía
+    inv.area_closure); los préstamos entre áreas de la rama salen solo en A).
+    `fields`: campos pesados (ficha, fotos) a armar para las filas de la página.
     """
     p = max(1, int(page or 1))
     s = min(100, max(1, int(size or 10)))
     off = (p - 1) * s
+    after = decode_cursor(cursor, (int, str, str, int))
 
-    filtros: List[str] = []
-    params_common: List[Any] = []
-
-    if clase:
-        filtros.append("v.clase = %s")
-        params_common.append(clase)
+    # área del dueño (A) y del equipo que usa el ítem (B): exacta o rama
+    own = SqlFilters().in_area("v.area_id", area_id, include_descendants)
+    dest = SqlFilters().in_area("e.equipo_area_id", area_id, include_descendants)
+    own_cond, dest_cond = own.conds[0], dest.conds[0]
 
-    if estado:
-        filtros.append("v.estado = %s")
-        params_common.append(estado)
-
-    if tipo_nombre:
-        filtros.append("lower(v.tipo) = lower(%s)")
-        params_common.append(tipo_nombre)
-
-    if fecha_desde:
-        filtros.append("v.created_at::date >= %s::date")
-        params_common.append(fecha_desde)
-
-    if fecha_hasta:
-        filtros.append("v.created_at::date <= %s::date")
-        params_common.append(fecha_hasta)
-
-    where_extra = (" AND " + " AND ".join(filtros)) if filtros else ""
+    f = SqlFilters()
+    f.eq("v.clase", clase)
+    f.eq("v.estado", estado)
+    f.ieq("v.tipo", tipo_nombre)
+    f.date_range("v.created_at", fecha_desde, fecha_hasta)
+    params_common: List[Any] = f.params
+    where_extra = f.and_sql()
 
     select_cols = """
       v.item_id,
@@ -87,7 +83,7 @@ def list_area_items(
       e.equipo_id,
       e.equipo_codigo,
       e.equipo_nombre,
-      v.ficha,
+      NULL::jsonb AS ficha,
       ao.area_id   AS origen_area_id,
       ao.area_nombre AS origen_area_nombre,
       ea.area_id   AS destino_area_id,
@@ -95,8 +91,8 @@ def list_area_items(
     """
 
     # 🔧 FIX: usar e.equipo_area_id (no existe e.area_id)
-    from_joins = """
-      FROM inv.vw_items_con_ficha_y_fotos v
+    from_joins = f"""
+      FROM {ITEMS_BASE_SQL} v
       LEFT JOIN inv.equipo_items ei ON ei.item_id = v.item_id
       LEFT JOIN inv.equipos      e  ON e.equipo_id = ei.equipo_id
       LEFT JOIN inv.areas ao ON ao.area_id = v.area_id                -- dueño del ítem
@@ -118,14 +114,14 @@ def list_area_items(
           ELSE NULL
         END AS prestamo_text,
         CASE
-          WHEN v.estado = 'EN_USO_PRESTADO' AND v.area_id = %s THEN TRUE
+          WHEN v.estado = 'EN_USO_PRESTADO' AND {own_cond} THEN TRUE
           ELSE FALSE
         END AS puede_devolver
       {from_joins}
-      WHERE v.area_id = %s
+      WHERE {own_cond}
       {where_extra}
     """
-    params_propios = [area_id, area_id] + params_common
+    params_propios = own.params + own.params + params_common
 
     # B) Ítems prestados que este área está usando
     # 🔧 FIX: condición por destino usando e.equipo_area_id
@@ -145,11 +141,31 @@ def list_area_items(
         FALSE AS puede_devolver
       {from_joins}
       WHERE v.estado = 'PRESTAMO'
-        AND e.equipo_area_id = %s
-        AND v.area_id <> %s
+        AND {dest_cond}
+        AND NOT ({own_cond})
       {where_extra}
     """
-    params_recibidos = [area_id, area_id] + params_common
+    params_recibidos = dest.params + own.params + params_common
+
+    orden_estado = """
+        CASE estado
+          WHEN 'EN_USO' THEN 0
+          WHEN 'EN_USO_PRESTADO' THEN 1
+          WHEN 'PRESTAMO' THEN 2
+          ELSE 9
+        END"""
+    order_keys = [(orden_estado, "ASC"), ("lower(tipo)", "ASC"), ("item_codigo", "ASC"), ("item_id", "ASC")]
+
+    keyset = after is not None
+    exact = not keyset and count == "exact"
+    total_col = "COUNT(*) OVER()" if exact else "NULL::bigint"
+    if keyset:
+        pred, pred_params = keyset_predicate(order_keys, after)
+        where_page, limit_sql = f"WHERE {pred}", "LIMIT %s"
+        page_params = pred_params + [s + 1]
+    else:
+        where_page, limit_sql = "", "LIMIT %s OFFSET %s"
+        page_params = [s if exact else s + 1, off]
 
     sql_union = f"""
       WITH u AS (
@@ -159,36 +175,47 @@ def list_area_items(
       )
       SELECT
         *,
-        COUNT(*) OVER() AS total_rows
+        {total_col} AS total_rows,
+        {orden_estado} AS k_estado,
+        lower(tipo) AS k_tipo
       FROM u
-      ORDER BY
-        CASE estado
-          WHEN 'EN_USO' THEN 0
-          WHEN 'EN_USO_PRESTADO' THEN 1
-          WHEN 'PRESTAMO' THEN 2
-          ELSE 9
-        END,
-        lower(tipo),
-        item_codigo
-      LIMIT %s OFFSET %s
+      {where_page}
+      ORDER BY {", ".join(f"{c} {d}" for c, d in order_keys)}
+      {limit_sql}
     """
-    params = params_propios + params_recibidos + [s, off]
+    params = params_propios + params_recibidos + page_params
 
     with get_conn(app_user) as (conn, cur):
         cur.execute(sql_union, params)
         rows = cur.fetchall()
 
+        estimate = None
+        if needs_estimate(rows, s, off, keyset, count):
+            estimate = estimate_count(
+                cur,
+                f"SELECT 1 FROM ({sql_propios} UNION ALL {sql_recibidos}) u",
+                params_propios + params_recibidos,
+            )
+
+        extras = load_item_extras(cur, [r[0] for r in rows[:s]], fields)
+
     IDX = {
         "item_id": 0, "item_codigo": 1, "clase": 2, "tipo": 3, "estado": 4, "created_at": 5,
         "equipo_id": 6, "equipo_codigo": 7, "equipo_nombre": 8, "ficha": 9,
         "origen_area_id":10, "origen_area_nombre":11, "destino_area_id":12, "destino_area_nombre":13,
-        "es_prestamo_recibido":14, "prestamo_text":15, "puede_devolver":16, "total_rows":17
+        "es_prestamo_recibido":14, "prestamo_text":15, "puede_devolver":16, "total_rows":17,
+        "k_estado":18, "k_tipo":19,
     }
 
+    rows, meta = page_meta(
+        rows, size=s, page=p, offset=off, keyset=keyset, count=count,
+        total_idx=IDX["total_rows"],
+        cursor_of=lambda r: [r[IDX["k_estado"]], r[IDX["k_tipo"]], r[IDX["item_codigo"]], r[IDX["item_id"]]],
+        estimate=estimate,
+    )
+
     items: List[Dict[str, Any]] = []
-    total = 0
     for r in rows:
-        total = r[IDX["total_rows"]]
         items.append({
             "item_id": r[IDX["item_id"]],
             "item_codigo": r[IDX["item_codigo"]],
@@ -201,13 +228,18 @@ def list_area_items(
                 "equipo_codigo": r[IDX["equipo_codigo"]],
                 "equipo_nombre": r[IDX["equipo_nombre"]],
             },
-            "ficha": r[IDX["ficha"]] or {},
+            "area_id": r[IDX["origen_area_id"]],
+            "area_nombre": r[IDX["origen_area_nombre"]],
             "prestamo_text": r[IDX["prestamo_text"]],
             "puede_devolver": bool(r[IDX["puede_devolver"]]),
             "es_prestamo_recibido": bool(r[IDX["es_prestamo_recibido"]]),
         })
+        if "ficha" in fields:
+            items[-1]["ficha"] = extras.get(r[IDX["item_id"]], {}).get("ficha") or {}
+        if "fotos" in fields:
+            items[-1]["fotos"] = extras.get(r[IDX["item_id"]], {}).get("fotos") or []
 
-    return {"items": items, "total": int(total or 0), "page": p, "size": s}
+    return {"items": items, **meta}
 
 
 # -----------------------------------------
@@ -223,16 +255,22 @@ def list_area_equipos_paged(
     page: int = 1,
     size: int = 10,
     orden: Optional[str] = None,
+    cursor: Optional[str] = None,
+    count: str = "exact",
+    include_descendants: bool = False,
 ) -> Dict[str, Any]:
     # Si no usas este proxy, puedes borrarlo. Lo dejo intacto por compatibilidad.
     from app.models.equipo_model import list_area_equipos_paged as _inner
-    return _inner(app_user, area_id, estado, fdesde, fhasta, page, size)
+    return _inner(app_user, area_id, estado, fdesde, fhasta, page, size, cursor=cursor, count=count,
+                  include_descendants=include_descendants)
 
 
 # -----------------------------------------
 # Altas de áreas
 # -----------------------------------------
 
+@invalidates_area_tree
+@invalidates_counts
 def create_root_area(app_user: str, nombre: str) -> int:
     with get_conn(app_user) as (conn, cur):
         area_id = None
@@ -246,6 +284,8 @@ def create_root_area(app_user: str, nombre: str) -> int:
     return int(row[0])
 
 
+@invalidates_area_tree
+@invalidates_counts
 def create_sub_area(app_user: str, nombre: str, padre_id: int) -> int:
     with get_conn(app_user) as (conn, cur):
         area_id = None
@@ -261,33 +301,11 @@ def create_sub_area(app_user: str, nombre: str, padre_id: int) -> int:
 
 
 def get_area_info(app_user: str, area_id: int):
-    with get_conn(app_user) as (conn, cur):
-        cur.execute("SELECT area_id, area_nombre, area_padre_id FROM inv.areas WHERE area_id=%s", (area_id,))
-        a = cur.fetchone()
-        if not a:
-            return None
-        area = {"id": a[0], "nombre": a[1], "padre_id": a[2]}
-
-        cur.execute("""
-        WITH RECURSIVE anc AS (
-          SELECT area_id, area_nombre, area_padre_id
-          FROM inv.areas WHERE area_id=%s
-          UNION ALL
-          SELECT p.area_id, p.area_nombre, p.area_padre_id
-          FROM inv.areas p
-          JOIN anc ON anc.area_padre_id = p.area_id
-        )
-        SELECT area_id, area_nombre, area_padre_id
-        FROM anc WHERE area_id <> %s
-        """, (area_id, area_id))
-        rows = cur.fetchall()
-        ancestors = [{"id": r[0], "nombre": r[1], "padre_id": r[2]} for r in rows][::-1]
-
-        cur.execute("""
-          SELECT area_id, area_nombre FROM inv.areas
-          WHERE area_padre_id = %s
-          ORDER BY lower(area_nombre)
-        """, (area_id,))
-        children = [{"id": r[0], "nombre": r[1]} for r in cur.fetchall()]
-
-    return {"area": area, "ancestors": ancestors, "children": children}
+    tree = get_area_tree(app_user)
+    if area_id not in tree:
+        return None
+    return {
+        "area": tree.node(area_id),
+        "ancestors": [tree.node(aid) for aid in tree.ancestors(area_id)],
+        "children": [{"id": aid, "nombre": tree.nodes[aid][0]} for aid in tree.children.get(area_id, [])],
+    }
@@ -0,0 +1,124 @@
+# app/models/area_tree.py
+"""
+Árbol de áreas en memoria.
+
+inv.areas es chica y casi no cambia, pero se lee en cada carga de página
+(listado, raíces, breadcrumb de /info, validación al crear ítems). Se carga
+entera UNA vez por proceso en un `AreaTree` indexado:
+
+  - nodos por id (nombre, padre) y listas de hijos ya ordenadas por nombre;
+  - recorrido de Euler (tin/tout): `b` está en el subárbol de `a` si
+    tin[a] <= tin[b] < tout[a], en O(1); los descendientes de `a` son el
+    tramo order[tin[a]:tout[a]].
+
+El árbol es inmutable: las altas (create_root_area/create_sub_area) lo
+invalidan al confirmar su transacción y el siguiente lector lo recarga.
+Otros procesos lo recargan al vencer AREAS_TREE_TTL.
+
+Se carga en la conexión del request (sin ocupar otro slot del pool). Si la
+transacción en curso ya dio de alta un área (marca "areas" de
+invalidates_area_tree), el árbol se lee sin caché: vería altas que aún pueden
+revertirse. Una carga que empezó antes de una invalidación no se guarda
+(generación de TTLCache).
+"""
+from functools import wraps
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from app.config import Settings
+from app.db import after_commit, get_conn, has_pending, mark_pending
+from app.utils.cache import TTLCache
+
+_tree_cache = TTLCache(ttl=Settings.AREAS_TREE_TTL, maxsize=1)
+
+
+class AreaTree:
+    """Instantánea de inv.areas con índices para ancestros, hijos y subárboles."""
+
+    def __init__(self, rows: Sequence[Tuple[int, str, Optional[int]]]):
+        self.nodes: Dict[int, Tuple[str, Optional[int]]] = {int(r[0]): (r[1], r[2]) for r in rows}
+        self.children: Dict[int, List[int]] = {}
+        self.roots: List[int] = []
+        for aid, (_, padre) in self.nodes.items():
+            if padre is None or padre not in self.nodes:
+                self.roots.append(aid)
+            else:
+                self.children.setdefault(padre, []).append(aid)
+
+        key = lambda aid: (self.nodes[aid][0].lower(), aid)
+        self.roots.sort(key=key)
+        for kids in self.children.values():
+            kids.sort(key=key)
+
+        # recorrido de Euler iterativo (sin recursión: profundidad arbitraria)
+        self.order: List[int] = []
+        self.tin: Dict[int, int] = {}
+        self.tout: Dict[int, int] = {}
+        self.depth: Dict[int, int] = {}
+        for root in self.roots:
+            stack: List[Tuple[int, int, bool]] = [(root, 0, False)]
+            while stack:
+                aid, d, done = stack.pop()
+                if done:
+                    self.tout[aid] = len(self.order)
+                    continue
+                self.tin[aid] = len(self.order)
+                self.depth[aid] = d
+                self.order.append(aid)
+                stack.append((aid, d, True))
+                for kid in reversed(self.children.get(aid, [])):
+                    stack.append((kid, d + 1, False))
+
+    # ---------- consultas ----------
+    def __contains__(self, area_id: int) -> bool:
+        return area_id in self.nodes
+
+    def node(self, area_id: int) -> Dict[str, Any]:
+        nombre, padre = self.nodes[area_id]
+        return {"id": area_id, "nombre": nombre, "padre_id": padre}
+
+    def ancestors(self, area_id: int) -> List[int]:
+        """Ids desde la raíz hasta el padre de `area_id` (sin incluirlo)."""
+        out: List[int] = []
+        padre = self.nodes[area_id][1]
+        while padre is not None and padre in self.nodes and len(out) < len(self.nodes):
+            out.append(padre)
+            padre = self.nodes[padre][1]
+        return out[::-1]
+
+    def is_descendant(self, area_id: int, of: int) -> bool:
+        """True si `area_id` está en el subárbol de `of` (incluye area_id == of)."""
+        if area_id not in self.tin or of not in self.tin:
+            return False
+        return self.tin[of] <= self.tin[area_id] < self.tout[of]
+
+    def descendants(self, area_id: int, include_self: bool = True) -> List[int]:
+        if area_id not in self.tin:
+            return []
+        start = self.tin[area_id] + (0 if include_self else 1)
+        return self.order[start:self.tout[area_id]]
+
+
+def _load_tree(app_user: Optional[str]) -> AreaTree:
+    with get_conn(app_user) as (conn, cur):
+        cur.execute("SELECT area_id, area_nombre, area_padre_id FROM inv.areas")
+        return AreaTree(cur.fetchall())
+
+
+def get_area_tree(app_user: Optional[str] = None) -> AreaTree:
+    if has_pending("areas"):
+        return _load_tree(app_user)  # incluye las altas propias; no se cachea
+    return _tree_cache.get_or_load("tree", lambda: _load_tree(app_user))
+
+
+def invalidate_area_tree() -> None:
+    _tree_cache.invalidate()
+
+
+def invalidates_area_tree(fn):
+    """Decorador para altas/cambios de áreas: recarga el árbol DESPUÉS del COMMIT."""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        result = fn(*args, **kwargs)
+        mark_pending("areas")
+        after_commit(invalidate_area_tree)
+        return result
+    return wrapper
@@ -0,0 +1,59 @@
+# app/models/code_counter.py
+"""
+Sugerencia y reserva de códigos correlativos (inv.code_counters, sql/013_code_counters.sql).
+
+Un contador por (scope, prefix): 'item:<area_id>' con el nombre del tipo como
+prefijo, 'equipo:<area_id>' con el prefijo del equipo ('PC-'). Ambas
+operaciones son O(1) e independientes de cuántos códigos existan:
+
+  - peek_codes: lee last_value + 1 (sugerencia para prellenar formularios; no
+    escribe, dos usuarios pueden ver el mismo código y el segundo en crear
+    recibe el error de duplicado);
+  - reserve_codes: un único UPDATE atómico; dos reservas concurrentes nunca
+    reciben el mismo número (POST .../next-code:reserve, importación).
+
+Las altas adelantan el contador por trigger, así que un código ya usado no
+vuelve a sugerirse.
+"""
+from typing import List
+
+ITEM_CODE_PAD = 2     # DISCO01, DISCO02, ...
+EQUIPO_CODE_PAD = 3   # PC-001, PC-002, ...
+MAX_CODES_PER_RESERVE = 1000
+
+
+def item_scope(area_id: int) -> str:
+    return f"item:{int(area_id)}"
+
+
+def equipo_scope(area_id: int) -> str:
+    return f"equipo:{int(area_id)}"
+
+
+def format_code(prefix: str, n: int, pad: int) -> str:
+    return f"{prefix}{n:0{max(1, int(pad))}d}"
+
+
+def _check_count(count: int) -> None:
+    if not 1 <= count <= MAX_CODES_PER_RESERVE:
+        raise ValueError(f"count debe estar entre 1 y {MAX_CODES_PER_RESERVE}")
+
+
+def peek_codes(cur, scope: str, prefix: str, count: int = 1, pad: int = ITEM_CODE_PAD) -> List[str]:
+    """Los `count` códigos que daría la próxima reserva, sin reservarlos."""
+    _check_count(count)
+    cur.execute(
+        "SELECT last_value FROM inv.code_counters WHERE scope = %s AND prefix = upper(%s)",
+        (scope, prefix),
+    )
+    row = cur.fetchone()
+    first = (int(row[0]) if row else 0) + 1
+    return [format_code(prefix, first + k, pad) for k in range(count)]
+
+
+def reserve_codes(cur, scope: str, prefix: str, count: int = 1, pad: int = ITEM_CODE_PAD) -> List[str]:
+    """Reserva `count` códigos consecutivos en la transacción en curso."""
+    _check_count(count)
+    cur.execute("SELECT inv.fn_code_reserve(%s, %s, %s)", (scope, prefix, count))
+    first = int(cur.fetchone()[0])
+    return [format_code(prefix, first + k, pad) for k in range(count)]
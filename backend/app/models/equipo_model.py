@@ -1,6 +1,12 @@
 from typing import List, Dict, Any, Optional, Tuple
 from json import dumps
+from datetime import datetime
 from app.db import get_conn
+from app.models.code_counter import EQUIPO_CODE_PAD, equipo_scope, peek_codes, reserve_codes
+from app.models.report_model import invalidates_counts
+from app.models.item_model import ITEMS_BASE_SQL
+from app.utils.filters import SqlFilters
+from app.utils.pagination import decode_cursor, estimate_count, keyset_predicate, needs_estimate, page_meta
 from app.models.user_model import ensure_user_for_equipo  # crea/actualiza usuario rol USUARIO
 
 # ============================================================
@@ -45,12 +51,25 @@ def list_area_equipos_paged(
     fecha_hasta: Optional[str] = None, # 'YYYY-MM-DD'
     page: int = 1,
     size: int = 10,
+    cursor: Optional[str] = None,
+    count: str = "exact",
+    include_descendants: bool = False,
 ) -> Dict[str, Any]:
+    """
+    `cursor` (opcional): keyset sobre (created_at DESC, lower(codigo), equipo_id);
+    ignora `page` y no calcula total. Lanza ValueError si el cursor no es válido.
+    `count`: exact | estimate | none (ver app.utils.pagination).
+    `include_descendants`: equipos del área y de todas sus subáreas.
+    """
     p = max(1, int(page or 1))
     s = min(100, max(1, int(size or 10)))
     off = (p - 1) * s
+    after = decode_cursor(cursor, (datetime, str, int))
+    keyset = after is not None
+    exact = not keyset and count == "exact"
+    order_keys = [("e.created_at", "DESC"), ("lower(e.equipo_codigo)", "ASC"), ("e.equipo_id", "ASC")]
 
-    sql = """
+    sql = f"""
       SELECT
         e.equipo_id,
         e.equipo_codigo,
@@ -59,38 +78,49 @@ def list_area_equipos_paged(
         e.equipo_usuario_final,
         e.created_at,
         e.updated_at,
-        COUNT(*) OVER() AS total_rows
+        {"COUNT(*) OVER()" if exact else "NULL::bigint"} AS total_rows,
+        lower(e.equipo_codigo) AS k_codigo,
+        e.equipo_area_id
       FROM inv.equipos e
-      WHERE e.equipo_area_id = %s
+      WHERE true
     """
-    params: List[Any] = [area_id]
+    params: List[Any] = []
 
+    f = SqlFilters().in_area("e.equipo_area_id", area_id, include_descendants)
     if estado and estado.upper() != "TODOS":
-        sql += " AND e.equipo_estado = %s"
-        params.append(estado.upper())
-
-    if fecha_desde:
-        sql += " AND e.created_at::date >= %s::date"
-        params.append(fecha_desde)
-
-    if fecha_hasta:
-        sql += " AND e.created_at::date <= %s::date"
-        params.append(fecha_hasta)
-
-    sql += """
-      ORDER BY e.created_at DESC, lower(e.equipo_codigo)
-      LIMIT %s OFFSET %s
-    """
-    params.extend([s, off])
+        f.eq("e.equipo_estado", estado.upper())
+    f.date_range("e.created_at", fecha_desde, fecha_hasta)
+    sql += f.and_sql()
+    params.extend(f.params)
+
+    base_sql, base_params = sql, list(params)
+
+    if keyset:
+        pred, pred_params = keyset_predicate(order_keys, after)
+        sql += f" AND {pred}"
+        params.extend(pred_params)
+
+    sql += " ORDER BY " + ", ".join(f"{c} {d}" for c, d in order_keys)
+    if keyset:
+        sql += " LIMIT %s"
+        params.append(s + 1)
+    else:
+        sql += " LIMIT %s OFFSET %s"
+        params.extend([s if exact else s + 1, off])
 
     with get_conn(app_user) as (conn, cur):
         cur.execute(sql, params)
         rows = cur.fetchall()
 
-    total = 0
+        estimate = None
+        if needs_estimate(rows, s, off, keyset, count):
+            estimate = estimate_count(cur, base_sql, base_params)
+
+    rows, meta = page_meta(rows, size=s, page=p, offset=off, keyset=keyset, count=count,
+                           total_idx=7, cursor_of=lambda r: [r[5], r[8], r[0]], estimate=estimate)
+
     items: List[Dict[str, Any]] = []
     for r in rows:
-        total = r[7]
         items.append({
             "equipo_id": r[0],
             "equipo_codigo": r[1],
@@ -99,8 +129,9 @@ def list_area_equipos_paged(
             "usuario_final": r[4],
             "created_at": r[5],
             "updated_at": r[6],
+            "area_id": r[9],
         })
-    return {"items": items, "total": int(total or 0), "page": p, "size": s}
+    return {"items": items, **meta}
 
 
 # ============================================================
@@ -181,12 +212,25 @@ def list_items_disponibles(
     size: int = 10,
     tipo_nombre: Optional[str] = None,
     q: Optional[str] = None,
+    cursor: Optional[str] = None,
+    count: str = "exact",
+    include_descendants: bool = False,
 ) -> Dict[str, Any]:
+    """
+    `cursor` (opcional): keyset sobre (lower(tipo), item_codigo, item_id);
+    ignora `page` y no calcula total. Lanza ValueError si el cursor no es válido.
+    `count`: exact | estimate | none (ver app.utils.pagination).
+    `include_descendants`: ítems en almacén del área y de todas sus subáreas.
+    """
     p = max(1, int(page or 1))
     s = min(100, max(1, int(size or 10)))
     off = (p - 1) * s
+    after = decode_cursor(cursor, (str, str, int))
+    keyset = after is not None
+    exact = not keyset and count == "exact"
+    order_keys = [("lower(v.tipo)", "ASC"), ("v.item_codigo", "ASC"), ("v.item_id", "ASC")]
 
-    SQL = """
+    SQL = f"""
       SELECT
         v.item_id,
         v.item_codigo,
@@ -194,36 +238,48 @@ def list_items_disponibles(
         v.tipo,
         v.estado,
         v.created_at,
-        COUNT(*) OVER() AS total_rows
-      FROM inv.vw_items_con_ficha_y_fotos v
-      WHERE v.area_id = %s
-        AND v.clase   = %s
+        {"COUNT(*) OVER()" if exact else "NULL::bigint"} AS total_rows,
+        lower(v.tipo) AS k_tipo,
+        v.area_id
+      FROM {ITEMS_BASE_SQL} v
+      WHERE v.clase   = %s
         AND v.estado  = 'ALMACEN'
     """
-    params = [area_id, clase]
+    params = [clase]
 
-    if tipo_nombre:
-        SQL += " AND lower(v.tipo) = lower(%s)"
-        params.append(tipo_nombre)
+    f = (SqlFilters().in_area("v.area_id", area_id, include_descendants)
+         .ieq("v.tipo", tipo_nombre).ilike_any(["v.item_codigo"], q))
+    SQL += f.and_sql()
+    params.extend(f.params)
 
-    if q:
-        SQL += " AND v.item_codigo ILIKE %s"
-        params.append(f"%{q}%")
+    base_sql, base_params = SQL, list(params)
 
-    SQL += """
-      ORDER BY lower(v.tipo), v.item_codigo
-      LIMIT %s OFFSET %s
-    """
-    params.extend([s, off])
+    if keyset:
+        pred, pred_params = keyset_predicate(order_keys, after)
+        SQL += f" AND {pred}"
+        params.extend(pred_params)
+
+    SQL += " ORDER BY " + ", ".join(f"{c} {d}" for c, d in order_keys)
+    if keyset:
+        SQL += " LIMIT %s"
+        params.append(s + 1)
+    else:
+        SQL += " LIMIT %s OFFSET %s"
+        params.extend([s if exact else s + 1, off])
 
     with get_conn(app_user) as (conn, cur):
         cur.execute(SQL, params)
         rows = cur.fetchall()
 
-    total = 0
+        estimate = None
+        if needs_estimate(rows, s, off, keyset, count):
+            estimate = estimate_count(cur, base_sql, base_params)
+
+    rows, meta = page_meta(rows, size=s, page=p, offset=off, keyset=keyset, count=count,
+                           total_idx=6, cursor_of=lambda r: [r[7], r[1], r[0]], estimate=estimate)
+
     items = []
     for r in rows:
-        total = r[6]
         items.append({
             "item_id": r[0],
             "item_codigo": r[1],
@@ -231,14 +287,58 @@ def list_items_disponibles(
             "tipo": r[3],
             "estado": r[4],
             "created_at": r[5],
+            "area_id": r[8],
         })
 
-    return {"items": items, "total": int(total or 0), "page": p, "size": s}
+    return {"items": items, **meta}
 
 
 # ============================================================
 # CREAR EQUIPO (con items) — asegura usuario rol USUARIO
 # ============================================================
+# ¿Existe inv.sp_asignar_item_a_equipo? Se consulta una vez por proceso.
+_sp_asignar: Optional[bool] = None
+
+
+def _has_sp_asignar(cur) -> bool:
+    global _sp_asignar
+    if _sp_asignar is None:
+        try:
+            cur.execute("""
+              SELECT 1
+                FROM pg_proc
+               WHERE proname='sp_asignar_item_a_equipo'
+                 AND pronamespace = 'inv'::regnamespace
+            """)
+            _sp_asignar = cur.fetchone() is not None
+        except Exception:
+            return False
+    return _sp_asignar
+
+
+def _validate_items_almacen(cur, area_id: int, item_ids: List[int]) -> Optional[str]:
+    """Valida todos los ítems en una sola consulta (mismo orden y mensajes que antes)."""
+    cur.execute("""
+      SELECT s.item_id, i.area_id, i.estado
+        FROM unnest(%s::bigint[]) WITH ORDINALITY AS s(item_id, ord)
+        LEFT JOIN inv.items i ON i.item_id = s.item_id
+       ORDER BY s.ord
+    """, (item_ids,))
+    seen = set()
+    for item_id, item_area, estado in cur.fetchall():
+        if estado is None:
+            return f"Item {item_id} no existe"
+        if item_area != area_id:
+            return f"Item {item_id} pertenece a otra área"
+        if estado != "ALMACEN":
+            return f"Item {item_id} no está en ALMACEN (actual={estado})"
+        if item_id in seen:
+            return f"Item {item_id} repetido"
+        seen.add(item_id)
+    return None
+
+
+@invalidates_counts
 def create_equipo_con_items(
     app_user: str,
     area_id: int,
@@ -250,8 +350,17 @@ def create_equipo_con_items(
     password: Optional[str],
     items: List[Dict[str, Any]],
 ) -> Tuple[Optional[int], Optional[str]]:
-    with get_conn(app_user) as (conn, cur):
-        cur.execute("SELECT set_config('app.proc', %s, true)", ('equipos.create_con_items',))
+    item_ids = [int(it.get("item_id")) for it in items]
+    slots = [None if it.get("slot") is None else str(it.get("slot")) for it in items]
+
+    with get_conn(app_user, proc='equipos.create_con_items') as (conn, cur):
+
+        # Validar antes de escribir nada: un ítem inválido no deja el equipo a medias
+        if item_ids:
+            err = _validate_items_almacen(cur, area_id, item_ids)
+            if err:
+                return None, err
+
         try:
             cur.execute("""
               INSERT INTO inv.equipos (
@@ -269,50 +378,34 @@ def create_equipo_con_items(
         # === usuario de equipo (rol USUARIO, sin duplicar) ===
         ensure_user_for_equipo(app_user, login, password, area_id)
 
-        for it in items:
-            item_id = int(it.get("item_id"))
-            slot = it.get("slot")
-
-            cur.execute("SELECT area_id, estado FROM inv.items WHERE item_id=%s", (item_id,))
-            r = cur.fetchone()
-            if not r:
-                return None, f"Item {item_id} no existe"
-            if r[0] != area_id:
-                return None, f"Item {item_id} pertenece a otra área"
-            if r[1] != "ALMACEN":
-                return None, f"Item {item_id} no está en ALMACEN (actual={r[1]})"
-
-            # si existe SP, usarlo; si no, fallback
-            try:
-                cur.execute("""
-                  SELECT 1
-                    FROM pg_proc
-                   WHERE proname='sp_asignar_item_a_equipo'
-                     AND pronamespace = 'inv'::regnamespace
-                """)
-                exists = cur.fetchone() is not None
-            except Exception:
-                exists = False
-
-            if exists:
-                cur.execute("CALL inv.sp_asignar_item_a_equipo(%s,%s,%s)", (equipo_id, item_id, slot))
-            else:
+        if not item_ids:
+            return equipo_id, None
+
+        if _has_sp_asignar(cur):
+            # executemany de psycopg 3 va en pipeline: un viaje para todos los CALL
+            cur.executemany("CALL inv.sp_asignar_item_a_equipo(%s,%s,%s)",
+                            [(equipo_id, i, sl) for i, sl in zip(item_ids, slots)])
+        else:
+            # Tres sentencias por conjunto, enviadas juntas en pipeline
+            with conn.pipeline():
                 cur.execute("""
                     INSERT INTO inv.equipo_items(equipo_id, item_id, slot_o_ubicacion)
-                    VALUES (%s,%s,%s)
-                """, (equipo_id, item_id, slot))
-                cur.execute("UPDATE inv.items SET estado='EN_USO' WHERE item_id=%s", (item_id,))
+                    SELECT %s, s.item_id, s.slot
+                      FROM unnest(%s::bigint[], %s::text[]) AS s(item_id, slot)
+                """, (equipo_id, item_ids, slots))
+                cur.execute("UPDATE inv.items SET estado='EN_USO' WHERE item_id = ANY(%s::bigint[])",
+                            (item_ids,))
                 cur.execute("""
                   INSERT INTO inv.movimientos(
                     mov_item_id, mov_tipo, mov_origen_area_id, mov_destino_area_id,
                     mov_equipo_id, mov_usuario_app, mov_detalle
-                  ) VALUES (
-                    %s, 'ASIGNACION', %s, %s, %s,
-                    current_setting('app.user', true),
-                    %s
                   )
-                """, (item_id, area_id, area_id, equipo_id,
-                      None if slot is None else {'slot': slot}))
+                  SELECT s.item_id, 'ASIGNACION', %s, %s, %s,
+                         current_setting('app.user', true),
+                         CASE WHEN s.slot IS NULL THEN NULL ELSE jsonb_build_object('slot', s.slot) END
+                    FROM unnest(%s::bigint[], %s::text[]) WITH ORDINALITY AS s(item_id, slot, ord)
+                   ORDER BY s.ord
+                """, (area_id, area_id, equipo_id, item_ids, slots))
 
         return equipo_id, None
 
@@ -320,79 +413,76 @@ def create_equipo_con_items(
 # ============================================================
 # ASIGNAR / RETIRAR ITEM DEL EQUIPO
 # ============================================================
+@invalidates_counts
 def assign_item_to_equipo(
     app_user: str,
     equipo_id: int,
     item_id: int,
     slot: Optional[str] = None,
 ) -> Tuple[bool, Optional[str]]:
-    with get_conn(app_user) as (conn, cur):
-        cur.execute("SELECT set_config('app.proc', %s, true)", ('equipos.assign_item',))
-
-        cur.execute("SELECT equipo_area_id FROM inv.equipos WHERE equipo_id=%s", (equipo_id,))
+    with get_conn(app_user, proc='equipos.assign_item') as (conn, cur):
+        # equipo, ítem y préstamo activo en una sola lectura
+        cur.execute("""
+          SELECT e.equipo_area_id, i.item_id, pa.destino_area_id
+            FROM inv.equipos e
+            LEFT JOIN inv.items i ON i.item_id = %s
+            LEFT JOIN inv.prestamos_activos pa ON pa.item_id = i.item_id
+           WHERE e.equipo_id = %s
+        """, (item_id, equipo_id))
         r = cur.fetchone()
         if not r:
             return False, "Equipo no encontrado"
-        equipo_area_id = int(r[0])
-
-        cur.execute("SELECT area_id, estado FROM inv.items WHERE item_id=%s", (item_id,))
-        r = cur.fetchone()
-        if not r:
+        if r[1] is None:
             return False, "Item no encontrado"
+        equipo_area_id = int(r[0])
+        nuevo_estado = 'EN_USO_PRESTADO' if r[2] is not None and r[2] == equipo_area_id else 'EN_USO'
 
-        cur.execute("SELECT equipo_id FROM inv.equipo_items WHERE item_id=%s", (item_id,))
-        prev = cur.fetchone()
-        if prev:
+        # escrituras en pipeline: un solo viaje de red
+        with conn.pipeline():
             cur.execute("DELETE FROM inv.equipo_items WHERE item_id=%s", (item_id,))
-
-        cur.execute("""
-            INSERT INTO inv.equipo_items(equipo_id, item_id, slot_o_ubicacion)
-            VALUES (%s,%s,%s)
-        """, (equipo_id, item_id, slot))
-
-        active = _get_active_loan(cur, item_id)
-        if active is not None and active[1] == equipo_area_id:
-            cur.execute("UPDATE inv.items SET estado='EN_USO_PRESTADO' WHERE item_id=%s", (item_id,))
-        else:
-            cur.execute("UPDATE inv.items SET estado='EN_USO' WHERE item_id=%s", (item_id,))
-
-        cur.execute("""
-          INSERT INTO inv.movimientos(
-            mov_item_id, mov_tipo, mov_origen_area_id, mov_destino_area_id,
-            mov_equipo_id, mov_usuario_app, mov_detalle
-          ) VALUES (
-            %s, 'ASIGNACION', %s, %s, %s, current_setting('app.user', true),
-            %s
-          )
-        """, (item_id, equipo_area_id, equipo_area_id, equipo_id,
-              None if slot is None else {'slot': slot}))
+            cur.execute("""
+                INSERT INTO inv.equipo_items(equipo_id, item_id, slot_o_ubicacion)
+                VALUES (%s,%s,%s)
+            """, (equipo_id, item_id, slot))
+            cur.execute("UPDATE inv.items SET estado=%s WHERE item_id=%s", (nuevo_estado, item_id))
+            cur.execute("""
+              INSERT INTO inv.movimientos(
+                mov_item_id, mov_tipo, mov_origen_area_id, mov_destino_area_id,
+                mov_equipo_id, mov_usuario_app, mov_detalle
+              ) VALUES (
+                %s, 'ASIGNACION', %s, %s, %s, current_setting('app.user', true),
+                %s::jsonb
+              )
+            """, (item_id, equipo_area_id, equipo_area_id, equipo_id,
+                  None if slot is None else dumps({'slot': slot})))
 
         return True, None
 
 
+@invalidates_counts
 def unassign_item(app_user: str, equipo_id: int, item_id: int) -> Optional[str]:
-    with get_conn(app_user) as (conn, cur):
-        cur.execute("SELECT set_config('app.proc', %s, true)", ('equipos.unassign_item',))
-
-        cur.execute("DELETE FROM inv.equipo_items WHERE equipo_id=%s AND item_id=%s RETURNING 1",
-                    (equipo_id, item_id))
-        if not cur.fetchone():
+    with get_conn(app_user, proc='equipos.unassign_item') as (conn, cur):
+        # borra y averigua si hay préstamo activo en la misma sentencia
+        cur.execute("""
+          DELETE FROM inv.equipo_items ei
+           WHERE ei.equipo_id=%s AND ei.item_id=%s
+          RETURNING EXISTS (SELECT 1 FROM inv.prestamos_activos pa WHERE pa.item_id = ei.item_id)
+        """, (equipo_id, item_id))
+        r = cur.fetchone()
+        if not r:
             return "El item no estaba asignado"
 
-        active = _get_active_loan(cur, item_id)
-        if active is not None:
-            cur.execute("UPDATE inv.items SET estado='PRESTAMO' WHERE item_id=%s", (item_id,))
-        else:
-            cur.execute("UPDATE inv.items SET estado='ALMACEN' WHERE item_id=%s", (item_id,))
-
-        cur.execute("""
-          INSERT INTO inv.movimientos(
-            mov_item_id, mov_tipo, mov_origen_area_id, mov_destino_area_id,
-            mov_equipo_id, mov_usuario_app
-          ) SELECT %s, 'RETIRO', e.equipo_area_id, e.equipo_area_id, %s,
-                   current_setting('app.user', true)
-            FROM inv.equipos e WHERE e.equipo_id=%s
-        """, (item_id, equipo_id, equipo_id))
+        with conn.pipeline():
+            cur.execute("UPDATE inv.items SET estado=%s WHERE item_id=%s",
+                        ('PRESTAMO' if r[0] else 'ALMACEN', item_id))
+            cur.execute("""
+              INSERT INTO inv.movimientos(
+                mov_item_id, mov_tipo, mov_origen_area_id, mov_destino_area_id,
+                mov_equipo_id, mov_usuario_app
+              ) SELECT %s, 'RETIRO', e.equipo_area_id, e.equipo_area_id, %s,
+                       current_setting('app.user', true)
+                FROM inv.equipos e WHERE e.equipo_id=%s
+            """, (item_id, equipo_id, equipo_id))
     return None
 
 
@@ -401,26 +491,21 @@ def unassign_item(app_user: str, equipo_id: int, item_id: int) -> Optional[str]:
 # ============================================================
 def _get_active_loan(cur, item_id: int):
     """
-    Devuelve (origen_area_id, destino_area_id, mov_id) del último TRASLADO
-    cuyo mov_detalle->>'es_prestamo' = 'true'. None si no hay préstamo activo.
+    Devuelve (origen_area_id, destino_area_id, mov_id) del préstamo activo del
+    ítem según inv.prestamos_activos. None si no hay préstamo activo.
     """
     cur.execute("""
-        SELECT m.mov_id, m.mov_origen_area_id, m.mov_destino_area_id,
-               COALESCE((m.mov_detalle->>'es_prestamo')::boolean, false) AS es_prestamo
-        FROM inv.movimientos m
-        WHERE m.mov_item_id = %s AND m.mov_tipo = 'TRASLADO'
-        ORDER BY m.mov_id DESC
-        LIMIT 1
+        SELECT pa.origen_area_id, pa.destino_area_id, pa.mov_id
+        FROM inv.prestamos_activos pa
+        WHERE pa.item_id = %s
     """, (item_id,))
     r = cur.fetchone()
     if not r:
         return None
-    mov_id, org, dst, es_prestamo = int(r[0]), r[1], r[2], bool(r[3])
-    if es_prestamo:
-        return (int(org) if org is not None else None,
-                int(dst) if dst is not None else None,
-                mov_id)
-    return None
+    org, dst, mov_id = r
+    return (int(org) if org is not None else None,
+            int(dst) if dst is not None else None,
+            int(mov_id))
 
 
 def list_area_items_biview(
@@ -429,23 +514,29 @@ def list_area_items_biview(
     clase: Optional[str] = None,
     page: int = 1,
     size: int = 10,
+    cursor: Optional[str] = None,
+    count: str = "exact",
 ) -> Dict[str, Any]:
+    """
+    `cursor` (opcional): keyset sobre (lower(tipo), lower(item_codigo), item_id);
+    ignora `page` y no calcula total. Lanza ValueError si el cursor no es válido.
+    `count`: exact | estimate | none (ver app.utils.pagination).
+    """
     p = max(1, int(page or 1))
     s = min(200, max(1, int(size or 10)))
     off = (p - 1) * s
-
-    SQL = """
-    WITH last_tr AS (
-       SELECT DISTINCT ON (m.mov_item_id)
-              m.mov_item_id,
-              m.mov_origen_area_id,
-              m.mov_destino_area_id,
-              COALESCE((m.mov_detalle->>'es_prestamo')::boolean, false) as es_prestamo
-       FROM inv.movimientos m
-       WHERE m.mov_tipo='TRASLADO'
-       ORDER BY m.mov_item_id, m.mov_id DESC
-    ),
-    base AS (
+    after = decode_cursor(cursor, (str, str, int))
+    keyset = after is not None
+    exact = not keyset and count == "exact"
+    total_col = "COUNT(*) OVER()" if exact else "NULL::bigint"
+    where_page = ("WHERE (lower(u.tipo), lower(u.item_codigo), u.item_id) > (%(k_tipo)s, %(k_codigo)s, %(k_id)s)"
+                  if keyset else "")
+
+    # Préstamos desde inv.prestamos_activos (ver sql/003): el costo ya no crece
+    # con el historial de movimientos. `base` NO se materializa para que cada
+    # vista empuje su filtro por área (items.area_id / pa.destino_area_id).
+    SQL = f"""
+    WITH base AS NOT MATERIALIZED (
       SELECT
         i.item_id,
         i.item_codigo,
@@ -453,18 +544,18 @@ def list_area_items_biview(
         it.nombre AS tipo,
         i.estado,
         i.area_id     AS dueno_area_id,
-        l.mov_origen_area_id AS loan_origen_area_id,
-        l.mov_destino_area_id AS loan_destino_area_id,
-        l.es_prestamo,
+        pa.origen_area_id  AS loan_origen_area_id,
+        pa.destino_area_id AS loan_destino_area_id,
+        (pa.item_id IS NOT NULL) AS es_prestamo,
         ei.equipo_id,
         e.equipo_codigo,
         e.equipo_nombre
       FROM inv.items i
       JOIN inv.item_tipos it ON it.item_tipo_id = i.item_tipo_id
-      LEFT JOIN last_tr l     ON l.mov_item_id = i.item_id
+      LEFT JOIN inv.prestamos_activos pa ON pa.item_id = i.item_id
       LEFT JOIN inv.equipo_items ei ON ei.item_id = i.item_id
       LEFT JOIN inv.equipos e       ON e.equipo_id = ei.equipo_id
-      WHERE (%(by_clase)s IS NULL OR it.clase = %(by_clase)s)
+      WHERE (%(by_clase)s::text IS NULL OR it.clase = %(by_clase)s::text)
     ),
     view_origin AS (
       SELECT b.*, b.dueno_area_id AS vista_area_id, b.loan_destino_area_id AS otra_area_id, 'ORIGEN'::text AS vista
@@ -484,27 +575,38 @@ def list_area_items_biview(
       u.equipo_id, u.equipo_codigo, u.equipo_nombre,
       ao.area_nombre AS origen_area_nombre,
       ad.area_nombre AS destino_area_nombre,
-      COUNT(*) OVER() AS total_rows
+      {total_col} AS total_rows,
+      lower(u.tipo) AS k_tipo,
+      lower(u.item_codigo) AS k_codigo
     FROM unioned u
     LEFT JOIN inv.areas ao ON ao.area_id = u.loan_origen_area_id
     LEFT JOIN inv.areas ad ON ad.area_id = u.loan_destino_area_id
-    ORDER BY lower(u.tipo), lower(u.item_codigo)
+    {where_page}
+    ORDER BY lower(u.tipo), lower(u.item_codigo), u.item_id
     LIMIT %(limit)s OFFSET %(offset)s
     """
     params = {
         "area_id": area_id,
         "by_clase": clase if clase in ("COMPONENTE", "PERIFERICO") else None,
-        "limit": s,
+        "limit": s if exact else s + 1,
         "offset": off,
     }
+    if keyset:
+        params.update({"k_tipo": after[0], "k_codigo": after[1], "k_id": after[2], "offset": 0})
+
     with get_conn(app_user) as (conn, cur):
         cur.execute(SQL, params)
         rows = cur.fetchall()
 
-    total = 0
+        estimate = None
+        if needs_estimate(rows, s, off, keyset, count):
+            estimate = estimate_count(cur, SQL, params)  # filas bajo el LIMIT
+
+    rows, meta = page_meta(rows, size=s, page=p, offset=off, keyset=keyset, count=count,
+                           total_idx=15, cursor_of=lambda r: [r[16], r[17], r[0]], estimate=estimate)
+
     out = []
     for r in rows:
-        total = r[15]
         vista = r[5]  # 'ORIGEN' | 'DESTINO'
         estado = (r[4] or "").upper()
         es_prestamo = bool(r[9])
@@ -534,12 +636,13 @@ def list_area_items_biview(
             "prestamo_destino_area_id": loan_dest,
             "prestamo_destino_area_nombre": destino_nom,
         })
-    return {"items": out, "total": int(total or 0), "page": p, "size": s}
+    return {"items": out, **meta}
 
 
 # ============================================================
 # PRESTAR / DEVOLVER
 # ============================================================
+@invalidates_counts
 def prestar_item(
     app_user: str,
     item_id: int,
@@ -547,9 +650,7 @@ def prestar_item(
     detalle: Optional[Dict[str, Any]] = None,
     mov_equipo_id: Optional[int] = None,
 ) -> Tuple[bool, Optional[str]]:
-    with get_conn(app_user) as (conn, cur):
-        cur.execute("SELECT set_config('app.proc', %s, true)", ('items.prestar',))
-
+    with get_conn(app_user, proc='items.prestar') as (conn, cur):
         cur.execute("SELECT area_id FROM inv.items WHERE item_id=%s", (item_id,))
         r = cur.fetchone()
         if not r:
@@ -563,48 +664,66 @@ def prestar_item(
         det["es_prestamo"] = True
         det_json = dumps(det)
 
-        cur.execute("""
-          INSERT INTO inv.movimientos(
-            mov_item_id, mov_tipo, mov_origen_area_id, mov_destino_area_id,
-            mov_equipo_id, mov_usuario_app, mov_detalle
-          ) VALUES (
-            %s, 'TRASLADO', %s, %s, %s, current_setting('app.user', true), %s::jsonb
-          )
-        """, (item_id, origen_area_id, destino_area_id, mov_equipo_id, det_json))
-
-        cur.execute("UPDATE inv.items SET estado='PRESTAMO' WHERE item_id=%s", (item_id,))
+        with conn.pipeline():
+            # TRASLADO + proyección de préstamos activos en una sentencia
+            cur.execute("""
+              WITH m AS (
+                INSERT INTO inv.movimientos(
+                  mov_item_id, mov_tipo, mov_origen_area_id, mov_destino_area_id,
+                  mov_equipo_id, mov_usuario_app, mov_detalle
+                ) VALUES (
+                  %s, 'TRASLADO', %s, %s, %s, current_setting('app.user', true), %s::jsonb
+                )
+                RETURNING mov_item_id, mov_origen_area_id, mov_destino_area_id, mov_id, mov_equipo_id, mov_fecha
+              )
+              INSERT INTO inv.prestamos_activos(item_id, origen_area_id, destino_area_id, mov_id, equipo_id, desde)
+              SELECT mov_item_id, mov_origen_area_id, mov_destino_area_id, mov_id, mov_equipo_id,
+                     COALESCE(mov_fecha, now())
+                FROM m
+              ON CONFLICT (item_id) DO UPDATE
+                 SET origen_area_id  = EXCLUDED.origen_area_id,
+                     destino_area_id = EXCLUDED.destino_area_id,
+                     mov_id          = EXCLUDED.mov_id,
+                     equipo_id       = EXCLUDED.equipo_id,
+                     desde           = EXCLUDED.desde
+            """, (item_id, origen_area_id, destino_area_id, mov_equipo_id, det_json))
+            cur.execute("UPDATE inv.items SET estado='PRESTAMO' WHERE item_id=%s", (item_id,))
         return True, None
 
 
+@invalidates_counts
 def devolver_item(
     app_user: str,
     item_id: int,
     detalle: Optional[Dict[str, Any]] = None
 ) -> Tuple[bool, Optional[str]]:
-    with get_conn(app_user) as (conn, cur):
-        cur.execute("SELECT set_config('app.proc', %s, true)", ('items.devolver',))
-
-        active = _get_active_loan(cur, item_id)
+    with get_conn(app_user, proc='items.devolver') as (conn, cur):
+        # cierra el préstamo y lo lee en un paso (dos devoluciones simultáneas no pasan ambas)
+        cur.execute("""
+          DELETE FROM inv.prestamos_activos WHERE item_id=%s
+          RETURNING origen_area_id, destino_area_id
+        """, (item_id,))
+        active = cur.fetchone()
         if not active:
             return False, "El ítem no tiene préstamo activo"
-        origen_area_id, destino_area_id, _ = active
+        origen_area_id, destino_area_id = active
 
         det = (detalle or {}).copy()
         det["es_prestamo"] = False
         det["devolucion"]   = True
         det_json = dumps(det)
 
-        cur.execute("""
-          INSERT INTO inv.movimientos(
-            mov_item_id, mov_tipo, mov_origen_area_id, mov_destino_area_id,
-            mov_usuario_app, mov_detalle
-          ) VALUES (
-            %s, 'TRASLADO', %s, %s, current_setting('app.user', true), %s::jsonb
-          )
-        """, (item_id, destino_area_id, origen_area_id, det_json))
-
-        cur.execute("DELETE FROM inv.equipo_items WHERE item_id=%s", (item_id,))
-        cur.execute("UPDATE inv.items SET estado='ALMACEN' WHERE item_id=%s", (item_id,))
+        with conn.pipeline():
+            cur.execute("""
+              INSERT INTO inv.movimientos(
+                mov_item_id, mov_tipo, mov_origen_area_id, mov_destino_area_id,
+                mov_usuario_app, mov_detalle
+              ) VALUES (
+                %s, 'TRASLADO', %s, %s, current_setting('app.user', true), %s::jsonb
+              )
+            """, (item_id, destino_area_id, origen_area_id, det_json))
+            cur.execute("DELETE FROM inv.equipo_items WHERE item_id=%s", (item_id,))
+            cur.execute("UPDATE inv.items SET estado='ALMACEN' WHERE item_id=%s", (item_id,))
 
         return True, None
 
@@ -637,13 +756,12 @@ def update_equipo_meta(
         return None
 
     params.append(equipo_id)
-    sql = "UPDATE inv.equipos SET " + ", ".join(pieces) + " WHERE equipo_id=%s"
-    with get_conn(app_user) as (conn, cur):
-        cur.execute("SELECT set_config('app.proc', %s, true)", ('equipos.update_meta',))
+    sql = ("UPDATE inv.equipos SET " + ", ".join(pieces) + " WHERE equipo_id=%s"
+           " RETURNING equipo_area_id, equipo_login, equipo_password")
+    with get_conn(app_user, proc='equipos.update_meta') as (conn, cur):
         cur.execute(sql, params)
 
         # asegurar/actualizar usuario de equipo (sin duplicar)
-        cur.execute("SELECT equipo_area_id, equipo_login, equipo_password FROM inv.equipos WHERE equipo_id=%s", (equipo_id,))
         a = cur.fetchone()
         if a:
             area_id = int(a[0]) if a[0] is not None else None
@@ -656,34 +774,24 @@ def update_equipo_meta(
 # ============================================================
 # SUGERIR CÓDIGO DE EQUIPO POR ÁREA
 # ============================================================
-def get_next_equipo_code(
+def get_next_equipo_codes(
     app_user: str,
     area_id: int,
     prefix: Optional[str] = None,
-    pad: int = 3,
-) -> str:
+    pad: int = EQUIPO_CODE_PAD,
+    count: int = 1,
+    reserve: bool = False,
+) -> List[str]:
     """
-    Genera el siguiente código de equipo por área buscando el mayor sufijo numérico
-    de los códigos que comienzan con <prefix>.
+    Siguientes `count` códigos de equipo del área con <prefix>
+    (solo sugeridos; `reserve=True` los reserva).
     Ej: prefix='PC-' -> PC-001, PC-002, ...
+    Contador por (área, prefijo sin distinguir mayúsculas), ver app/models/code_counter.py.
     """
     pref = (prefix or "PC-").strip()
     if pref == "":
         pref = "PC-"
-
-    SQL = """
-      SELECT COALESCE(MAX( (regexp_replace(equipo_codigo, '[^0-9]+', '', 'g'))::int ), 0) AS max_num
-        FROM inv.equipos
-       WHERE equipo_area_id = %s
-         AND equipo_codigo ILIKE %s
-         AND equipo_codigo ~ '\\d+$'
-    """
-    params = [area_id, f"{pref}%"]
+    take = reserve_codes if reserve else peek_codes
     with get_conn(app_user) as (conn, cur):
-        cur.execute(SQL, params)
-        r = cur.fetchone()
-        max_num = int(r[0] or 0)
+        return take(cur, equipo_scope(area_id), pref, count, pad or EQUIPO_CODE_PAD)
 
-    nxt = max_num + 1
-    suf = str(nxt).zfill(max(1, int(pad or 3)))
-    return f"{pref}{suf}"
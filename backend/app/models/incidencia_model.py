@@ -1,7 +1,10 @@
 # app/models/incidencia_model.py
 from typing import Optional, Tuple, Dict, Any, List
 from app.db import get_conn
-from app.utils.mailer import send_mail_safe
+from app.models.notif_model import enqueue_mail
+from app.utils.mailer import ADMIN_TO
+from app.utils.cache import TTLCache
+from app.utils.pagination import decode_cursor, keyset_predicate, estimate_count, needs_estimate, page_meta
 
 # ========================== Helpers ==========================
 
@@ -25,6 +28,15 @@ def _get_user_role(cur, username: str) -> str:
     r = cur.fetchone()
     return _role_norm(r[0] if r else None)
 
+_role_cache = TTLCache(ttl=60, maxsize=4096)
+
+def get_user_role_cached(app_user: str) -> str:
+    """Rol normalizado del usuario, cacheado 60 s (lo usa el long-poll en cada espera)."""
+    def _load() -> str:
+        with get_conn(app_user) as (conn, cur):
+            return _get_user_role(cur, app_user)
+    return _role_cache.get_or_load(app_user.lower(), _load)
+
 def _get_user_email(cur, username: str) -> Optional[str]:
     cur.execute("SELECT usuario_email FROM inv.usuarios WHERE usuario_username=%s", (username,))
     r = cur.fetchone()
@@ -101,10 +113,8 @@ def _dedup_valid(emails: List[Optional[str]], exclude: Optional[str] = None) ->
 def create_incidencia(app_user: str, titulo: str, descripcion: str,
                       equipo_id: Optional[int] = None,
                       reportado_email: Optional[str] = None) -> Tuple[Optional[int], Optional[str]]:
-    with get_conn(app_user) as (conn, cur):
+    with get_conn(app_user, proc='incidencias.create') as (conn, cur):
         try:
-            cur.execute("SELECT set_config('app.proc', %s, true)", ('incidencias.create',))
-
             equipo_codigo, area_id_equipo, area_nombre_equipo = _get_equipo_area(cur, equipo_id)
             area_id = area_id_equipo
 
@@ -132,7 +142,7 @@ def create_incidencia(app_user: str, titulo: str, descripcion: str,
                 VALUES (%s, %s, %s, 'STAFF', 'NEW_INC')
             """, (inc_id, f"Nueva incidencia creada por {app_user}", 'sistema'))
 
-            # Correo a Admins (Reply-To del reportante)
+            # Correo a Admins (Reply-To del reportante) → outbox, se envía tras el commit
             cuerpo = [
                 f"Incidencia #{inc_id}",
                 f"Título: {titulo}",
@@ -147,10 +157,11 @@ def create_incidencia(app_user: str, titulo: str, descripcion: str,
             admins = _get_admin_emails(cur)
             to_list = _dedup_valid(admins)
 
-            send_mail_safe(
+            enqueue_mail(
+                cur, "NEW_INC",
                 subject=f"[INCIDENCIA #{inc_id}] {titulo}",
                 body="\n".join(cuerpo),
-                to=to_list or None,
+                to=to_list or ADMIN_TO,
                 reply_to=(reportado_email or _get_user_email(cur, app_user) or None),
                 from_name_extra=app_user,
                 enrich_subject_with_reporter=app_user,
@@ -167,28 +178,59 @@ def create_incidencia(app_user: str, titulo: str, descripcion: str,
 
 # =================== Listar incidencias ===================
 
+# Resaltado de ts_headline: el frontend parte por estas marcas (no es HTML confiable)
+_HEADLINE_OPTS = ('StartSel=<mark>, StopSel=</mark>, MaxWords=30, MinWords=10, '
+                  'MaxFragments=2, FragmentDelimiter=" … "')
+
+
 def list_incidencias(app_user: str, mine: bool=False, estado: Optional[str]=None,
                      page: int=1, size: int=10, q: Optional[str]=None,
-                     area_id: Optional[int]=None) -> Dict[str, Any]:
-
+                     area_id: Optional[int]=None, cursor: Optional[str]=None,
+                     count: str="exact", orden: Optional[str]=None) -> Dict[str, Any]:
+    """
+    `q`: búsqueda de texto completo en español (sql/006_incidencias_fts.sql) sobre
+    título, descripción y mensajes visibles para el rol, más código de equipo.
+    Con `q` el orden por defecto es por relevancia (orden="reciente" → por inc_id)
+    y cada ítem trae `rank` y `snippet` (coincidencias entre <mark></mark>).
+    `cursor` (opcional): keyset sobre el orden vigente ([rank,] inc_id DESC);
+    ignora `page` y no calcula total.
+    `count`: exact | estimate | none (ver app.utils.pagination).
+    Lanza ValueError si el cursor no es válido.
+    """
     p = max(1, int(page or 1))
     s = min(100, max(1, int(size or 10)))
     off = (p - 1) * s
+    q = (q or "").strip() or None
+    by_rank = bool(q) and (orden or "relevancia").lower() != "reciente"
+    after = decode_cursor(cursor, (float, int) if by_rank else (int,))
+    keyset = after is not None
+    exact = not keyset and count == "exact"
 
     with get_conn(app_user) as (conn, cur):
         rol = _get_user_role(cur, app_user)
-
-        sql = """
+        staff = rol != "USUARIO"
+
+        # solo count=exact paga el COUNT(*) OVER(): recorre todo el filtro
+        total_col = "COUNT(*) OVER()" if exact else "NULL::bigint"
+        # el reportante no busca en mensajes solo-staff
+        tsv = "(i.search_tsv || i.msgs_tsv_staff)" if staff else "i.search_tsv"
+        # q solo con stopwords -> tsq NULL -> ts_rank_cd NULL: rank 0 (el keyset
+        # necesita un valor no nulo; esas filas salen solo por código de equipo)
+        rank_expr = f"COALESCE(ts_rank_cd({tsv}, qq.tsq), 0)"
+        sql = f"""
           SELECT i.inc_id, i.titulo, i.descripcion, i.estado,
                  i.reportado_por, i.equipo_id, e.equipo_codigo,
                  i.area_id, a.area_nombre, i.created_at, i.asignado_a,
-                 COUNT(*) OVER() AS total_rows
+                 {total_col} AS total_rows,
+                 {rank_expr if q else "NULL::real"} AS rank,
+                 {f"ts_headline('spanish', COALESCE(i.titulo,'') || ' — ' || COALESCE(i.descripcion,''), qq.tsq, %s)" if q else "NULL::text"} AS snippet
           FROM inv.incidencias i
           LEFT JOIN inv.equipos e ON e.equipo_id = i.equipo_id
           LEFT JOIN inv.areas  a  ON a.area_id   = i.area_id
+          {"CROSS JOIN (SELECT inv.fn_inc_tsquery(%s) AS tsq) qq" if q else ""}
           WHERE 1=1
         """
-        params: List[Any] = []
+        params: List[Any] = [_HEADLINE_OPTS, q] if q else []
 
         if rol == "USUARIO":
             sql += " AND i.reportado_por = %s"
@@ -210,27 +252,58 @@ def list_incidencias(app_user: str, mine: bool=False, estado: Optional[str]=None
             params.append(area_id)
 
         if q:
-            like = f"%{q.lower()}%"
-            sql += " AND (LOWER(i.titulo) LIKE %s OR LOWER(i.descripcion) LIKE %s OR LOWER(COALESCE(e.equipo_codigo,'')) LIKE %s)"
-            params.extend([like, like, like])
-
-        sql += " ORDER BY i.inc_id DESC LIMIT %s OFFSET %s"
-        params.extend([s, off])
+            # GIN sobre search_tsv / msgs_tsv_staff; el equipo se resuelve a ids
+            # (ANY(ARRAY(...)) deja usar el índice de equipo_id en el mismo BitmapOr)
+            sql += f"""
+              AND (i.search_tsv @@ qq.tsq
+                   {"OR i.msgs_tsv_staff @@ qq.tsq" if staff else ""}
+                   OR i.equipo_id = ANY(ARRAY(
+                        SELECT e2.equipo_id FROM inv.equipos e2 WHERE e2.equipo_codigo ILIKE %s)))
+            """
+            params.append(f"%{q}%")
+
+        base_sql, base_params = sql, list(params)
+
+        order_keys = [("i.inc_id", "DESC")]
+        if by_rank:
+            order_keys.insert(0, (rank_expr, "DESC"))
+        if keyset:
+            pred, pred_params = keyset_predicate(order_keys, after)
+            sql += f" AND {pred}"
+            params.extend(pred_params)
+        sql += " ORDER BY " + ", ".join(f"{c} {d}" for c, d in order_keys)
+        if keyset:
+            sql += " LIMIT %s"
+            params.append(s + 1)
+        else:
+            sql += " LIMIT %s OFFSET %s"
+            params.extend([s if exact else s + 1, off])
 
         cur.execute(sql, params)
         rows = cur.fetchall()
 
+        estimate = None
+        if needs_estimate(rows, s, off, keyset, count):
+            estimate = estimate_count(cur, base_sql, base_params)
+
+    rows, meta = page_meta(rows, size=s, page=p, offset=off, keyset=keyset,
+                           count=count, total_idx=11,
+                           cursor_of=(lambda r: [float(r[12]), r[0]]) if by_rank else (lambda r: [r[0]]),
+                           estimate=estimate)
+
     items: List[Dict[str, Any]] = []
-    total = 0
     for r in rows:
-        total = r[11]
-        items.append({
+        it = {
             "inc_id": r[0], "titulo": r[1], "descripcion": r[2], "estado": r[3],
             "usuario": r[4], "equipo_id": r[5], "equipo_codigo": r[6],
             "area_id": r[7], "area_nombre": r[8], "created_at": r[9],
             "asignado_a": r[10],
-        })
-    return {"items": items, "total": int(total or 0), "page": p, "size": s}
+        }
+        if q:
+            it["rank"] = float(r[12] or 0)
+            it["snippet"] = r[13]
+        items.append(it)
+    return {"items": items, **meta}
 
 # =================== Detalle (oculta STAFF al USUARIO) ===================
 
@@ -296,12 +369,11 @@ def get_incidencia(app_user: str, inc_id: int) -> Optional[Dict[str, Any]]:
         "asignado_a": h[10], "mensajes": mensajes,
     }
 
-# =================== Mensajería (con correo inmediato) ===================
+# =================== Mensajería (correo vía outbox) ===================
 
 def add_mensaje(app_user: str, inc_id: int, cuerpo: str, solo_staff: bool=False) -> Tuple[Optional[int], Optional[str]]:
-    with get_conn(app_user) as (conn, cur):
+    with get_conn(app_user, proc='incidencias.add_msg') as (conn, cur):
         try:
-            cur.execute("SELECT set_config('app.proc', %s, true)", ('incidencias.add_msg',))
             vis = 'STAFF' if solo_staff else 'PUBLIC'
             cur.execute("""
                 INSERT INTO inv.incidencia_mensajes(inc_id, mensaje, usuario, visibilidad, tipo)
@@ -310,7 +382,7 @@ def add_mensaje(app_user: str, inc_id: int, cuerpo: str, solo_staff: bool=False)
             """, (inc_id, cuerpo, app_user, vis))
             msg_id = int(cur.fetchone()[0])
 
-            # ---- Correo ----
+            # ---- Correo (outbox) ----
             hdr = _get_inc_header(cur, inc_id)
             if hdr:
                 titulo = hdr["titulo"]
@@ -344,7 +416,8 @@ def add_mensaje(app_user: str, inc_id: int, cuerpo: str, solo_staff: bool=False)
                         "—",
                         "Este es un aviso automático del sistema de incidencias."
                     ]
-                    send_mail_safe(
+                    enqueue_mail(
+                        cur, "NEW_MSG" if not solo_staff else "NEW_MSG_STAFF",
                         subject=subject,
                         body="\n".join(body_lines),
                         to=to_list,
@@ -364,9 +437,8 @@ def add_mensaje(app_user: str, inc_id: int, cuerpo: str, solo_staff: bool=False)
             return None, f"No se pudo agregar el mensaje: {e}"
 
 def asignar_incidencia(app_user: str, inc_id: int, username: str) -> Optional[str]:
-    with get_conn(app_user) as (conn, cur):
+    with get_conn(app_user, proc='incidencias.assign') as (conn, cur):
         try:
-            cur.execute("SELECT set_config('app.proc', %s, true)", ('incidencias.assign',))
             cur.execute("""
                 UPDATE inv.incidencias
                 SET asignado_a=%s, estado='EN_PROCESO'
@@ -377,7 +449,7 @@ def asignar_incidencia(app_user: str, inc_id: int, username: str) -> Optional[st
                 VALUES (%s, %s, %s, 'STAFF', 'ASSIGNED')
             """, (inc_id, f"Incidencia asignada a {username}", app_user))
 
-            # ---- Correo a practicante asignado + admins ----
+            # ---- Correo a practicante asignado + admins (outbox) ----
             hdr = _get_inc_header(cur, inc_id)
             if hdr:
                 titulo = hdr["titulo"]
@@ -394,7 +466,8 @@ def asignar_incidencia(app_user: str, inc_id: int, username: str) -> Optional[st
                         "—",
                         "Este es un aviso automático del sistema de incidencias."
                     ])
-                    send_mail_safe(
+                    enqueue_mail(
+                        cur, "ASSIGNED",
                         subject=subject,
                         body=body,
                         to=to_list,
@@ -425,7 +498,7 @@ def set_estado(app_user: str, inc_id: int, estado: str) -> Optional[str]:
 
             cur.execute("UPDATE inv.incidencias SET estado=%s WHERE inc_id=%s", (estado, inc_id))
 
-            # ---- Correo al cerrar ----
+            # ---- Correo al cerrar (outbox) ----
             if estado == "CERRADA":
                 hdr = _get_inc_header(cur, inc_id)
                 if hdr:
@@ -446,7 +519,8 @@ def set_estado(app_user: str, inc_id: int, estado: str) -> Optional[str]:
                             "—",
                             "Este es un aviso automático del sistema de incidencias."
                         ])
-                        send_mail_safe(
+                        enqueue_mail(
+                            cur, "CLOSED",
                             subject=subject,
                             body=body,
                             to=to_list,
@@ -467,7 +541,30 @@ def set_estado(app_user: str, inc_id: int, estado: str) -> Optional[str]:
 
 # =================== Feed de notificaciones ===================
 
-def list_updates(app_user: str, since_id: Optional[int]) -> Dict[str, Any]:
+def is_update_visible(ev: Dict[str, Any], app_user: str, rol: str) -> bool:
+    """
+    Mismas reglas que list_updates, evaluadas en memoria sobre el payload de
+    LISTEN/NOTIFY (msg_id, tipo, visibilidad, usuario, reportado_por, asignado_a).
+    """
+    me = (app_user or "").lower()
+    if (ev.get("usuario") or "").lower() == me:
+        return False
+    if rol == "USUARIO":
+        return (ev.get("reportado_por") == app_user
+                and ev.get("visibilidad") == "PUBLIC"
+                and ev.get("tipo") == "MSG")
+    if rol == "PRACTICANTE":
+        return ev.get("asignado_a") == app_user
+    return True
+
+def list_updates(app_user: str, since_id: Optional[int],
+                 seen_upto: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Mensajes nuevos (msg_id > since_id) visibles para el usuario según su rol.
+    `seen_upto`: watermark ya confirmado antes de consultar; si el lote no se
+    cortó por el LIMIT, last_id avanza hasta él aunque esos mensajes no sean
+    visibles para este usuario (evita re-despertar al cliente por ellos).
+    """
     with get_conn(app_user) as (conn, cur):
         rol = _get_user_role(cur, app_user)
 
@@ -503,6 +600,9 @@ def list_updates(app_user: str, since_id: Optional[int]) -> Dict[str, Any]:
                 "titulo": r[7], "estado": r[8],
             })
 
+        if seen_upto is not None and len(rows) < 100:
+            last_id = max(last_id, int(seen_upto))
+
         if not rows and (since_id is None or since_id == 0):
             cur.execute("SELECT COALESCE(MAX(msg_id),0) FROM inv.incidencia_mensajes")
             last_id = int(cur.fetchone()[0] or 0)
@@ -0,0 +1,406 @@
+# app/models/item_import.py
+"""
+Importación masiva de ítems (POST /api/items/import, `flask items-import`).
+
+En vez de un CALL a sp_crear_item_con_ficha_en_area_id por ítem, el archivo
+se lee en streaming y se copia con COPY a una tabla temporal (`_items_import`,
+una fila por línea); todo lo demás son sentencias sobre el lote completo:
+
+  1. validación: campos requeridos, clase, área existente; las filas sin
+     código reciben uno del contador del (área, tipo) con una sola reserva
+     por grupo (app/models/code_counter.py); código repetido en el archivo o
+     ya existente en inv.items;
+  2. tipos faltantes → inv.item_tipos (como create_item_type);
+  3. atributos faltantes → sp_definir_atributo ('text', como la SP), uno por
+     (tipo, atributo) distinto, no por fila;
+  4. valores que no castean al data_type de su atributo → error de la fila
+     (inv.fn_spec_valor_ok, ver sql/012_items_import.sql);
+  5. INSERT de inv.items y de inv.spec_valores, y ficha_json de los nuevos.
+
+Las filas con error no se insertan y vuelven en el reporte con su número de
+línea; `strict` revierte todo si hay alguna, `dry_run` revierte siempre
+(el reporte es el mismo que daría la importación real).
+
+Formatos:
+  - csv: encabezado con codigo, clase, tipo (o tipo_nombre), area_id; cualquier
+    otra columna es un atributo. `codigo` puede quedar vacío (se asigna). Separador `,`, `;` o tabulador.
+  - ndjson: un objeto por línea {"codigo", "clase", "tipo_nombre", "area_id",
+    "specs": {...}}.
+"""
+import csv
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from app.db import get_conn
+from app.models.code_counter import ITEM_CODE_PAD
+from app.models.item_model import _spec_text
+from app.models.report_model import invalidates_counts
+from app.models.spec_model import attrs_defined
+
+IMPORT_FORMATS = ("csv", "ndjson")
+
+_BASE_COLS = {  # nombre de columna/clave aceptado -> campo
+    "codigo": "codigo", "item_codigo": "codigo",
+    "clase": "clase",
+    "tipo": "tipo", "tipo_nombre": "tipo",
+    "area_id": "area_id",
+}
+
+# Fila de staging: (fila, codigo, clase, tipo, area_id, specs) o error de parseo.
+_Row = Tuple[int, Optional[str], Optional[str], Optional[str], Optional[str], Dict[str, str]]
+
+
+def _clean(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _norm_specs(pairs: Iterable[Tuple[str, Any]]) -> Dict[str, str]:
+    """Specs como {nombre: texto}; sin vacíos y sin repetir nombre (sin importar mayúsculas)."""
+    out: Dict[str, str] = {}
+    seen: Dict[str, str] = {}
+    for k, v in pairs:
+        nombre = (k or "").strip()
+        val = _spec_text(v.strip() if isinstance(v, str) else v)
+        if not nombre or val is None:
+            continue
+        out.pop(seen.get(nombre.lower(), ""), None)  # el último gana
+        seen[nombre.lower()] = nombre
+        out[nombre] = val
+    return out
+
+
+def _parse_csv(lines: Iterable[str]) -> Iterator[Tuple[int, Optional[_Row], Optional[str]]]:
+    it = iter(lines)
+    header = next(it, None)
+    if header is None:
+        return
+    delim = max(",;\t", key=header.count)
+    reader = csv.reader(_chain(header, it), delimiter=delim)
+    cols = [c.strip() for c in next(reader)]
+    base = {i: _BASE_COLS[c.lower()] for i, c in enumerate(cols) if c.lower() in _BASE_COLS}
+    missing = {"clase", "tipo", "area_id"} - set(base.values())
+    if missing:
+        raise ValueError(f"Columnas requeridas en el encabezado: {', '.join(sorted(missing))}")
+    attrs = [(i, c) for i, c in enumerate(cols) if i not in base and c]
+
+    for rec in reader:
+        fila = reader.line_num
+        if not any(f.strip() for f in rec):
+            continue
+        if len(rec) > len(cols):
+            yield fila, None, f"La fila tiene {len(rec)} columnas (encabezado: {len(cols)})"
+            continue
+        rec += [""] * (len(cols) - len(rec))
+        f = {campo: _clean(rec[i]) for i, campo in base.items()}
+        specs = _norm_specs((c, rec[i]) for i, c in attrs)
+        yield fila, (fila, f.get("codigo"), f["clase"], f["tipo"], f["area_id"], specs), None
+
+
+def _parse_ndjson(lines: Iterable[str]) -> Iterator[Tuple[int, Optional[_Row], Optional[str]]]:
+    for fila, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            obj = json.loads(line)
+        except ValueError:
+            yield fila, None, "JSON inválido"
+            continue
+        if not isinstance(obj, dict):
+            yield fila, None, "Se esperaba un objeto JSON"
+            continue
+        f = {campo: _clean(obj.get(k)) for k, campo in _BASE_COLS.items() if obj.get(k) is not None}
+        specs = obj.get("specs") or {}
+        if not isinstance(specs, dict):
+            yield fila, None, "specs debe ser un objeto"
+            continue
+        try:
+            specs = _norm_specs(specs.items())
+        except ValueError:
+            yield fila, None, "specs: valor no escalar"
+            continue
+        yield fila, (fila, f.get("codigo"), f.get("clase"), f.get("tipo"), f.get("area_id"), specs), None
+
+
+def _chain(first: str, rest: Iterator[str]) -> Iterator[str]:
+    yield first
+    yield from rest
+
+
+# =========================
+# SQL del lote (sobre pg_temp._items_import)
+# =========================
+_STAGING_DDL = """
+DROP TABLE IF EXISTS pg_temp._items_import;
+CREATE TEMP TABLE _items_import (
+  fila          integer PRIMARY KEY,
+  codigo        text,
+  clase         text,
+  tipo          text,
+  area_id       text,
+  specs         jsonb NOT NULL,
+  item_tipo_id  bigint,
+  item_id       bigint,
+  codigo_asignado boolean NOT NULL DEFAULT false,
+  error         text
+) ON COMMIT DROP
+"""
+
+_VALIDATE_SQL = r"""
+UPDATE _items_import s SET error = CASE
+    WHEN s.clase IS NULL OR s.tipo IS NULL OR s.area_id IS NULL
+      THEN 'Datos requeridos: clase, tipo_nombre, area_id'
+    WHEN s.clase NOT IN ('COMPONENTE', 'PERIFERICO') THEN 'clase inválida'
+    WHEN s.area_id !~ '^\d{1,18}$' THEN 'area_id inválido'
+    WHEN NOT EXISTS (SELECT 1 FROM inv.areas a WHERE a.area_id = s.area_id::bigint)
+      THEN 'Área no encontrada'
+  END
+"""
+
+# Filas sin código: primero se adelantan los contadores con los códigos
+# explícitos del archivo y después se reserva un bloque por (área, tipo).
+_ASSIGN_CODES_SQL = """
+INSERT INTO inv.code_counters AS c (scope, prefix, last_value)
+SELECT 'item:' || area_id::bigint, upper(tipo), max(inv.fn_code_suffix(codigo, tipo))
+  FROM _items_import
+ WHERE codigo IS NOT NULL AND error IS NULL
+ GROUP BY 1, 2
+HAVING max(inv.fn_code_suffix(codigo, tipo)) IS NOT NULL
+ON CONFLICT (scope, prefix) DO UPDATE
+   SET last_value = GREATEST(c.last_value, EXCLUDED.last_value);
+
+WITH x AS (
+  SELECT fila, area_id::bigint AS area, upper(tipo) AS prefix,
+         row_number() OVER (PARTITION BY area_id::bigint, upper(tipo) ORDER BY fila) - 1 AS k
+    FROM _items_import
+   WHERE codigo IS NULL AND error IS NULL
+), r AS (
+  SELECT area, prefix, inv.fn_code_reserve('item:' || area, prefix, count(*)::int) AS primero
+    FROM x GROUP BY area, prefix
+)
+UPDATE _items_import s
+   SET codigo = r.prefix || lpad((r.primero + x.k)::text,
+                                 greatest(%(pad)s, length((r.primero + x.k)::text)), '0'),
+       codigo_asignado = true
+  FROM x JOIN r USING (area, prefix)
+ WHERE s.fila = x.fila
+"""
+
+_VALIDATE_CODES_SQL = """
+UPDATE _items_import s SET error = 'Código ya existe'
+ WHERE s.error IS NULL
+   AND EXISTS (SELECT 1 FROM inv.items i WHERE i.item_codigo = s.codigo);
+
+UPDATE _items_import s
+   SET error = 'Código repetido en el archivo (fila ' || d.primera || ')'
+  FROM (SELECT fila, first_value(fila) OVER (PARTITION BY codigo ORDER BY fila) AS primera
+          FROM _items_import WHERE codigo IS NOT NULL) d
+ WHERE d.fila = s.fila AND d.primera <> s.fila AND s.error IS NULL
+"""
+
+_TYPES_SQL = """
+WITH nuevos AS (
+  INSERT INTO inv.item_tipos(clase, nombre)
+  SELECT DISTINCT ON (clase, lower(tipo)) clase, tipo
+    FROM _items_import
+   WHERE error IS NULL
+   ORDER BY clase, lower(tipo), fila
+  ON CONFLICT (clase, lower(nombre)) DO NOTHING
+  RETURNING 1
+)
+SELECT count(*) FROM nuevos
+"""
+
+_RESOLVE_TYPES_SQL = """
+UPDATE _items_import s SET item_tipo_id = it.item_tipo_id
+  FROM inv.item_tipos it
+ WHERE it.clase = s.clase AND lower(it.nombre) = lower(s.tipo) AND s.error IS NULL
+"""
+
+# Un (clase, tipo, atributo) por atributo que el tipo no tiene; nombre de la primera fila.
+_MISSING_ATTRS_SQL = """
+SELECT DISTINCT ON (s.item_tipo_id, lower(kv.key)) s.clase, it.nombre, kv.key
+  FROM _items_import s
+  CROSS JOIN jsonb_object_keys(s.specs) AS kv(key)
+  JOIN inv.item_tipos it ON it.item_tipo_id = s.item_tipo_id
+ WHERE s.error IS NULL
+   AND NOT EXISTS (SELECT 1 FROM inv.spec_atributos sa
+                    WHERE sa.item_tipo_id = s.item_tipo_id
+                      AND lower(sa.nombre_attr) = lower(kv.key))
+ ORDER BY s.item_tipo_id, lower(kv.key), s.fila
+"""
+
+_SPEC_PAIRS = """
+  FROM _items_import s
+  CROSS JOIN jsonb_each_text(s.specs) AS kv(key, v)
+  JOIN inv.spec_atributos sa
+    ON sa.item_tipo_id = s.item_tipo_id AND lower(sa.nombre_attr) = lower(kv.key)
+"""
+
+_VALIDATE_SPECS_SQL = f"""
+UPDATE _items_import s
+   SET error = 'Valor inválido para ''' || x.nombre_attr || ''' (' || x.data_type || ')'
+  FROM (SELECT DISTINCT ON (s.fila) s.fila, sa.nombre_attr, sa.data_type
+        {_SPEC_PAIRS}
+         WHERE s.error IS NULL AND sa.data_type <> 'text'
+           AND NOT inv.fn_spec_valor_ok(kv.v, sa.data_type)
+         ORDER BY s.fila, lower(sa.nombre_attr)) x
+ WHERE x.fila = s.fila
+"""
+
+# ON CONFLICT: un código dado de alta en paralelo queda como error de su fila.
+_INSERT_ITEMS_SQL = """
+WITH ins AS (
+  INSERT INTO inv.items(item_codigo, item_tipo_id, clase, area_id)
+  SELECT codigo, item_tipo_id, clase, area_id::bigint
+    FROM _items_import
+   WHERE error IS NULL
+   ORDER BY fila
+  ON CONFLICT (item_codigo) DO NOTHING
+  RETURNING item_id, item_codigo
+)
+UPDATE _items_import s SET item_id = ins.item_id
+  FROM ins
+ WHERE ins.item_codigo = s.codigo AND s.error IS NULL;
+
+UPDATE _items_import SET error = 'Código ya existe' WHERE error IS NULL AND item_id IS NULL
+"""
+
+# mismo casteo por data_type que _SPECS_UPSERT_SQL (item_model)
+_INSERT_SPECS_SQL = f"""
+INSERT INTO inv.spec_valores(item_id, attr_id, val_text, val_int, val_numeric, val_bool, val_date)
+SELECT s.item_id, sa.attr_id,
+       CASE WHEN sa.data_type = 'text'    THEN kv.v END,
+       CASE WHEN sa.data_type = 'int'     THEN kv.v::bigint END,
+       CASE WHEN sa.data_type = 'numeric' THEN kv.v::numeric END,
+       CASE WHEN sa.data_type = 'bool'    THEN kv.v::boolean END,
+       CASE WHEN sa.data_type = 'date'    THEN kv.v::date END
+{_SPEC_PAIRS}
+ WHERE s.item_id IS NOT NULL
+"""
+
+
+def _run_script(cur, script: str, params: Optional[Dict[str, Any]] = None) -> None:
+    for stmt in script.split(";\n\n"):
+        cur.execute(stmt, params if params and "%(" in stmt else None)
+
+
+# =========================
+# Importación
+# =========================
+@invalidates_counts
+def import_items(
+    app_user: str,
+    lines: Iterable[str],
+    fmt: str = "csv",
+    dry_run: bool = False,
+    strict: bool = False,
+) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Importa ítems con sus specs desde `lines` (archivo de texto abierto o
+    cualquier iterable de líneas), en una sola transacción.
+    Devuelve ({"total", "valid", "inserted", "created_types", "created_attrs",
+    "assigned_codes": [{"fila", "codigo"}, ...], "errors": [{"fila", "codigo", "error"}, ...],
+    "dry_run", "rolled_back"}, None)
+    o (None, error) si el archivo no se puede leer.
+    """
+    if fmt not in IMPORT_FORMATS:
+        return None, f"format inválido (usar {', '.join(IMPORT_FORMATS)})"
+    parse = _parse_csv if fmt == "csv" else _parse_ndjson
+
+    errors: List[Dict[str, Any]] = []
+    created_attrs: List[Dict[str, str]] = []
+    try:
+        with get_conn(app_user, proc="items.import") as (conn, cur):
+            for stmt in _STAGING_DDL.strip().split(";\n"):
+                cur.execute(stmt)
+
+            total = 0
+            with cur.copy(
+                "COPY _items_import (fila, codigo, clase, tipo, area_id, specs) FROM STDIN"
+            ) as copy:
+                for fila, row, perr in parse(lines):
+                    total += 1
+                    if perr:
+                        errors.append({"fila": fila, "codigo": None, "error": perr})
+                        continue
+                    fila, codigo, clase, tipo, area_id, specs = row
+                    copy.write_row((fila, codigo, clase and clase.upper(), tipo, area_id,
+                                    json.dumps(specs, ensure_ascii=False)))
+            # las tablas temporales no las analiza autovacuum: se re-analiza al
+            # completar columnas para que los joins del lote sean hash joins
+            cur.execute("ANALYZE _items_import")
+
+            cur.execute(_VALIDATE_SQL)
+            cur.execute("SELECT EXISTS (SELECT 1 FROM _items_import WHERE codigo IS NULL AND error IS NULL)")
+            if cur.fetchone()[0]:
+                _run_script(cur, _ASSIGN_CODES_SQL, {"pad": ITEM_CODE_PAD})
+            _run_script(cur, _VALIDATE_CODES_SQL)
+            cur.execute(_TYPES_SQL)
+            created_types = int(cur.fetchone()[0])
+            cur.execute(_RESOLVE_TYPES_SQL)
+            cur.execute("ANALYZE _items_import")
+
+            cur.execute(_MISSING_ATTRS_SQL)
+            missing = cur.fetchall()
+            if missing:
+                cur.executemany("CALL inv.sp_definir_atributo(%s,%s,%s,'text',NULL)", missing)
+                created_attrs = [{"clase": c, "tipo": t, "attr": a} for c, t, a in missing]
+                for c, t in {(c, t) for c, t, _ in missing}:
+                    attrs_defined(c, t)
+
+            cur.execute(_VALIDATE_SPECS_SQL)
+            rollback = dry_run or (strict and (bool(errors) or _has_errors(cur)))
+            if not rollback or dry_run:
+                _run_script(cur, _INSERT_ITEMS_SQL)
+                cur.execute("ANALYZE _items_import")  # item_id recién asignado
+                cur.execute(_INSERT_SPECS_SQL)
+                # sin filas insertadas array_agg da NULL, que para la función es "todos"
+                cur.execute("""
+                    SELECT inv.fn_items_refresh_json(COALESCE(array_agg(item_id), '{}'), true, false)
+                      FROM _items_import WHERE item_id IS NOT NULL
+                """)
+                # códigos perdidos contra un alta concurrente (ON CONFLICT) también cuentan
+                if strict and _has_errors(cur):
+                    rollback = True
+
+            cur.execute("SELECT count(*) FROM _items_import WHERE error IS NULL")
+            valid = int(cur.fetchone()[0])
+            cur.execute("""
+                SELECT fila, codigo, error FROM _items_import
+                 WHERE error IS NOT NULL ORDER BY fila
+            """)
+            errors += [{"fila": r[0], "codigo": r[1], "error": r[2]} for r in cur.fetchall()]
+            cur.execute("""
+                SELECT fila, codigo FROM _items_import
+                 WHERE codigo_asignado AND error IS NULL ORDER BY fila
+            """)
+            assigned = [{"fila": r[0], "codigo": r[1]} for r in cur.fetchall()]
+
+            if rollback:
+                conn.rollback()
+            else:
+                cur.execute("DROP TABLE _items_import")
+    except ValueError as e:
+        return None, str(e)
+    except UnicodeDecodeError:
+        return None, "El archivo debe estar en UTF-8"
+
+    errors.sort(key=lambda e: e["fila"])
+    return {
+        "total": total,
+        "valid": valid,
+        "inserted": 0 if rollback else valid,
+        "created_types": created_types,   # con rolled_back: los que se crearían
+        "created_attrs": created_attrs,
+        "assigned_codes": assigned,
+        "errors": errors,
+        "dry_run": dry_run,
+        "rolled_back": rollback,
+    }, None
+
+
+def _has_errors(cur) -> bool:
+    cur.execute("SELECT EXISTS (SELECT 1 FROM _items_import WHERE error IS NOT NULL)")
+    return bool(cur.fetchone()[0])
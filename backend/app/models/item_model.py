@@ -1,7 +1,59 @@
 # app/models/item_model.py
-from typing import Optional, Any, Dict, List
+from typing import Optional, Any, Dict, FrozenSet, Iterable, List, Tuple
+import psycopg
 from psycopg.types.json import Json
 from app.db import get_conn
+from app.models.code_counter import ITEM_CODE_PAD, item_scope, peek_codes, reserve_codes
+from app.models.report_model import invalidates_counts
+from app.models.spec_model import _load_attr_catalog, attrs_defined, get_attr_catalog
+from app.utils.filters import SqlFilters
+from app.utils.pagination import decode_cursor, estimate_count, keyset_predicate, needs_estimate, page_meta
+
+# =========================
+# Proyecciones de ítems
+# =========================
+# Los listados leen de tablas base (alias `v`, mismas columnas que la vista
+# sin ficha/fotos). La ficha y las fotos ya armadas viven en inv.items
+# (ficha_json/fotos_json, ver sql/010_items_ficha_json.sql): se leen solo para
+# las filas ya paginadas y solo si el cliente pide esos campos (`fields=`).
+ITEMS_BASE_SQL = """(
+  SELECT i.item_id, i.item_codigo, it.clase, it.nombre AS tipo, i.estado,
+         i.area_id, i.creado_en AS created_at
+  FROM inv.items i
+  JOIN inv.item_tipos it ON it.item_tipo_id = i.item_tipo_id
+)"""
+
+ITEM_EXTRA_FIELDS = ("ficha", "fotos")
+
+
+def parse_fields(value: Optional[str], default: Iterable[str] = ()) -> FrozenSet[str]:
+    """
+    `fields=ficha,fotos` → campos pesados a incluir. Sin parámetro, `default`
+    (lo que devolvía el endpoint); con `fields=` (o solo campos livianos), ninguno.
+    """
+    if value is None:
+        return frozenset(default)
+    wanted = {f.strip().lower() for f in value.split(",")}
+    return frozenset(f for f in ITEM_EXTRA_FIELDS if f in wanted)
+
+
+def load_item_extras(cur, item_ids: List[int], fields: FrozenSet[str]) -> Dict[int, Dict[str, Any]]:
+    """ficha/fotos de los ítems dados (solo las columnas pedidas)."""
+    cols = [f for f in ITEM_EXTRA_FIELDS if f in fields]
+    if not cols or not item_ids:
+        return {}
+    cur.execute(
+        f"SELECT item_id, {', '.join(f'{c}_json' for c in cols)} FROM inv.items WHERE item_id = ANY(%s)",
+        (list(item_ids),),
+    )
+    return {r[0]: dict(zip(cols, r[1:])) for r in cur.fetchall()}
+
+
+def refresh_item_json(cur, item_ids: List[int], ficha: bool = True, fotos: bool = False) -> None:
+    """Recalcula ficha_json/fotos_json en la transacción en curso (tras escribir specs/fotos)."""
+    if item_ids:
+        cur.execute("SELECT inv.fn_items_refresh_json(%s::bigint[], %s, %s)", (list(item_ids), ficha, fotos))
+
 
 # =========================
 # Tipos de ítem
@@ -39,6 +91,7 @@ def create_item_type(app_user: str, clase: str, nombre: str) -> int:
 # =========================
 # Crear ítem EN subárea (usa la nueva SP por area_id)
 # =========================
+@invalidates_counts
 def create_item_with_specs(
     app_user: str,
     codigo: str,
@@ -56,17 +109,25 @@ def create_item_with_specs(
         row = cur.fetchone()
         if not row:
             raise Exception("No se pudo crear el ítem (no se encontró item_id)")
+        refresh_item_json(cur, [int(row[0])], ficha=True, fotos=True)
         return int(row[0])
 
 # =========================
-# Detalle de ítem (vista)
+# Detalle de ítem
 # =========================
-def get_item_detail(app_user: str, item_id: int) -> Optional[Dict[str, Any]]:
-    sql = """
-    SELECT item_id, item_codigo, clase, tipo, estado,
-           area_id, area_nombre, ficha, fotos, created_at
-    FROM inv.vw_items_con_ficha_y_fotos
-    WHERE item_id = %s
+def get_item_detail(
+    app_user: str, item_id: int, fields: FrozenSet[str] = frozenset(ITEM_EXTRA_FIELDS)
+) -> Optional[Dict[str, Any]]:
+    """`fields`: qué campos pesados (ficha, fotos) devolver; los no pedidos no se leen."""
+    ficha_col = "i.ficha_json" if "ficha" in fields else "NULL::jsonb"
+    fotos_col = "i.fotos_json" if "fotos" in fields else "NULL::jsonb"
+    sql = f"""
+    SELECT i.item_id, i.item_codigo, it.clase, it.nombre, i.estado,
+           i.area_id, a.area_nombre, {ficha_col}, {fotos_col}, i.creado_en
+    FROM inv.items i
+    JOIN inv.item_tipos it ON it.item_tipo_id = i.item_tipo_id
+    LEFT JOIN inv.areas a ON a.area_id = i.area_id
+    WHERE i.item_id = %s
     """
     with get_conn(app_user) as (conn, cur):
         cur.execute(sql, (item_id,))
@@ -93,7 +154,7 @@ def get_item_detail(app_user: str, item_id: int) -> Optional[Dict[str, Any]]:
                     })
     # ---------------------------------------------------------------------
 
-    return {
+    out = {
         "item_id": r[0],
         "item_codigo": r[1],
         "clase": r[2],
@@ -105,6 +166,10 @@ def get_item_detail(app_user: str, item_id: int) -> Optional[Dict[str, Any]]:
         "fotos": fotos_norm,
         "created_at": r[9],
     }
+    for f in ITEM_EXTRA_FIELDS:
+        if f not in fields:
+            out.pop(f)
+    return out
 
 # =========================
 # Specs: upsert atributo y valor
@@ -123,6 +188,7 @@ def upsert_attribute_and_value(
     with get_conn(app_user) as (conn, cur):
         cur.execute("CALL inv.sp_definir_atributo(%s,%s,%s,%s,NULL)",
                     (clase, tipo_nombre, nombre_attr, data_type))
+        attrs_defined(clase, tipo_nombre)
 
         cur.execute(
             """
@@ -161,8 +227,110 @@ def upsert_attribute_and_value(
                 f"INSERT INTO inv.spec_valores(item_id, attr_id, {col}) VALUES (%s,%s,%s)",
                 (item_id, attr_id, value),
             )
+        refresh_item_json(cur, [item_id], ficha=True)
     return None
 
+
+SPEC_DATA_TYPES = ("text", "int", "numeric", "bool", "date")
+
+# Un solo INSERT ... ON CONFLICT sobre arrays; el valor viaja como texto y se
+# castea solo en la columna de su tipo (las demás quedan NULL). El ON CONFLICT
+# usa ux_spec_valores_item_attr (sql/014_spec_valores_unique.sql).
+_SPECS_UPSERT_SQL = """
+INSERT INTO inv.spec_valores(item_id, attr_id, val_text, val_int, val_numeric, val_bool, val_date)
+SELECT %s, u.attr_id,
+       CASE WHEN u.dt = 'text'    THEN u.v END,
+       CASE WHEN u.dt = 'int'     THEN u.v::bigint END,
+       CASE WHEN u.dt = 'numeric' THEN u.v::numeric END,
+       CASE WHEN u.dt = 'bool'    THEN u.v::boolean END,
+       CASE WHEN u.dt = 'date'    THEN u.v::date END
+FROM unnest(%s::int[], %s::text[], %s::text[]) AS u(attr_id, dt, v)
+ON CONFLICT (item_id, attr_id) DO UPDATE
+   SET val_text    = EXCLUDED.val_text,
+       val_int     = EXCLUDED.val_int,
+       val_numeric = EXCLUDED.val_numeric,
+       val_bool    = EXCLUDED.val_bool,
+       val_date    = EXCLUDED.val_date
+"""
+
+
+def _spec_text(value: Any) -> Optional[str]:
+    if value is None or value == "":
+        return None
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (dict, list)):
+        raise ValueError("valor no escalar")
+    return str(value)
+
+
+def upsert_specs_batch(
+    app_user: str,
+    item_id: int,
+    specs: List[Dict[str, Any]],
+) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Guarda varios atributos de un ítem en una transacción.
+    `specs`: [{"attr": nombre, "value": v, "data_type": opcional}, ...].
+    El attr_id sale del catálogo en memoria del tipo del ítem (spec_model);
+    sp_definir_atributo solo corre para atributos que el tipo no tiene (con
+    `data_type`, 'text' por defecto). Un atributo existente se guarda con SU
+    data_type. Requiere el índice único (item_id, attr_id) de sql/014.
+    Devuelve ({"updated": n, "created_attrs": [...]}, None) o (None, error).
+    """
+    # normaliza y valida antes de abrir la transacción (el último gana si se repite)
+    wanted: Dict[str, Tuple[str, Optional[str], Optional[str]]] = {}
+    for spec in specs:
+        nombre = (spec.get("attr") or spec.get("nombre") or "").strip() if isinstance(spec, dict) else ""
+        if not nombre:
+            return None, "attr requerido en cada spec"
+        dt = (spec.get("data_type") or "").strip().lower() or None
+        if dt is not None and dt not in SPEC_DATA_TYPES:
+            return None, f"data_type inválido en '{nombre}'"
+        try:
+            val = _spec_text(spec.get("value"))
+        except ValueError:
+            return None, f"valor inválido en '{nombre}'"
+        wanted[nombre.lower()] = (nombre, dt, val)
+    if not wanted:
+        return {"updated": 0, "created_attrs": []}, None
+
+    try:
+        with get_conn(app_user) as (conn, cur):
+            cur.execute("""
+                SELECT it.clase, it.nombre
+                FROM inv.items i JOIN inv.item_tipos it ON it.item_tipo_id = i.item_tipo_id
+                WHERE i.item_id = %s
+            """, (item_id,))
+            r = cur.fetchone()
+            if not r:
+                return None, "Item no existe"
+            clase, tipo = r
+
+            catalog = get_attr_catalog(cur, clase, tipo)
+            unknown = [w for k, w in wanted.items() if k not in catalog]
+            if unknown:
+                cur.executemany("CALL inv.sp_definir_atributo(%s,%s,%s,%s,NULL)",
+                                [(clase, tipo, n, dt or "text") for n, dt, _ in unknown])
+                attrs_defined(clase, tipo)
+                # valor local: la definición puede revertirse junto con la transacción
+                catalog = _load_attr_catalog(cur, clase, tipo)
+
+            attr_ids, dts, vals = [], [], []
+            for k, (nombre, _, val) in wanted.items():
+                if k not in catalog:
+                    return None, f"No se pudo definir el atributo '{nombre}'"
+                attr_id, dt = catalog[k][:2]
+                attr_ids.append(attr_id)
+                dts.append(dt)
+                vals.append(val)
+
+            cur.execute(_SPECS_UPSERT_SQL, (item_id, attr_ids, dts, vals))
+            refresh_item_json(cur, [item_id], ficha=True)
+    except psycopg.errors.DataError as e:
+        return None, f"Valor inválido para el tipo del atributo: {e.diag.message_primary or e}"
+    return {"updated": len(attr_ids), "created_attrs": [n for n, _, _ in unknown]}, None
+
 # =========================
 # Fotos (media) → vía SP que recibe item_codigo
 # =========================
@@ -186,6 +354,7 @@ def add_photo(
             )
         except Exception as e:
             return f"No se pudo registrar la foto: {e}"
+        refresh_item_json(cur, [item_id], ficha=False, fotos=True)
     return None
 
 def remove_photo(app_user: str, item_id: int, url_or_path: str) -> Optional[str]:
@@ -200,66 +369,226 @@ def remove_photo(app_user: str, item_id: int, url_or_path: str) -> Optional[str]
             """, (item_id, url_or_path, url_or_path))
         except Exception as e:
             return f"No se pudo eliminar la foto en BD: {e}"
+        refresh_item_json(cur, [item_id], ficha=False, fotos=True)
     return None
 
 # =========================
-# Sugerencia de código
+# Búsqueda por specs (facetada)
 # =========================
-def suggest_next_code(app_user: str, clase: str, tipo_nombre: str, area_id: int) -> str:
+# Operadores por data_type del atributo. El valor se castea en SQL al tipo
+# de la columna (un valor mal formado → DataError → 400). Texto: solo
+# eq/in/prefix sobre lower(val_text), lo que sirve ix_spec_valores_text
+# (text_pattern_ops); los rangos no usarían el índice y se rechazan.
+_SPEC_COL = {  # data_type -> (expresión comparada, cast del valor, columna)
+    "text": ("lower(sv.val_text)", "text", "sv.val_text"),
+    "int": ("sv.val_int", "bigint", "sv.val_int"),
+    "numeric": ("sv.val_numeric", "numeric", "sv.val_numeric"),
+    "date": ("sv.val_date", "date", "sv.val_date"),
+    "bool": ("sv.val_bool", "boolean", "sv.val_bool"),
+}
+_SPEC_OPS = {"eq": "=", "gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+_SPEC_RANGE_TYPES = ("int", "numeric", "date")
+_FACET_VALUES_MAX = 20
+
+
+def _like_prefix(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def _spec_predicate(attr_id: int, data_type: str, op: str, value: Any) -> Tuple[str, List[Any]]:
     """
-    Sugerir el siguiente 'item_codigo' para el par (clase, tipo_nombre) dentro de un area_id.
-    Ejemplo: tipo_nombre='DISCO' -> DISCO01, DISCO02, ...
+    `v.item_id IN (SELECT ... FROM inv.spec_valores ...)` para un predicado;
+    ValueError si op/valor no aplican al data_type.
     """
-    prefix = (tipo_nombre or "").strip().upper()  # prefijo textual del tipo
+    col, cast, column = _SPEC_COL[data_type]
+    if value is None:
+        raise ValueError("valor requerido")
+    if data_type == "text":
+        value = [str(x).lower() for x in value] if isinstance(value, list) else str(value).lower()
+    if op == "eq" or (op in _SPEC_OPS and data_type in _SPEC_RANGE_TYPES):
+        if isinstance(value, (list, dict)):
+            raise ValueError("valor inválido")
+        cond, params = f"{col} {_SPEC_OPS[op]} %s::{cast}", [_spec_text(value)]
+    elif op == "between" and data_type in _SPEC_RANGE_TYPES:
+        if not (isinstance(value, list) and len(value) == 2):
+            raise ValueError("between espera [desde, hasta]")
+        lo, hi = (_spec_text(x) for x in value)
+        conds, params = [], []
+        if lo is not None:
+            conds.append(f"{col} >= %s::{cast}"); params.append(lo)
+        if hi is not None:
+            conds.append(f"{col} <= %s::{cast}"); params.append(hi)
+        cond = " AND ".join(conds) or "true"
+    elif op == "in":
+        if not isinstance(value, list) or not value:
+            raise ValueError("in espera una lista")
+        cond, params = f"{col} = ANY(%s::{cast}[])", [[_spec_text(x) for x in value]]
+    elif op == "prefix" and data_type == "text":
+        cond, params = f"{col} LIKE %s", [_like_prefix(str(value))]
+    else:
+        raise ValueError(f"operador '{op}' no válido para {data_type}")
+    sql = (f"v.item_id IN (SELECT sv.item_id FROM inv.spec_valores sv"
+           f" WHERE sv.attr_id = %s AND {column} IS NOT NULL AND {cond})")
+    return sql, [attr_id] + params
 
-    with get_conn(app_user) as (conn, cur):
-        # 1) Resolver item_tipo_id a partir de clase + tipo_nombre (case-insensitive)
-        cur.execute("""
-            SELECT it.item_tipo_id
-            FROM inv.item_tipos it
-            WHERE it.clase = %s AND lower(it.nombre) = lower(%s)
-            LIMIT 1
-        """, (clase, tipo_nombre))
-        row = cur.fetchone()
-        if not row:
-            # Si no existe el tipo, devolvemos prefijo NN empezando en 01
-            return f"{prefix}01"
 
-        item_tipo_id = int(row[0])
+def search_items(
+    app_user: str,
+    clase: str,
+    tipo_nombre: str,
+    specs: List[Dict[str, Any]],
+    estado: Optional[str] = None,
+    area_id: Optional[int] = None,
+    include_descendants: bool = False,
+    facets: Optional[List[str]] = None,
+    page: int = 1,
+    size: int = 20,
+    cursor: Optional[str] = None,
+    count: str = "exact",
+    fields: FrozenSet[str] = frozenset({"ficha"}),
+) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Ítems de un tipo filtrados por sus specs, con facetas.
+    `specs`: [{"attr": "capacidad_gb", "op": "gte", "value": 8}, ...]
+      op: eq | in | gt | gte | lt | lte | between ([desde, hasta]) | prefix (texto).
+      Rangos solo para int/numeric/date. Texto: sin distinguir mayúsculas. Los atributos se resuelven con el
+      catálogo del tipo (spec_model.get_attr_catalog) y su data_type elige
+      la columna val_* (índices de sql/011_spec_search_indexes.sql).
+    `facets`: atributos cuyos valores contar sobre el resultado completo (por
+      defecto todos los del tipo); hasta 20 valores por atributo, los más frecuentes.
+      Texto: agrupado sin distinguir mayúsculas como el filtro (se muestra una
+      de las grafías).
+    Paginación: keyset sobre (item_codigo, item_id) con `cursor`, o page/count
+    como los demás listados (ValueError si el cursor no es válido).
+    Devuelve (data, None) o (None, error).
+    """
+    p = max(1, int(page or 1))
+    s = min(100, max(1, int(size or 20)))
+    off = (p - 1) * s
+    after = decode_cursor(cursor, (str, int))
+    keyset = after is not None
+    exact = not keyset and count == "exact"
+    order_keys = [("v.item_codigo", "ASC"), ("v.item_id", "ASC")]
+
+    try:
+        with get_conn(app_user) as (conn, cur):
+            catalog = get_attr_catalog(cur, clase, tipo_nombre)
+            refreshed = False
+
+            f = SqlFilters()
+            f.eq("v.clase", clase)
+            f.ieq("v.tipo", tipo_nombre)
+            f.eq("v.estado", estado)
+            f.in_area("v.area_id", area_id, include_descendants)
+            for spec in specs:
+                nombre = str(spec.get("attr") or "").strip() if isinstance(spec, dict) else ""
+                attr = catalog.get(nombre.lower())
+                if not attr and not refreshed:
+                    # pudo definirse en otro proceso: se recarga la entrada una vez
+                    catalog = get_attr_catalog(cur, clase, tipo_nombre, refresh=True)
+                    refreshed = True
+                    attr = catalog.get(nombre.lower())
+                if not attr:
+                    return None, f"Atributo desconocido para {tipo_nombre}: '{nombre}'"
+                try:
+                    cond, params = _spec_predicate(attr[0], attr[1], str(spec.get("op") or "eq").lower(),
+                                                   spec.get("value"))
+                except ValueError as e:
+                    return None, f"'{nombre}': {e}"
+                f.add(cond, *params)
+
+            base_sql = f"SELECT v.item_id FROM {ITEMS_BASE_SQL} v WHERE true{f.and_sql()}"
+            sql = f"""
+              SELECT v.item_id, v.item_codigo, v.clase, v.tipo, v.estado, v.area_id, v.created_at,
+                     {"COUNT(*) OVER()" if exact else "NULL::bigint"} AS total_rows
+              FROM {ITEMS_BASE_SQL} v
+              WHERE true{f.and_sql()}
+            """
+            params: List[Any] = list(f.params)
+            if keyset:
+                pred, pred_params = keyset_predicate(order_keys, after)
+                sql += f" AND {pred}"
+                params.extend(pred_params)
+            sql += " ORDER BY " + ", ".join(f"{c} {d}" for c, d in order_keys)
+            if keyset:
+                sql += " LIMIT %s"
+                params.append(s + 1)
+            else:
+                sql += " LIMIT %s OFFSET %s"
+                params.extend([s if exact else s + 1, off])
+
+            cur.execute(sql, params)
+            rows = cur.fetchall()
+
+            estimate = None
+            if needs_estimate(rows, s, off, keyset, count):
+                estimate = estimate_count(cur, base_sql, f.params)
+
+            wanted = None if facets is None else {str(x).strip().lower() for x in facets}
+            facet_attrs = {a[0]: a for k, a in catalog.items() if wanted is None or k in wanted}
+            facet_rows: List[Any] = []
+            if facet_attrs:
+                # una pasada sobre spec_valores para todo el filtro (no solo la página)
+                cur.execute(f"""
+                  SELECT attr_id, val_text, val_int, val_numeric, val_bool, val_date, n
+                  FROM (
+                    SELECT sv.attr_id, min(sv.val_text) AS val_text,
+                           sv.val_int, sv.val_numeric, sv.val_bool, sv.val_date,
+                           COUNT(*) AS n,
+                           row_number() OVER (PARTITION BY sv.attr_id ORDER BY COUNT(*) DESC) AS rk
+                    FROM inv.spec_valores sv
+                    WHERE sv.item_id IN ({base_sql})
+                      AND sv.attr_id = ANY(%s)
+                    GROUP BY sv.attr_id, lower(sv.val_text), sv.val_int, sv.val_numeric, sv.val_bool, sv.val_date
+                  ) x
+                  WHERE rk <= %s
+                  ORDER BY attr_id, n DESC
+                """, f.params + [list(facet_attrs), _FACET_VALUES_MAX])
+                facet_rows = cur.fetchall()
+
+            rows, meta = page_meta(rows, size=s, page=p, offset=off, keyset=keyset, count=count,
+                                   total_idx=7, cursor_of=lambda r: [r[1], r[0]], estimate=estimate)
+            extras = load_item_extras(cur, [r[0] for r in rows], fields)
+    except psycopg.errors.DataError as e:
+        return None, f"Valor inválido: {e.diag.message_primary or e}"
+
+    items: List[Dict[str, Any]] = []
+    for r in rows:
+        item = {
+            "item_id": r[0], "item_codigo": r[1], "clase": r[2], "tipo": r[3],
+            "estado": r[4], "area_id": r[5], "created_at": r[6],
+        }
+        for fld in ITEM_EXTRA_FIELDS:
+            if fld in fields:
+                item[fld] = extras.get(r[0], {}).get(fld)
+        items.append(item)
+
+    valores: Dict[int, List[Dict[str, Any]]] = {}
+    for fr in facet_rows:
+        valor = next((x for x in fr[1:6] if x is not None), None)
+        valores.setdefault(fr[0], []).append({"valor": valor, "n": int(fr[6])})
+    facets_out = [
+        {"attr": a[2], "data_type": a[1], "valores": valores.get(aid, [])}
+        for aid, a in sorted(facet_attrs.items(), key=lambda kv: kv[1][2].lower())
+    ]
+    return {"items": items, "facets": facets_out, **meta}, None
 
-        # 2) Tomar últimos codigos existentes para ESE tipo y ESA area
-        #    - Primero ordenamos por creado_en DESC si existe, y respaldo por item_id DESC
-        #    - Limit 200 para no traer demasiados (suficiente para calcular el último número)
-        cur.execute("""
-            SELECT i.item_codigo
-            FROM inv.items i
-            WHERE i.item_tipo_id = %s
-              AND i.area_id = %s
-            ORDER BY i.creado_en DESC NULLS LAST, i.item_id DESC
-            LIMIT 200
-        """, (item_tipo_id, int(area_id)))
-        rows = cur.fetchall()
 
-    # 3) Buscar el mayor sufijo numérico para códigos que empiezan con el prefijo
-    last_num = 0
-    if rows:
-        for (code,) in rows:
-            if not code:
-                continue
-            c = str(code).strip().upper()
-            if not c.startswith(prefix):
-                continue
-            tail = c[len(prefix):]  # lo que viene después del prefijo
-            # Extraer solo dígitos del tail (p.ej. '001', '12', 'A12' -> '12')
-            digits = "".join(ch for ch in tail if ch.isdigit())
-            if not digits:
-                continue
-            try:
-                n = int(digits)
-                if n > last_num:
-                    last_num = n
-            except ValueError:
-                pass
-
-    # 4) Siguiente número, con 2 dígitos (ajusta a 3 o más si quieres)
-    return f"{prefix}{last_num + 1:02d}"
+# =========================
+# Sugerencia de código
+# =========================
+def suggest_next_codes(
+    app_user: str, clase: str, tipo_nombre: str, area_id: int,
+    count: int = 1, reserve: bool = False,
+) -> List[str]:
+    """
+    Siguientes `count` 'item_codigo' del tipo dentro de un area_id
+    (solo sugeridos; `reserve=True` los reserva).
+    Ejemplo: tipo_nombre='DISCO' -> DISCO01, DISCO02, ...
+    El contador es por (área, nombre del tipo), ver app/models/code_counter.py;
+    los códigos ya cargados a mano lo adelantan, así que no se repiten.
+    """
+    prefix = (tipo_nombre or "").strip().upper()  # prefijo textual del tipo
+    take = reserve_codes if reserve else peek_codes
+    with get_conn(app_user) as (conn, cur):
+        return take(cur, item_scope(area_id), prefix, count, ITEM_CODE_PAD)
@@ -1,6 +1,7 @@
 # app/models/media_model.py
 from typing import Optional
 from app.db import get_conn
+from app.models.item_model import refresh_item_json
 from psycopg.types.json import Json  # si lo usas en otros módulos, no estorba aquí
 
 
@@ -33,6 +34,7 @@ def add_media(
             )
         except Exception as e:
             return f"No se pudo registrar la imagen: {e}"
+        refresh_item_json(cur, [item_id], ficha=False, fotos=True)
     return None
 
 
@@ -53,8 +55,9 @@ def delete_media(app_user: str, item_id: int, path: str) -> Optional[str]:
                 (item_id, path),
             )
             row = cur.fetchone()
-            if row:
-                return None
-            return "No se encontró la imagen para eliminar"
+            if not row:
+                return "No se encontró la imagen para eliminar"
+            refresh_item_json(cur, [item_id], ficha=False, fotos=True)
+            return None
         except Exception as e:
             return f"Error al eliminar imagen: {e}"
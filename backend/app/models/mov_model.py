@@ -1,6 +1,9 @@
 # app/models/mov_model.py
+from datetime import datetime
 from typing import Optional, Any, Dict, List, Tuple
 from app.db import get_conn
+from app.utils.filters import SqlFilters
+from app.utils.pagination import decode_cursor, estimate_count, keyset_predicate, needs_estimate, page_meta
 
 
 def _where_and_params_mov(
@@ -20,21 +23,16 @@ def _where_and_params_mov(
       - USO/ALMACEN/MANTENIMIENTO/BAJA: también acepta EQUIPO_ESTADO(after = tipo)
     Nota: REPARACION no se filtra aquí (se trata como caso especial).
     """
-    sql = ""
-    params: List[Any] = []
+    f = SqlFilters()
 
-    # Fechas / ids
-    if desde:
-        sql += " AND m.mov_fecha::date >= %s::date"; params.append(desde)
-    if hasta:
-        sql += " AND m.mov_fecha::date <= %s::date"; params.append(hasta)
+    # Fechas (rango semiabierto, usa el índice de mov_fecha) / ids
+    f.date_range("m.mov_fecha", desde, hasta)
     if item_id:
-        sql += " AND m.mov_item_id = %s"; params.append(int(item_id))
+        f.add("m.mov_item_id = %s", int(item_id))
     if equipo_id:
-        sql += " AND m.mov_equipo_id = %s"; params.append(int(equipo_id))
+        f.add("m.mov_equipo_id = %s", int(equipo_id))
     if area_id:
-        sql += " AND (m.mov_origen_area_id = %s OR m.mov_destino_area_id = %s)"
-        params.extend([int(area_id), int(area_id)])
+        f.add("(m.mov_origen_area_id = %s OR m.mov_destino_area_id = %s)", int(area_id), int(area_id))
 
     # Tipo “inteligente”
     if tipo:
@@ -42,37 +40,37 @@ def _where_and_params_mov(
 
         # Préstamo / Retorno: TRASLADO con flags en detalle
         if t == "PRESTAMO":
-            sql += " AND m.mov_tipo='TRASLADO' AND COALESCE((m.mov_detalle->>'es_prestamo')::boolean,false)=true"
+            f.add("m.mov_tipo='TRASLADO' AND COALESCE((m.mov_detalle->>'es_prestamo')::boolean,false)=true")
         elif t == "RETORNO":
-            sql += " AND m.mov_tipo='TRASLADO' AND COALESCE((m.mov_detalle->>'devolucion')::boolean,false)=true"
+            f.add("m.mov_tipo='TRASLADO' AND COALESCE((m.mov_detalle->>'devolucion')::boolean,false)=true")
 
         # Estados de equipo: aceptar registros EQUIPO_ESTADO(after=t) además del literal
         elif t in ("USO", "ALMACEN", "MANTENIMIENTO", "BAJA"):
-            sql += " AND ( (m.mov_tipo=%s) OR (m.mov_tipo='EQUIPO_ESTADO' AND (m.mov_detalle->>'after')=%s) )"
-            params.extend([t, t])
+            f.add("( (m.mov_tipo=%s) OR (m.mov_tipo='EQUIPO_ESTADO' AND (m.mov_detalle->>'after')=%s) )", t, t)
 
         # Cualquier otro (excepto REPARACION, que es especial)
         elif t != "REPARACION":
-            sql += " AND m.mov_tipo = %s"
-            params.append(t)
+            f.eq("m.mov_tipo", t)
 
-    # Búsqueda libre
+    # Búsqueda libre por índice trigram (sql/005_search_trgm.sql):
+    #  - search_text = usuario + motivo + detalle del propio movimiento
+    #  - ítem/tipo/equipo se buscan en su tabla y se cruzan por id
     if q:
         like = f"%{q}%"
-        sql += """
-          AND (
-                i.item_codigo ILIKE %s
-            OR  it.nombre ILIKE %s
-            OR  COALESCE(e.equipo_codigo,'') ILIKE %s
-            OR  COALESCE(e.equipo_nombre,'') ILIKE %s
-            OR  COALESCE(m.mov_usuario_app,'') ILIKE %s
-            OR  COALESCE(m.mov_motivo,'') ILIKE %s
-            OR  m.mov_detalle::text ILIKE %s
-          )
-        """
-        params.extend([like, like, like, like, like, like, like])
-
-    return sql, params
+        f.add("""(
+                m.search_text ILIKE %s
+             OR m.mov_item_id IN (
+                  SELECT i2.item_id
+                    FROM inv.items i2
+                    LEFT JOIN inv.item_tipos it2 ON it2.item_tipo_id = i2.item_tipo_id
+                   WHERE i2.item_codigo ILIKE %s OR it2.nombre ILIKE %s)
+             OR m.mov_equipo_id IN (
+                  SELECT e2.equipo_id
+                    FROM inv.equipos e2
+                   WHERE e2.equipo_codigo ILIKE %s OR e2.equipo_nombre ILIKE %s)
+          )""", like, like, like, like, like)
+
+    return f.and_sql(), f.params
 
 
 def _where_and_params_audit(
@@ -80,34 +78,11 @@ def _where_and_params_audit(
     hasta: Optional[str],
     q: Optional[str],
 ) -> Tuple[str, List[Any]]:
-    sql = ""
-    params: List[Any] = []
-
-    if desde:
-        sql += " AND a.created_at::date >= %s::date"
-        params.append(desde)
-
-    if hasta:
-        sql += " AND a.created_at::date <= %s::date"
-        params.append(hasta)
-
-    if q:
-        like = f"%{q}%"
-        # Cast de entidad_id a texto para evitar problemas con ILIKE
-        sql += """
-          AND (
-               a.actor_user ILIKE %s
-            OR a.accion ILIKE %s
-            OR a.entidad ILIKE %s
-            OR COALESCE(a.entidad_id::text,'') ILIKE %s
-            OR COALESCE(a.extra::text,'') ILIKE %s
-            OR COALESCE(a.antes::text,'') ILIKE %s
-            OR COALESCE(a.despues::text,'') ILIKE %s
-          )
-        """
-        params.extend([like, like, like, like, like, like, like])
-
-    return sql, params
+    f = SqlFilters()
+    f.date_range("a.created_at", desde, hasta)
+    # actor/acción/entidad/id/extra/antes/después en search_text (índice trigram)
+    f.ilike_any(["a.search_text"], q)
+    return f.and_sql(), f.params
 
 
 def list_auditoria_flexible(
@@ -122,6 +97,8 @@ def list_auditoria_flexible(
     item_id: Optional[int] = None,
     equipo_id: Optional[int] = None,
     area_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    count: str = "exact",           # "exact" | "estimate" | "none"
 ) -> Dict[str, Any]:
     """
     Devuelve registros de:
@@ -130,11 +107,22 @@ def list_auditoria_flexible(
     - UNION ALL de ambos (cuando fuente=MIX)
 
     Estructura de salida compatible con la grilla actual.
+    `cursor` (opcional): keyset sobre (mov_fecha DESC, mov_id DESC[, es_audit DESC]);
+    ignora `page`, no cuenta el total y lanza ValueError si el cursor no es válido.
+    `count`: cómo se calcula `total` en modo página (ver app.utils.pagination);
+    con exact el total sale de la misma consulta de la página (una sola pasada).
     """
     p = max(1, int(page or 1))
     s = min(200, max(1, int(size or 20)))
     off = (p - 1) * s
 
+    # En MIX un mov y un audit pueden compartir fecha e id: es_audit desempata
+    order_keys = [("mov_fecha", "DESC"), ("mov_id", "DESC")]
+    if fuente not in ("MOV", "AUDIT"):
+        order_keys.append(("es_audit", "DESC"))
+    after = decode_cursor(cursor, (datetime, int, bool)[:len(order_keys)])
+    order_by = ", ".join(f"{c} {d}" for c, d in order_keys)
+
     # ----- SELECT MOV (base) -----
     sql_mov_base = """
       SELECT
@@ -167,71 +155,50 @@ def list_auditoria_flexible(
 
     mov_where, mov_params = _where_and_params_mov(tipo, desde, hasta, q, item_id, equipo_id, area_id)
 
-    # --- REPARACION: sintetiza eventos por ciclo USO -> MANTENIMIENTO -> USO ---
+    # --- REPARACION: ciclos USO -> MANTENIMIENTO -> USO ya cerrados ---
+    # (inv.equipo_reparaciones, mantenida por trigger; ver sql/008_equipo_reparaciones.sql)
     if (tipo or "").upper() == "REPARACION":
-        rep_filters = []
-        rep_params: List[Any] = []
-
-        if desde:
-            rep_filters.append("s.mov_fecha::date >= %s::date"); rep_params.append(desde)
-        if hasta:
-            rep_filters.append("s.mov_fecha::date <= %s::date"); rep_params.append(hasta)
+        rep = SqlFilters()
+        rep.date_range("r.inicio", desde, hasta)
         if equipo_id:
-            rep_filters.append("s.mov_equipo_id = %s"); rep_params.append(int(equipo_id))
+            rep.add("r.equipo_id = %s", int(equipo_id))
         if area_id:
-            rep_filters.append("s.equipo_area_id = %s"); rep_params.append(int(area_id))
-        if q:
-            like = f"%{q}%"
-            rep_filters.append("(s.equipo_codigo ILIKE %s OR s.equipo_nombre ILIKE %s)")
-            rep_params.extend([like, like])
+            rep.add("e.equipo_area_id = %s", int(area_id))
+        rep.ilike_any(["e.equipo_codigo", "e.equipo_nombre"], q)
 
         sql_mov = f"""
-          WITH estados AS (
-            SELECT
-              m.mov_id,
-              m.mov_fecha,
-              m.mov_equipo_id,
-              e.equipo_codigo,
-              e.equipo_nombre,
-              e.equipo_area_id,
-              (m.mov_detalle->>'before')::text AS before,
-              (m.mov_detalle->>'after')::text  AS after,
-              LAG( (m.mov_detalle->>'after')::text )
-                  OVER (PARTITION BY m.mov_equipo_id ORDER BY m.mov_fecha, m.mov_id) AS prev_after,
-              LEAD( (m.mov_detalle->>'after')::text )
-                  OVER (PARTITION BY m.mov_equipo_id ORDER BY m.mov_fecha, m.mov_id) AS next_after
-            FROM inv.movimientos m
-            JOIN inv.equipos e ON e.equipo_id = m.mov_equipo_id
-            WHERE m.mov_tipo = 'EQUIPO_ESTADO'
-          )
           SELECT
-            s.mov_id,                           -- 0
+            r.inicio_mov_id AS mov_id,          -- 0
             NULL::bigint AS mov_item_id,        -- 1
             NULL::text   AS item_codigo,        -- 2
             NULL::text   AS clase,              -- 3
             NULL::text   AS item_tipo,          -- 4
             'REPARACION'::text AS mov_tipo,     -- 5
-            s.mov_fecha,                        -- 6 (entrada a mantenimiento)
+            r.inicio AS mov_fecha,              -- 6 (entrada a mantenimiento)
             NULL::bigint AS mov_origen_area_id, -- 7
             NULL::text   AS origen_area_nombre, -- 8
             NULL::bigint AS mov_destino_area_id,-- 9
             NULL::text   AS destino_area_nombre,--10
-            s.mov_equipo_id,                    --11
-            s.equipo_codigo,                    --12
-            s.equipo_nombre,                    --13
+            r.equipo_id AS mov_equipo_id,       --11
+            e.equipo_codigo,                    --12
+            e.equipo_nombre,                    --13
             NULL::text   AS mov_usuario_app,    --14
             'ciclo_uso_mant_uso'::text AS mov_motivo, --15
             jsonb_build_object(
               'ciclo', 'USO->MANTENIMIENTO->USO',
-              'before', s.before,
-              'after',  s.after
+              'before', 'USO',
+              'after',  'MANTENIMIENTO',
+              'fin', r.fin,
+              'fin_mov_id', r.fin_mov_id,
+              'duracion_horas', round((extract(epoch FROM r.duracion) / 3600)::numeric, 2)
             ) AS mov_detalle,                   --16
             false AS es_audit                   --17
-          FROM estados s
-          WHERE s.after='MANTENIMIENTO' AND s.prev_after='USO' AND s.next_after='USO'
-          {("AND " + " AND ".join(rep_filters)) if rep_filters else ""}
+          FROM inv.equipo_reparaciones r
+          JOIN inv.equipos e ON e.equipo_id = r.equipo_id
+          WHERE r.fin IS NOT NULL
+          {rep.and_sql()}
         """
-        mov_params = rep_params  # importante: usar los params del caso especial
+        mov_params = rep.params  # importante: usar los params del caso especial
     else:
         sql_mov = sql_mov_base + mov_where
 
@@ -269,37 +236,42 @@ def list_auditoria_flexible(
     sql_audit = sql_audit_base + audit_where
 
     # ----- Ejecutar según fuente -----
-    with get_conn(app_user) as (conn, cur):
-        items: List[Dict[str, Any]] = []
-        total = 0
-
-        if fuente == "MOV":
-            cur.execute("SELECT COUNT(1) FROM (" + sql_mov + ") x", mov_params)
-            total = int(cur.fetchone()[0] or 0)
+    if fuente == "MOV":
+        sql_src, src_params = sql_mov, mov_params
+    elif fuente == "AUDIT":
+        sql_src, src_params = sql_audit, audit_params
+    else:  # MIX
+        sql_src, src_params = f"({sql_mov}) UNION ALL ({sql_audit})", mov_params + audit_params
 
-            sql_page = sql_mov + " ORDER BY mov_fecha DESC, mov_id DESC LIMIT %s OFFSET %s"
-            cur.execute(sql_page, mov_params + [s, off])
-            rows = cur.fetchall()
+    keyset = after is not None
+    exact = not keyset and count == "exact"
+    total_col = "COUNT(*) OVER()" if exact else "NULL::bigint"
 
-        elif fuente == "AUDIT":
-            cur.execute("SELECT COUNT(1) FROM (" + sql_audit + ") x", audit_params)
-            total = int(cur.fetchone()[0] or 0)
-
-            sql_page = sql_audit + " ORDER BY a.created_at DESC, a.audit_id DESC LIMIT %s OFFSET %s"
-            cur.execute(sql_page, audit_params + [s, off])
-            rows = cur.fetchall()
-
-        else:  # MIX
-            cur.execute(
-                "SELECT COUNT(1) FROM (" + f"({sql_mov}) UNION ALL ({sql_audit})" + ") z",
-                mov_params + audit_params
-            )
-            total = int(cur.fetchone()[0] or 0)
+    with get_conn(app_user) as (conn, cur):
+        items: List[Dict[str, Any]] = []
 
-            sql_union = f"({sql_mov}) UNION ALL ({sql_audit})"
-            sql_page = sql_union + " ORDER BY mov_fecha DESC, mov_id DESC LIMIT %s OFFSET %s"
-            cur.execute(sql_page, mov_params + audit_params + [s, off])
-            rows = cur.fetchall()
+        if keyset:
+            # La condición se empuja dentro del subquery / de cada rama del UNION,
+            # así el índice por fecha arranca en el cursor sin saltar filas.
+            pred, pred_params = keyset_predicate(order_keys, after)
+            sql_page = (f"SELECT *, {total_col} AS total_rows FROM ({sql_src}) x"
+                        f" WHERE {pred} ORDER BY {order_by} LIMIT %s")
+            cur.execute(sql_page, src_params + pred_params + [s + 1])
+        else:
+            sql_page = (f"SELECT *, {total_col} AS total_rows FROM ({sql_src}) x"
+                        f" ORDER BY {order_by} LIMIT %s OFFSET %s")
+            cur.execute(sql_page, src_params + [s if exact else s + 1, off])
+        rows = cur.fetchall()
+
+        estimate = None
+        if needs_estimate(rows, s, off, keyset, count):
+            estimate = estimate_count(cur, f"SELECT 1 FROM ({sql_src}) x", src_params)
+
+        rows, meta = page_meta(
+            rows, size=s, page=p, offset=off, keyset=keyset, count=count, total_idx=18,
+            cursor_of=lambda r: [r[6], r[0], bool(r[17])][:len(order_keys)],
+            estimate=estimate,
+        )
 
         for r in rows:
             items.append({
@@ -323,7 +295,7 @@ def list_auditoria_flexible(
                 "es_audit": bool(r[17]),
             })
 
-    return {"items": items, "total": int(total or 0), "page": p, "size": s}
+    return {"items": items, **meta}
 
 
 # ====== wrapper de compatibilidad (solo MOV) ======
@@ -0,0 +1,131 @@
+# app/models/notif_model.py
+from typing import Optional, Iterable, Dict, Any, List
+from psycopg.types.json import Json
+from app.db import get_conn
+
+# ============================================================
+# Outbox de correos (inv.notificaciones)
+#   - enqueue_mail(): se llama con el cursor de la transacción del evento
+#   - claim/mark_*: los usa el worker, cada uno en su propia transacción corta
+#     (isolated=True: también cuando el worker corre dentro de un request)
+# ============================================================
+
+def _as_list(addr: Optional[Iterable[str] | str]) -> List[str]:
+    if not addr:
+        return []
+    if isinstance(addr, str):
+        return [addr]
+    return [a for a in addr if a]
+
+
+def enqueue_mail(
+    cur,
+    tipo: str,
+    subject: str,
+    body: str,
+    to: Optional[Iterable[str] | str],
+    *,
+    reply_to: Optional[str] = None,
+    from_name_extra: Optional[str] = None,
+    extra_headers: Optional[Dict[str, Any]] = None,
+    enrich_subject_with_reporter: Optional[str] = None,
+) -> int:
+    """
+    Encola un correo por destinatario en inv.notificaciones usando el cursor
+    recibido (misma transacción que el evento). No abre conexión SMTP.
+    Devuelve cuántas filas se encolaron.
+    """
+    dest = _as_list(to)
+    if not dest:
+        return 0
+
+    if enrich_subject_with_reporter:
+        subject = f"{subject} · por {enrich_subject_with_reporter}"
+
+    headers = {k: str(v) for k, v in (extra_headers or {}).items() if v is not None}
+
+    cur.executemany("""
+        INSERT INTO inv.notificaciones(
+          tipo, destinatario_email, subject, body, reply_to, from_name, headers
+        ) VALUES (%s,%s,%s,%s,%s,%s,%s)
+    """, [
+        (tipo, email, subject, body, reply_to, from_name_extra, Json(headers) if headers else None)
+        for email in dest
+    ])
+    return len(dest)
+
+
+def claim_pending(app_user: str, limit: int = 100, lease_seconds: int = 300,
+                  max_intentos: int = 5) -> List[Dict[str, Any]]:
+    """
+    Reserva hasta `limit` correos pendientes (SKIP LOCKED) y los devuelve.
+    La reserva empuja proximo_intento `lease_seconds` hacia adelante: si el
+    worker muere a mitad de envío, otro los retoma al vencer el plazo.
+    """
+    with get_conn(app_user, isolated=True) as (conn, cur):
+        cur.execute("""
+            WITH c AS (
+              UPDATE inv.notificaciones n
+                 SET intentos = n.intentos + 1,
+                     proximo_intento = now() + make_interval(secs => %s)
+               WHERE n.notif_id IN (
+                 SELECT x.notif_id
+                 FROM inv.notificaciones x
+                 LEFT JOIN inv.usuarios u ON u.usuario_id = x.destinatario_usuario_id
+                 WHERE x.sent_at IS NULL
+                   AND x.proximo_intento <= now()
+                   AND x.intentos < %s
+                   AND COALESCE(x.destinatario_email, u.usuario_email, '') <> ''
+                 ORDER BY x.notif_id
+                 LIMIT %s
+                 FOR UPDATE OF x SKIP LOCKED
+               )
+              RETURNING n.notif_id, n.tipo, n.subject, n.body, n.destinatario_email,
+                        n.destinatario_usuario_id, n.reply_to, n.from_name, n.headers
+            )
+            SELECT c.notif_id, c.tipo, c.subject, c.body,
+                   COALESCE(c.destinatario_email, u.usuario_email),
+                   c.reply_to, c.from_name, c.headers
+            FROM c
+            LEFT JOIN inv.usuarios u ON u.usuario_id = c.destinatario_usuario_id
+            ORDER BY c.notif_id
+        """, (int(lease_seconds), int(max_intentos), int(limit)))
+        rows = cur.fetchall()
+
+    return [{
+        "notif_id": int(r[0]),
+        "tipo": r[1],
+        "subject": r[2],
+        "body": r[3],
+        "to": r[4],
+        "reply_to": r[5],
+        "from_name_extra": r[6],
+        "extra_headers": r[7] or None,
+    } for r in rows]
+
+
+def mark_sent(app_user: str, notif_ids: List[int]) -> None:
+    if not notif_ids:
+        return
+    with get_conn(app_user, isolated=True) as (conn, cur):
+        cur.execute("""
+            UPDATE inv.notificaciones
+               SET sent_at = now(), ultimo_error = NULL
+             WHERE notif_id = ANY(%s)
+        """, (notif_ids,))
+
+
+def mark_failed(app_user: str, notif_ids: List[int], error: str,
+                retry_base_seconds: int = 60) -> None:
+    """Reprograma con backoff exponencial según el número de intentos (máx. 1h)."""
+    if not notif_ids:
+        return
+    with get_conn(app_user, isolated=True) as (conn, cur):
+        cur.execute("""
+            UPDATE inv.notificaciones
+               SET ultimo_error = %s,
+                   proximo_intento = now() + make_interval(
+                     secs => LEAST(3600, %s * power(2, GREATEST(intentos - 1, 0)))
+                   )
+             WHERE notif_id = ANY(%s)
+        """, ((error or "")[:500], int(retry_base_seconds), notif_ids))
@@ -0,0 +1,165 @@
+# app/models/report_model.py
+from functools import wraps
+from typing import Any, Dict, Optional
+from app.config import Settings
+from app.db import after_commit, get_conn
+from app.utils.cache import TTLCache
+from app.utils.filters import SqlFilters
+
+# Contadores del dashboard: globales (no dependen del usuario) y muy leídos.
+_counts_cache = TTLCache(ttl=Settings.REPORTS_COUNTS_TTL, maxsize=4)
+
+# Una sola consulta: inv.items se recorre UNA vez (CTE `it`) y de ahí salen los
+# totales (FILTER) y los desgloses por estado y por área raíz.
+_COUNTS_SQL = """
+WITH RECURSIVE area_root AS (
+  SELECT a.area_id, a.area_id AS root_id
+  FROM inv.areas a
+  WHERE a.area_padre_id IS NULL
+  UNION ALL
+  SELECT c.area_id, r.root_id
+  FROM inv.areas c
+  JOIN area_root r ON c.area_padre_id = r.area_id
+),
+it AS (
+  SELECT i.clase, i.estado, r.root_id
+  FROM inv.items i
+  LEFT JOIN area_root r ON r.area_id = i.area_id
+),
+eq AS (
+  SELECT r.root_id, COUNT(*) AS n
+  FROM inv.equipos e
+  LEFT JOIN area_root r ON r.area_id = e.equipo_area_id
+  GROUP BY r.root_id
+),
+tot AS (
+  SELECT
+    COUNT(*) FILTER (WHERE clase = 'COMPONENTE') AS componentes,
+    COUNT(*) FILTER (WHERE clase = 'PERIFERICO') AS perifericos,
+    COUNT(*) FILTER (WHERE estado = 'ALMACEN')   AS en_almacen,
+    COUNT(*) FILTER (WHERE estado = 'EN_USO')    AS en_uso
+  FROM it
+)
+SELECT
+  (SELECT COUNT(*) FROM inv.areas)          AS areas,
+  (SELECT COALESCE(SUM(n), 0) FROM eq)      AS equipos,
+  tot.componentes,
+  tot.perifericos,
+  tot.en_almacen,
+  tot.en_uso,
+  (SELECT COALESCE(jsonb_object_agg(x.estado, x.n), '{}'::jsonb)
+     FROM (SELECT COALESCE(estado, 'SIN_ESTADO') AS estado, COUNT(*) AS n
+             FROM it GROUP BY 1) x)         AS por_estado,
+  (SELECT COALESCE(jsonb_agg(jsonb_build_object(
+              'area_id', a.area_id,
+              'nombre',  a.area_nombre,
+              'items',   COALESCE(ic.n, 0),
+              'equipos', COALESCE(eq.n, 0)
+           ) ORDER BY lower(a.area_nombre)), '[]'::jsonb)
+     FROM inv.areas a
+     LEFT JOIN (SELECT root_id, COUNT(*) AS n FROM it GROUP BY root_id) ic ON ic.root_id = a.area_id
+     LEFT JOIN eq ON eq.root_id = a.area_id
+    WHERE a.area_padre_id IS NULL)          AS por_area
+FROM tot
+"""
+
+
+def _load_counts(app_user: str) -> Dict[str, Any]:
+    with get_conn(app_user) as (conn, cur):
+        cur.execute(_COUNTS_SQL)
+        r = cur.fetchone()
+    return {
+        "areas": int(r[0] or 0),
+        "equipos": int(r[1] or 0),
+        "componentes": int(r[2] or 0),
+        "perifericos": int(r[3] or 0),
+        "en_almacen": int(r[4] or 0),
+        "en_uso": int(r[5] or 0),
+        "por_estado": r[6] or {},
+        "por_area": r[7] or [],
+    }
+
+
+def get_counts(app_user: str) -> Dict[str, Any]:
+    """
+    Contadores del dashboard, cacheados REPORTS_COUNTS_TTL s por proceso.
+    Las escrituras de áreas/equipos/ítems del proceso invalidan al terminar;
+    otros procesos ven el cambio al vencer el TTL.
+    """
+    return _counts_cache.get_or_load("counts", lambda: _load_counts(app_user))
+
+
+def invalidate_counts() -> None:
+    _counts_cache.invalidate()
+
+
+def invalidates_counts(fn):
+    """
+    Decorador para escrituras que cambian los contadores: invalida DESPUÉS del
+    COMMIT (si la función corre dentro de la transacción del request, al
+    confirmarse ésta), así ningún request vuelve a cachear el estado anterior.
+    """
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        result = fn(*args, **kwargs)
+        after_commit(invalidate_counts)
+        return result
+    return wrapper
+
+
+# ============================================================
+# Tiempo fuera de servicio por reparación
+# ============================================================
+def get_reparaciones(
+    app_user: str,
+    desde: Optional[str] = None,
+    hasta: Optional[str] = None,
+    area_id: Optional[int] = None,
+    equipo_id: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Ciclos USO -> MANTENIMIENTO -> USO por equipo (inv.equipo_reparaciones):
+    cantidad, horas fuera de servicio (total/promedio/máximo) de los ciclos
+    cerrados y si hay uno en curso. `desde`/`hasta` filtran por inicio del ciclo.
+    """
+    f = SqlFilters()
+    f.date_range("r.inicio", desde, hasta)
+    f.eq("e.equipo_area_id", area_id)
+    f.eq("r.equipo_id", equipo_id)
+    sql = f"""
+      SELECT e.equipo_id, e.equipo_codigo, e.equipo_nombre, e.equipo_area_id,
+             COUNT(r.fin)                                   AS ciclos,
+             COALESCE(SUM(extract(epoch FROM r.duracion)), 0) / 3600 AS horas_total,
+             AVG(extract(epoch FROM r.duracion)) / 3600     AS horas_promedio,
+             MAX(extract(epoch FROM r.duracion)) / 3600     AS horas_max,
+             MAX(r.inicio) FILTER (WHERE r.fin IS NULL)     AS en_curso_desde
+        FROM inv.equipo_reparaciones r
+        JOIN inv.equipos e ON e.equipo_id = r.equipo_id
+       WHERE true{f.and_sql()}
+       GROUP BY e.equipo_id
+       ORDER BY horas_total DESC, e.equipo_codigo
+    """
+    with get_conn(app_user) as (conn, cur):
+        cur.execute(sql, f.params)
+        rows = cur.fetchall()
+
+    def _h(v):
+        return round(float(v), 2) if v is not None else None
+
+    equipos = [{
+        "equipo_id": r[0],
+        "equipo_codigo": r[1],
+        "equipo_nombre": r[2],
+        "area_id": r[3],
+        "ciclos": int(r[4] or 0),
+        "horas_total": _h(r[5]),
+        "horas_promedio": _h(r[6]),
+        "horas_max": _h(r[7]),
+        "en_curso_desde": r[8].isoformat() if r[8] else None,
+    } for r in rows]
+    return {
+        "ciclos": sum(e["ciclos"] for e in equipos),
+        "horas_total": round(sum(e["horas_total"] or 0 for e in equipos), 2),
+        "en_curso": sum(1 for e in equipos if e["en_curso_desde"]),
+        "equipos": equipos,
+    }
@@ -1,5 +1,16 @@
-from typing import List, Dict
-from app.db import get_conn
+from typing import Dict, List, Tuple
+from app.config import Settings
+from app.db import after_commit, get_conn, has_pending, mark_pending
+from app.utils.cache import TTLCache
+
+# Catálogo de atributos por tipo:
+#   (clase, lower(tipo)) -> {lower(nombre): (attr_id, data_type, nombre)}.
+# Los atributos solo se agregan: un atributo nuevo en otro proceso aparece
+# como "desconocido", se define (no-op) y se recarga la entrada.
+# Quien define atributos llama a attrs_defined(): la entrada se invalida al
+# confirmar y, mientras tanto, esa transacción lee el catálogo sin caché (no
+# se cachean attr_ids que todavía pueden revertirse).
+_attr_catalog = TTLCache(ttl=Settings.SPEC_CATALOG_TTL, maxsize=512)
 
 def get_attrs_for_type(app_user: str, clase: str, tipo_nombre: str) -> List[Dict]:
     with get_conn(app_user) as (conn, cur):
@@ -17,3 +28,38 @@ def define_attr(app_user: str, clase: str, tipo_nombre: str, nombre_attr: str, d
     with get_conn(app_user) as (conn, cur):
         cur.execute("CALL inv.sp_definir_atributo(%s,%s,%s,%s,NULL)",
                     (clase, tipo_nombre, nombre_attr, data_type))
+        attrs_defined(clase, tipo_nombre)
+
+
+def _catalog_key(clase: str, tipo_nombre: str) -> Tuple[str, str]:
+    return (clase.upper(), tipo_nombre.strip().lower())
+
+
+def _load_attr_catalog(cur, clase: str, tipo_nombre: str) -> Dict[str, Tuple[int, str, str]]:
+    cur.execute("""
+      SELECT sa.attr_id, sa.nombre_attr, sa.data_type
+      FROM inv.spec_atributos sa
+      JOIN inv.item_tipos it ON it.item_tipo_id = sa.item_tipo_id
+      WHERE it.clase = %s AND lower(it.nombre) = lower(%s)
+    """, (clase, tipo_nombre))
+    return {r[1].lower(): (int(r[0]), r[2], r[1]) for r in cur.fetchall()}
+
+
+def get_attr_catalog(cur, clase: str, tipo_nombre: str, refresh: bool = False) -> Dict[str, Tuple[int, str, str]]:
+    """Atributos del tipo {lower(nombre): (attr_id, data_type, nombre)}, cacheados por proceso."""
+    key = _catalog_key(clase, tipo_nombre)
+    if has_pending("spec_atributos"):
+        return _load_attr_catalog(cur, clase, tipo_nombre)
+    if refresh:
+        _attr_catalog.invalidate(key)
+    return _attr_catalog.get_or_load(key, lambda: _load_attr_catalog(cur, clase, tipo_nombre))
+
+
+def invalidate_attr_catalog(clase: str, tipo_nombre: str) -> None:
+    _attr_catalog.invalidate(_catalog_key(clase, tipo_nombre))
+
+
+def attrs_defined(clase: str, tipo_nombre: str) -> None:
+    """La transacción en curso definió atributos del tipo: invalidar al confirmar."""
+    mark_pending("spec_atributos")
+    after_commit(lambda: invalidate_attr_catalog(clase, tipo_nombre))
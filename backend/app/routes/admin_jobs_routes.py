@@ -1,6 +1,7 @@
 from flask import Blueprint, jsonify
 from app.core.security import require_roles
 from app.jobs.notifs_job import send_pending_notifs
+from app.jobs.prestamos_job import rebuild_prestamos_activos
 
 bp = Blueprint("admin_jobs", __name__, url_prefix="/api/admin/jobs")
 
@@ -9,3 +10,9 @@ bp = Blueprint("admin_jobs", __name__, url_prefix="/api/admin/jobs")
 def run_send_notifs():
     n, ids = send_pending_notifs("admin-job")
     return jsonify({"sent": n, "ids": ids})
+
+@bp.post("/rebuild-prestamos")
+@require_roles(["ADMIN"])
+def run_rebuild_prestamos():
+    n = rebuild_prestamos_activos("admin-job")
+    return jsonify({"prestamos_activos": n})
@@ -0,0 +1,11 @@
+from flask import Blueprint, jsonify
+from app.core.security import require_roles
+from app.db import pool_metrics
+
+bp = Blueprint("admin_metrics", __name__, url_prefix="/api/admin/metrics")
+
+@bp.get("")
+@require_roles(["ADMIN"])
+def metrics():
+    # Para dimensionar DB_POOL_* por worker: esperas, conexiones en uso y errores
+    return jsonify({"pool": pool_metrics()})
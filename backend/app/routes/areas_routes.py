@@ -1,5 +1,7 @@
 from flask import Blueprint, jsonify, request
 from app.core.security import require_auth, require_admin
+from app.utils.pagination import parse_count_mode
+from app.models.item_model import parse_fields
 from app.models.area_model import (
     list_areas, list_root_areas, list_area_items,
     create_root_area, create_sub_area, get_area_info
@@ -27,11 +29,19 @@ def get_area_items(area_id: int):
     tipo  = request.args.get("tipo")            # nombre del tipo (p.ej. DISCO)
     fdes  = request.args.get("desde")           # YYYY-MM-DD
     fhas  = request.args.get("hasta")           # YYYY-MM-DD
+    cursor = request.args.get("cursor") or request.args.get("after")  # keyset (opcional)
+    count = parse_count_mode(request.args.get("count"))               # exact | estimate | none
+    incl = str(request.args.get("include_descendants", "")).lower() in ("1", "true", "yes")  # rama completa
+    fields = parse_fields(request.args.get("fields"), default=("ficha",))   # ficha,fotos | vacío = liviano
 
-    data = list_area_items(
-        request.claims["username"],
-        area_id, clase, estado, page, size, tipo, fdes, fhas
-    )
+    try:
+        data = list_area_items(
+            request.claims["username"],
+            area_id, clase, estado, page, size, tipo, fdes, fhas, cursor=cursor, count=count,
+            include_descendants=incl, fields=fields,
+        )
+    except ValueError:
+        return {"error": "cursor inválido"}, 400
     return jsonify(data)
 
 @bp.get("/<int:area_id>/info")
@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
 from app.core.security import require_auth, require_roles
+from app.utils.pagination import parse_count_mode
 from app.models.equipo_model import (
     list_area_equipos_paged,
     get_equipo_detalle,
@@ -8,7 +9,7 @@ from app.models.equipo_model import (
     assign_item_to_equipo,
     unassign_item,
     update_equipo_meta,
-    get_next_equipo_code,
+    get_next_equipo_codes,
     prestar_item,
     devolver_item,
 )
@@ -33,10 +34,17 @@ def equipos_de_area(area_id: int):
     fhas = request.args.get("hasta")
     page = request.args.get("page", type=int, default=1)
     size = request.args.get("size", type=int, default=10)
+    cursor = request.args.get("cursor") or request.args.get("after")  # keyset (opcional)
+    count = parse_count_mode(request.args.get("count"))               # exact | estimate | none
+    incl = str(request.args.get("include_descendants", "")).lower() in ("1", "true", "yes")  # rama completa
 
-    data = list_area_equipos_paged(
-        request.claims["username"], area_id, estado, fdes, fhas, page, size
-    )
+    try:
+        data = list_area_equipos_paged(
+            request.claims["username"], area_id, estado, fdes, fhas, page, size,
+            cursor=cursor, count=count, include_descendants=incl,
+        )
+    except ValueError:
+        return {"error": "cursor inválido"}, 400
     return jsonify(data)
 
 
@@ -51,7 +59,14 @@ def items_disponibles(area_id: int):
     size = request.args.get("size", type=int, default=10)
     tipo = request.args.get("tipo")
     q = request.args.get("q")
-    data = list_items_disponibles(request.claims["username"], area_id, clase, page, size, tipo, q)
+    cursor = request.args.get("cursor") or request.args.get("after")  # keyset (opcional)
+    count = parse_count_mode(request.args.get("count"))               # exact | estimate | none
+    incl = str(request.args.get("include_descendants", "")).lower() in ("1", "true", "yes")  # rama completa
+    try:
+        data = list_items_disponibles(request.claims["username"], area_id, clase, page, size, tipo, q,
+                                      cursor=cursor, count=count, include_descendants=incl)
+    except ValueError:
+        return {"error": "cursor inválido"}, 400
     return jsonify(data)
 
 
@@ -124,16 +139,31 @@ def editar_equipo(equipo_id: int):
     return {"ok": True}
 
 
+def _equipos_next_codes(area_id: int, args, reserve: bool):
+    prefix = args.get("prefix") or None
+    try:
+        codes = get_next_equipo_codes(
+            request.claims["username"], area_id, prefix,
+            int(args.get("pad") or 3), int(args.get("count", 1)), reserve=reserve,
+        )
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    return jsonify({"next_code": codes[0], "codes": codes})
+
+
 @bp.get("/areas/<int:area_id>/equipos/next-code")
 @require_auth
 def equipos_next_code(area_id: int):
-    prefix = request.args.get("prefix", default=None, type=str)
-    pad = request.args.get("pad", default=3, type=int)
-    try:
-        next_code = get_next_equipo_code(request.claims["username"], area_id, prefix, pad)
-        return jsonify({"next_code": next_code})
-    except Exception as e:
-        return {"error": f"No se pudo calcular el siguiente código: {e}"}, 400
+    """Sugerencia (sin reservar) para prellenar el formulario."""
+    return _equipos_next_codes(area_id, request.args, reserve=False)
+
+
+@bp.post("/areas/<int:area_id>/equipos/next-code:reserve")
+@require_auth
+@require_roles(["ADMIN", "PRACTICANTE"])
+def equipos_next_code_reserve(area_id: int):
+    """JSON: { "prefix": "PC-", "pad": 3, "count": 1 } → códigos reservados."""
+    return _equipos_next_codes(area_id, request.get_json(force=True) or {}, reserve=True)
 
 
 # -------- PRÉSTAMO / DEVOLUCIÓN -------------
@@ -1,6 +1,10 @@
 # app/routes/incidencias_routes.py
 from flask import Blueprint, request, jsonify
+from app.config import Settings
 from app.core.security import require_auth, require_roles
+from app.core.inc_events import hub
+from app.db import release_request_conn
+from app.utils.pagination import parse_count_mode
 from app.models.incidencia_model import (
     create_incidencia,
     list_incidencias,
@@ -9,6 +13,8 @@ from app.models.incidencia_model import (
     asignar_incidencia,
     set_estado,
     list_updates,
+    get_user_role_cached,
+    is_update_visible,
 )
 
 bp = Blueprint("incidencias", __name__, url_prefix="/api/incidencias")
@@ -59,16 +65,25 @@ def listar():
     q = request.args.get("q")
     area_id = request.args.get("area_id", type=int)
     mine = bool(str(request.args.get("mine", "")).lower() in ("1", "true", "yes"))
-
-    data = list_incidencias(
-        request.claims["username"],
-        mine=mine,
-        estado=estado,
-        page=page,
-        size=size,
-        q=q,
-        area_id=area_id,
-    )
+    cursor = request.args.get("cursor") or request.args.get("after")  # keyset (opcional)
+    count = parse_count_mode(request.args.get("count"))               # exact | estimate | none
+    orden = request.args.get("orden")                                 # relevancia (con q) | reciente
+
+    try:
+        data = list_incidencias(
+            request.claims["username"],
+            mine=mine,
+            estado=estado,
+            page=page,
+            size=size,
+            q=q,
+            area_id=area_id,
+            cursor=cursor,
+            count=count,
+            orden=orden,
+        )
+    except ValueError:
+        return jsonify({"error": "cursor inválido"}), 400
     return jsonify(data)
 
 # =========================
@@ -141,10 +156,30 @@ def estado(incidencia_id: int):
 
 # =========================
 # Pull incremental de notificaciones (notifier)
+#   ?wait=N  → long-poll: espera hasta N s (máx. INC_UPDATES_MAX_WAIT) a que
+#              haya mensajes nuevos VISIBLES para el usuario; los eventos llegan
+#              por el hub LISTEN/NOTIFY y mientras espera no consulta la BD.
 # =========================
 @bp.get("/updates")
 @require_auth
 def updates():
     since_id = request.args.get("since_id", type=int)
-    data = list_updates(request.claims["username"], since_id)
+    wait = request.args.get("wait", type=float, default=0) or 0
+    wait = min(max(0.0, wait), float(Settings.INC_UPDATES_MAX_WAIT))
+
+    if since_id is None or wait <= 0:
+        data = list_updates(request.claims["username"], since_id)
+        return jsonify(data)
+
+    username = request.claims["username"]
+    rol = get_user_role_cached(username)
+    # no retener la conexión del request durante la espera
+    release_request_conn()
+    must_query, last_id = hub.wait_for(
+        since_id, wait, lambda ev: is_update_visible(ev, username, rol)
+    )
+    if not must_query:
+        return jsonify({"items": [], "last_id": last_id})
+
+    data = list_updates(username, since_id, seen_upto=last_id)
     return jsonify(data)
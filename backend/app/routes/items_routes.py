@@ -1,12 +1,16 @@
 # app/routes/items_routes.py
+import io
 import os
 from flask import Blueprint, request, jsonify, current_app
 from app.core.security import require_auth, require_roles
 from app.models.item_model import (
     list_item_types, create_item_type, create_item_with_specs, get_item_detail,
-    upsert_attribute_and_value, add_photo, suggest_next_code, remove_photo
+    upsert_attribute_and_value, upsert_specs_batch, add_photo, suggest_next_codes, remove_photo,
+    parse_fields, search_items, ITEM_EXTRA_FIELDS,
 )
-from app.models.area_model import get_area_info
+from app.models.area_model import area_exists
+from app.models.item_import import import_items, IMPORT_FORMATS
+from app.utils.pagination import parse_count_mode
 
 bp = Blueprint("items", __name__, url_prefix="/api")
 
@@ -47,8 +51,7 @@ def create_item():
     if not codigo or not clase or not tipo or not area_id:
         return {"error": "Datos requeridos: codigo, clase, tipo_nombre, area_id"}, 400
 
-    info = get_area_info(request.claims["username"], int(area_id))
-    if not info:
+    if not area_exists(request.claims["username"], int(area_id)):
         return {"error": "Área no encontrada"}, 404
 
     try:
@@ -59,13 +62,98 @@ def create_item():
     except Exception as e:
         return {"error": str(e)}, 400
 
+# =========================
+# Importación masiva (CSV / JSON lines)
+# =========================
+def _flag(name: str) -> bool:
+    return (request.args.get(name) or "").lower() in ("1", "true", "yes")
+
+@bp.post("/items/import")
+@require_auth
+@require_roles(["ADMIN", "PRACTICANTE"])
+def items_import():
+    """
+    Cuerpo: el archivo tal cual (Content-Type text/csv o application/x-ndjson)
+    o multipart con campo `file`. Query: format=csv|ndjson (si no, se deduce
+    del Content-Type o la extensión), dry_run, strict.
+    Ver app/models/item_import.py para columnas y reporte.
+    """
+    f = request.files.get("file")
+    stream = f.stream if f else request.stream
+    fmt = (request.args.get("format") or "").lower()
+    if not fmt:
+        hint = f"{f.mimetype} {f.filename}" if f else request.mimetype
+        fmt = "ndjson" if "json" in (hint or "").lower() else "csv"
+    if fmt not in IMPORT_FORMATS:
+        return {"error": f"format inválido (usar {', '.join(IMPORT_FORMATS)})"}, 400
+
+    lines = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    report, err = import_items(
+        request.claims["username"], lines, fmt,
+        dry_run=_flag("dry_run"), strict=_flag("strict"),
+    )
+    if err:
+        return {"error": err}, 400
+    return report
+
+# =========================
+# Búsqueda por specs (facetada)
+# =========================
+@bp.post("/items/search")
+@require_auth
+def items_search():
+    """
+    JSON: {
+      "clase": "COMPONENTE", "tipo": "RAM",
+      "specs": [ {"attr": "capacidad_gb", "op": "gte", "value": 8},
+                 {"attr": "marca", "op": "prefix", "value": "king"} ],
+      "facets": ["marca", "capacidad_gb"],          // opcional (def. todos)
+      "estado": "ALMACEN", "area_id": 1, "include_descendants": true,
+      "page": 1, "size": 20, "cursor": null, "count": "exact", "fields": "ficha"
+    }
+    """
+    d = request.get_json(force=True) or {}
+    clase = (d.get("clase") or "").strip().upper()
+    tipo = (d.get("tipo") or d.get("tipo_nombre") or "").strip()
+    if clase not in ("COMPONENTE", "PERIFERICO") or not tipo:
+        return {"error": "clase y tipo requeridos"}, 400
+    specs = d.get("specs") or []
+    facets = d.get("facets")
+    if not isinstance(specs, list) or (facets is not None and not isinstance(facets, list)):
+        return {"error": "specs/facets deben ser listas"}, 400
+    try:
+        area_id = int(d["area_id"]) if d.get("area_id") is not None else None
+        page, size = int(d.get("page") or 1), int(d.get("size") or 20)
+    except (TypeError, ValueError):
+        return {"error": "area_id/page/size inválidos"}, 400
+    try:
+        data, err = search_items(
+            request.claims["username"], clase, tipo, specs,
+            estado=(d.get("estado") or None),
+            area_id=area_id,
+            include_descendants=bool(d.get("include_descendants")),
+            facets=facets,
+            page=page,
+            size=size,
+            cursor=d.get("cursor"),
+            count=parse_count_mode(d.get("count")),
+            fields=parse_fields(d.get("fields"), default=("ficha",)),
+        )
+    except ValueError:
+        return {"error": "cursor inválido"}, 400
+    if err:
+        return {"error": err}, 400
+    return jsonify(data)
+
 # =========================
 # Detalle
 # =========================
 @bp.get("/items/<int:item_id>")
 @require_auth
 def item_detail(item_id: int):
-    data = get_item_detail(request.claims["username"], item_id)
+    # fields=ficha,fotos (por defecto ambos); fields= vacío → solo cabecera
+    fields = parse_fields(request.args.get("fields"), default=ITEM_EXTRA_FIELDS)
+    data = get_item_detail(request.claims["username"], item_id, fields)
     if not data:
         return {"error": "No encontrado"}, 404
     return jsonify(data)
@@ -92,6 +180,25 @@ def item_upsert_spec(item_id: int):
         return {"error": err}, 400
     return {"ok": True}
 
+@bp.post("/items/<int:item_id>/specs:batch")
+@require_auth
+@require_roles(["ADMIN", "PRACTICANTE"])
+def item_upsert_specs_batch(item_id: int):
+    """
+    JSON: { "specs": [ { "attr": "rpm", "value": 7200, "data_type": "int" }, ... ] }
+    (acepta también { "specs": { "rpm": 7200, ... } } para atributos ya definidos)
+    """
+    d = request.get_json(force=True) or {}
+    specs = d.get("specs")
+    if isinstance(specs, dict):
+        specs = [{"attr": k, "value": v} for k, v in specs.items()]
+    if not isinstance(specs, list):
+        return {"error": "specs requerido (lista)"}, 400
+    res, err = upsert_specs_batch(request.claims["username"], item_id, specs)
+    if err:
+        return {"error": err}, 404 if err == "Item no existe" else 400
+    return {"ok": True, **res}
+
 # =========================
 # Fotos (atajos REST extras)
 # =========================
@@ -148,13 +255,28 @@ def delete_media(item_id: int):
 # =========================
 # Siguiente código sugerido
 # =========================
+def _next_codes(args, reserve: bool):
+    clase = (args.get("clase") or "").upper()
+    tipo  = (args.get("tipo") or "")
+    area_id = args.get("area_id")
+    if not clase or not tipo or not area_id:
+        return {"error": "clase, tipo, area_id requeridos"}, 400
+    try:
+        codes = suggest_next_codes(request.claims["username"], clase, tipo, int(area_id),
+                                   int(args.get("count", 1)), reserve=reserve)
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    return {"next_code": codes[0], "codes": codes}
+
 @bp.get("/items/next-code")
 @require_auth
 def next_code():
-    clase = (request.args.get("clase") or "").upper()
-    tipo  = (request.args.get("tipo") or "")
-    area_id = request.args.get("area_id")
-    if not clase or not tipo or not area_id:
-        return {"error": "clase, tipo, area_id requeridos"}, 400
-    code = suggest_next_code(request.claims["username"], clase, tipo, int(area_id))
-    return {"next_code": code}
+    """Sugerencia (sin reservar) para prellenar el formulario."""
+    return _next_codes(request.args, reserve=False)
+
+@bp.post("/items/next-code:reserve")
+@require_auth
+@require_roles(["ADMIN", "PRACTICANTE"])
+def next_code_reserve():
+    """JSON: { "clase", "tipo", "area_id", "count": 1 } → códigos reservados, no se repiten."""
+    return _next_codes(request.get_json(force=True) or {}, reserve=True)
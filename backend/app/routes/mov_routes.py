@@ -1,6 +1,7 @@
 # app/routes/mov_routes.py
 from flask import Blueprint, request, jsonify
 from app.core.security import require_auth
+from app.utils.pagination import parse_count_mode
 from app.models.mov_model import list_auditoria_flexible
 
 bp = Blueprint("mov", __name__, url_prefix="/api")
@@ -22,12 +23,18 @@ def movimientos_list():
     item_id   = request.args.get("item_id", type=int)
     equipo_id = request.args.get("equipo_id", type=int)
     area_id   = request.args.get("area_id", type=int)
+    cursor    = request.args.get("cursor") or request.args.get("after")  # keyset (opcional)
+    count     = parse_count_mode(request.args.get("count"))               # exact | estimate | none
 
-    data = list_auditoria_flexible(
-        request.claims["username"],
-        fuente=fuente,
-        page=page, size=size,
-        tipo=tipo, desde=desde, hasta=hasta, q=q,
-        item_id=item_id, equipo_id=equipo_id, area_id=area_id
-    )
+    try:
+        data = list_auditoria_flexible(
+            request.claims["username"],
+            fuente=fuente,
+            page=page, size=size,
+            tipo=tipo, desde=desde, hasta=hasta, q=q,
+            item_id=item_id, equipo_id=equipo_id, area_id=area_id,
+            cursor=cursor, count=count,
+        )
+    except ValueError:
+        return jsonify({"error": "cursor inválido"}), 400
     return jsonify(data)
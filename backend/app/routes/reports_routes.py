@@ -1,32 +1,25 @@
 # backend/app/routes/reports_routes.py
 from flask import Blueprint, jsonify, request
 from app.core.security import require_auth
-from app.db import get_conn
+from app.models.report_model import get_counts, get_reparaciones
 
 bp = Blueprint("reports", __name__, url_prefix="/api/reports")
 
 @bp.get("/counts")
 @require_auth
 def counts():
-    # Pasamos el username para auditoría (aunque sea solo lectura)
-    with get_conn(request.claims["username"]) as (conn, cur):
-        cur.execute("SELECT COUNT(*) FROM inv.areas")
-        areas = cur.fetchone()[0]
-        cur.execute("SELECT COUNT(*) FROM inv.equipos")
-        equipos = cur.fetchone()[0]
-        cur.execute("SELECT COUNT(*) FROM inv.items WHERE clase='COMPONENTE'")
-        componentes = cur.fetchone()[0]
-        cur.execute("SELECT COUNT(*) FROM inv.items WHERE clase='PERIFERICO'")
-        perifericos = cur.fetchone()[0]
-        cur.execute("SELECT COUNT(*) FROM inv.items WHERE estado='ALMACEN'")
-        en_almacen = cur.fetchone()[0]
-        cur.execute("SELECT COUNT(*) FROM inv.items WHERE estado='EN_USO'")
-        en_uso = cur.fetchone()[0]
-    return jsonify({
-        "areas": areas,
-        "equipos": equipos,
-        "componentes": componentes,
-        "perifericos": perifericos,
-        "en_almacen": en_almacen,
-        "en_uso": en_uso
-    })
+    # Una sola consulta agregada, servida desde caché en memoria (ver report_model)
+    return jsonify(get_counts(request.claims["username"]))
+
+
+@bp.get("/reparaciones")
+@require_auth
+def reparaciones():
+    # Tiempo fuera de servicio por equipo (ciclos USO -> MANTENIMIENTO -> USO)
+    return jsonify(get_reparaciones(
+        request.claims["username"],
+        desde=request.args.get("desde"),
+        hasta=request.args.get("hasta"),
+        area_id=request.args.get("area_id", type=int),
+        equipo_id=request.args.get("equipo_id", type=int),
+    ))
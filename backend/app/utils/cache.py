@@ -0,0 +1,83 @@
+# backend/app/utils/cache.py
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Caché en memoria del proceso con expiración por entrada.
+    Thread-safe; pensada para datos pequeños y muy leídos (roles, catálogos,
+    contadores). Cada worker de gunicorn tiene la suya: lo que se cachea aquí
+    debe tolerar `ttl` segundos de desfase entre procesos.
+
+    `invalidate(key)` incrementa la generación de esa clave (`invalidate()`,
+    la de toda la caché): un `get_or_load` de la clave que empezó a cargar
+    antes no guarda su valor (podría ser anterior al cambio). Las cargas de
+    otras claves no se ven afectadas.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 1024):
+        self.ttl = float(ttl)
+        self.maxsize = max(1, int(maxsize))
+        self._data: Dict[Hashable, Tuple[float, Any]] = {}
+        self._gen = 0                           # invalidate() sin clave
+        self._key_gen: Dict[Hashable, int] = {}  # invalidate(key)
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is None:
+                return default
+            expires, value = hit
+            if expires < time.monotonic():
+                self._data.pop(key, None)
+                return default
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        self._set(key, value, ttl, None)
+
+    def _gen_of(self, key: Hashable) -> Tuple[int, int]:
+        return self._gen, self._key_gen.get(key, 0)
+
+    def _set(self, key: Hashable, value: Any, ttl: Optional[float],
+             gen: Optional[Tuple[int, int]]) -> None:
+        expires = time.monotonic() + (self.ttl if ttl is None else float(ttl))
+        with self._lock:
+            if gen is not None and gen != self._gen_of(key):
+                return  # se invalidó mientras se cargaba
+            if len(self._data) >= self.maxsize and key not in self._data:
+                # descarta primero lo vencido; si no alcanza, la entrada más vieja
+                now = time.monotonic()
+                for k in [k for k, (e, _) in self._data.items() if e < now]:
+                    self._data.pop(k, None)
+                if len(self._data) >= self.maxsize:
+                    oldest = min(self._data, key=lambda k: self._data[k][0])
+                    self._data.pop(oldest, None)
+            self._data[key] = (expires, value)
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        with self._lock:
+            gen = self._gen_of(key)
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = loader()
+            self._set(key, value, None, gen)
+        return value
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Sin argumento vacía toda la caché."""
+        with self._lock:
+            if key is None or len(self._key_gen) >= 4 * self.maxsize:
+                # la generación global cubre todas las claves: se olvidan las propias
+                self._gen += 1
+                self._key_gen.clear()
+            if key is None:
+                self._data.clear()
+            else:
+                self._key_gen[key] = self._key_gen.get(key, 0) + 1
+                self._data.pop(key, None)
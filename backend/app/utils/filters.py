@@ -0,0 +1,80 @@
+# backend/app/utils/filters.py
+"""
+Armado de filtros WHERE compartido por los listados de los modelos.
+
+Fechas: `desde`/`hasta` ('YYYY-MM-DD', ambos inclusive) se compilan a un rango
+semiabierto sobre la columna tal cual:
+
+    col >= 'desde'::date  AND  col < 'hasta'::date + 1
+
+en vez de `col::date >= ...`, que impide usar el índice btree de la columna
+timestamp. El corte de día es el de la zona horaria de la sesión, igual que
+con el cast a date.
+
+Uso:
+    f = SqlFilters()
+    f.date_range("m.mov_fecha", desde, hasta)
+    f.eq("v.estado", estado)
+    f.ilike_any(["i.item_codigo", "it.nombre"], q)
+    f.in_area("v.area_id", area_id, include_descendants)
+    sql += f.and_sql(); params += f.params
+"""
+from typing import Any, List, Optional, Sequence
+
+
+class SqlFilters:
+    """Acumula condiciones (unidas con AND) y sus parámetros en orden."""
+
+    def __init__(self) -> None:
+        self.conds: List[str] = []
+        self.params: List[Any] = []
+
+    def add(self, cond: str, *params: Any) -> "SqlFilters":
+        self.conds.append(cond)
+        self.params.extend(params)
+        return self
+
+    def eq(self, col: str, value: Any) -> "SqlFilters":
+        """col = value (se omite si value es None o '')."""
+        if value is not None and value != "":
+            self.add(f"{col} = %s", value)
+        return self
+
+    def ieq(self, col: str, value: Optional[str]) -> "SqlFilters":
+        """lower(col) = lower(value), sin distinguir mayúsculas."""
+        if value:
+            self.add(f"lower({col}) = lower(%s)", value)
+        return self
+
+    def date_range(self, col: str, desde: Optional[str], hasta: Optional[str]) -> "SqlFilters":
+        """Días [desde, hasta] como rango semiabierto sobre la columna sin castear."""
+        if desde:
+            self.add(f"{col} >= %s::date", desde)
+        if hasta:
+            self.add(f"{col} < %s::date + 1", hasta)
+        return self
+
+    def in_area(self, col: str, area_id: Any, include_descendants: bool = False) -> "SqlFilters":
+        """col = area_id, o cualquier área de su subárbol (inv.area_closure, sql/009)."""
+        if area_id is None:
+            return self
+        if include_descendants:
+            return self.add(
+                f"{col} IN (SELECT ac.descendant_id FROM inv.area_closure ac WHERE ac.ancestor_id = %s)",
+                area_id,
+            )
+        return self.add(f"{col} = %s", area_id)
+
+    def ilike_any(self, cols: Sequence[str], q: Optional[str]) -> "SqlFilters":
+        """(col1 ILIKE %q% OR col2 ILIKE %q% ...)."""
+        if q and cols:
+            like = f"%{q}%"
+            self.add("(" + " OR ".join(f"{c} ILIKE %s" for c in cols) + ")", *([like] * len(cols)))
+        return self
+
+    def and_sql(self) -> str:
+        """Fragmento ' AND c1 AND c2 ...' para agregar a un WHERE existente ('' si no hay)."""
+        return "".join(f" AND {c}" for c in self.conds)
+
+    def __bool__(self) -> bool:
+        return bool(self.conds)
@@ -2,6 +2,8 @@
 import os
 import smtplib
 import ssl
+import threading
+import time
 from email.message import EmailMessage
 from email.utils import formataddr
 from typing import Iterable, Optional, Dict, Any
@@ -15,6 +17,11 @@ MAIL_FROM_NAME = os.getenv("MAIL_FROM_NAME", "Soporte TI")
 ADMIN_TO = os.getenv("MAIL_ADMIN_TO") or os.getenv("ADMIN_EMAIL") or MAIL_FROM
 
 MAIL_USE_SSL = os.getenv("MAIL_USE_SSL", "false").lower() in ("1", "true", "yes")
+# STARTTLS en 587; desactivable para un sink SMTP local (p.ej. `python -m aiosmtpd -n -l :2525`)
+MAIL_USE_TLS = os.getenv("MAIL_USE_TLS", "true").lower() in ("1", "true", "yes")
+MAIL_TIMEOUT = float(os.getenv("MAIL_TIMEOUT", "25"))
+MAIL_POOL_SIZE = int(os.getenv("MAIL_POOL_SIZE", "2"))            # sesiones ociosas a conservar
+MAIL_POOL_MAX_IDLE = float(os.getenv("MAIL_POOL_MAX_IDLE", "240"))  # seg. antes de descartar una sesión
 MAIL_DEBUG = int(os.getenv("MAIL_DEBUG", "0"))
 MAIL_CA_BUNDLE = os.getenv("MAIL_CA_BUNDLE")  # ruta opcional a .pem
 
@@ -80,8 +87,12 @@ def _build_message(
 
 
 # -----------------------------
-# SSL Context seguro
+# SSL Context seguro (se construye una sola vez)
 # -----------------------------
+_ssl_ctx: Optional[ssl.SSLContext] = None
+_ssl_lock = threading.Lock()
+
+
 def _make_ssl_context() -> ssl.SSLContext:
     """
     Construye un contexto SSL seguro con:
@@ -115,10 +126,110 @@ def _make_ssl_context() -> ssl.SSLContext:
     return ctx
 
 
+def _ssl_context() -> ssl.SSLContext:
+    """Contexto SSL compartido: cargar el CA bundle es caro, se hace una vez."""
+    global _ssl_ctx
+    if _ssl_ctx is None:
+        with _ssl_lock:
+            if _ssl_ctx is None:
+                _ssl_ctx = _make_ssl_context()
+    return _ssl_ctx
+
+
 # -----------------------------
-# Envío seguro de correos
+# Pool de sesiones SMTP autenticadas
 # -----------------------------
-def send_mail_safe(
+class SmtpPool:
+    """
+    Conserva hasta `size` sesiones SMTP ya conectadas (TLS + login) para
+    reutilizarlas entre mensajes. Una sesión ociosa más de `max_idle` segundos
+    se descarta; si lleva más de unos segundos sin uso se valida con NOOP.
+    """
+
+    NOOP_AFTER = 10.0
+
+    def __init__(self, size: int = MAIL_POOL_SIZE, max_idle: float = MAIL_POOL_MAX_IDLE):
+        self.size = max(0, int(size))
+        self.max_idle = float(max_idle)
+        self._idle: list[tuple[smtplib.SMTP, float]] = []
+        self._lock = threading.Lock()
+
+    def _connect(self) -> smtplib.SMTP:
+        if MAIL_USE_SSL:
+            # SSL directo (puerto 465)
+            s = smtplib.SMTP_SSL(MAIL_HOST, MAIL_PORT, timeout=MAIL_TIMEOUT, context=_ssl_context())
+            s.set_debuglevel(MAIL_DEBUG)
+        else:
+            # STARTTLS (puerto 587)
+            s = smtplib.SMTP(MAIL_HOST, MAIL_PORT, timeout=MAIL_TIMEOUT)
+            s.set_debuglevel(MAIL_DEBUG)
+            s.ehlo()
+            if MAIL_USE_TLS:
+                s.starttls(context=_ssl_context())  # ← TLS seguro
+                s.ehlo()
+        if MAIL_USER and MAIL_PASS:
+            s.login(MAIL_USER, MAIL_PASS)
+        return s
+
+    @staticmethod
+    def _close(s: smtplib.SMTP) -> None:
+        try:
+            s.quit()
+        except Exception:
+            try:
+                s.close()
+            except Exception:
+                pass
+
+    def acquire(self) -> smtplib.SMTP:
+        now = time.monotonic()
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                s, last = self._idle.pop()
+            if now - last > self.max_idle:
+                self._close(s)
+                continue
+            if now - last > self.NOOP_AFTER:
+                try:
+                    if s.noop()[0] != 250:
+                        raise smtplib.SMTPServerDisconnected("NOOP rechazado")
+                except Exception:
+                    self._close(s)
+                    continue
+            return s
+        return self._connect()
+
+    def release(self, s: smtplib.SMTP) -> None:
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append((s, time.monotonic()))
+                return
+        self._close(s)
+
+    def discard(self, s: Optional[smtplib.SMTP]) -> None:
+        if s is not None:
+            self._close(s)
+
+    def close_all(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for s, _ in idle:
+            self._close(s)
+
+
+_pool = SmtpPool()
+
+
+def _smtp_configured(dest: list[str]) -> bool:
+    if not (MAIL_HOST and MAIL_PORT and MAIL_FROM and dest):
+        print("[mailer] configuración SMTP incompleta; mensaje no enviado")
+        return False
+    return True
+
+
+def _prepare(
     subject: str,
     body: str,
     to: Optional[Iterable[str] | str] = None,
@@ -129,8 +240,8 @@ def send_mail_safe(
     from_name_extra: Optional[str] = None,
     extra_headers: Optional[Dict[str, Any]] = None,
     enrich_subject_with_reporter: Optional[str] = None,
-) -> bool:
-
+) -> tuple[Optional[EmailMessage], list[str]]:
+    """Arma (mensaje, destinatarios_smtp). Mensaje None si no hay destinatarios."""
     dest = _as_list(to) or _as_list(ADMIN_TO)
     cc_list = _as_list(cc)
     bcc_list = _as_list(bcc)
@@ -138,52 +249,101 @@ def send_mail_safe(
     if enrich_subject_with_reporter:
         subject = f"{subject} · por {enrich_subject_with_reporter}"
 
-    if not (MAIL_HOST and MAIL_PORT and MAIL_USER and MAIL_PASS and MAIL_FROM and dest):
-        print("[mailer] configuración SMTP incompleta; mensaje no enviado")
-        return False
-
-    try:
-        ctx = _make_ssl_context()
-
-        if MAIL_USE_SSL:
-            # SSL directo (puerto 465)
-            with smtplib.SMTP_SSL(MAIL_HOST, MAIL_PORT, timeout=25, context=ctx) as s:
-                s.set_debuglevel(MAIL_DEBUG)
-                s.login(MAIL_USER, MAIL_PASS)
-
-                msg = _build_message(
-                    subject, body, dest,
-                    reply_to=reply_to,
-                    cc=cc_list, bcc=bcc_list,
-                    from_name_extra=from_name_extra,
-                    extra_headers=extra_headers
-                )
+    if not dest:
+        return None, []
 
-                all_rcpt = dest + cc_list + getattr(msg, "_bcc", [])
-                s.send_message(msg, from_addr=MAIL_FROM, to_addrs=all_rcpt)
+    msg = _build_message(
+        subject, body, dest,
+        reply_to=reply_to,
+        cc=cc_list, bcc=bcc_list,
+        from_name_extra=from_name_extra,
+        extra_headers=extra_headers
+    )
+    return msg, dest + cc_list + getattr(msg, "_bcc", [])
 
-        else:
-            # STARTTLS (puerto 587)
-            with smtplib.SMTP(MAIL_HOST, MAIL_PORT, timeout=25) as s:
-                s.set_debuglevel(MAIL_DEBUG)
-                s.ehlo()
-                s.starttls(context=ctx)  # ← TLS seguro
-                s.ehlo()
-                s.login(MAIL_USER, MAIL_PASS)
 
-                msg = _build_message(
-                    subject, body, dest,
-                    reply_to=reply_to,
-                    cc=cc_list, bcc=bcc_list,
-                    from_name_extra=from_name_extra,
-                    extra_headers=extra_headers
-                )
+# -----------------------------
+# Envío por lotes sobre una sola sesión
+# -----------------------------
+def send_batch(messages: list[Dict[str, Any]]) -> list[bool]:
+    """
+    Envía varios correos reutilizando UNA sesión SMTP del pool.
+    Cada elemento de `messages` lleva los mismos argumentos que send_mail_safe.
+    Devuelve un bool por mensaje, en el mismo orden.
+    Si el servidor corta la sesión, reconecta una vez y reintenta el mensaje.
+    """
+    results = [False] * len(messages)
+    prepared = []
+    for i, m in enumerate(messages):
+        msg, rcpts = _prepare(**m)
+        if msg is not None and _smtp_configured(rcpts):
+            prepared.append((i, msg, rcpts))
+    if not prepared:
+        return results
+
+    s: Optional[smtplib.SMTP] = None
+    try:
+        s = _pool.acquire()
+        for i, msg, rcpts in prepared:
+            for attempt in (1, 2):
+                try:
+                    s.send_message(msg, from_addr=MAIL_FROM, to_addrs=rcpts)
+                    results[i] = True
+                    break
+                except smtplib.SMTPServerDisconnected as e:
+                    err: Exception = e
+                except smtplib.SMTPException as e:
+                    # rechazo de este mensaje (destinatario, tamaño…): seguimos con el resto.
+                    # Va antes que OSError: SMTPException es subclase de OSError.
+                    print(f"[mailer] error enviando correo: {e}")
+                    try:
+                        s.rset()
+                    except Exception:
+                        _pool.discard(s)
+                        s = _pool.acquire()
+                    break
+                except OSError as e:  # socket caído / timeout
+                    err = e
+                # sesión caída: se descarta y se reintenta el mensaje una vez
+                _pool.discard(s)
+                s = None
+                if attempt == 2:
+                    raise err
+                print(f"[mailer] sesión SMTP caída, reconectando: {err}")
+                s = _pool.acquire()
+        _pool.release(s)
+        s = None
+    except Exception as e:
+        print(f"[mailer] error enviando correo: {e}")
+    finally:
+        _pool.discard(s)
 
-                all_rcpt = dest + cc_list + getattr(msg, "_bcc", [])
-                s.send_message(msg, from_addr=MAIL_FROM, to_addrs=all_rcpt)
+    return results
 
-        return True
 
-    except Exception as e:
-        print(f"[mailer] error enviando correo: {e}")
-        return False
+# -----------------------------
+# Envío seguro de correos
+# -----------------------------
+def send_mail_safe(
+    subject: str,
+    body: str,
+    to: Optional[Iterable[str] | str] = None,
+    *,
+    reply_to: Optional[str] = None,
+    cc: Optional[Iterable[str] | str] = None,
+    bcc: Optional[Iterable[str] | str] = None,
+    from_name_extra: Optional[str] = None,
+    extra_headers: Optional[Dict[str, Any]] = None,
+    enrich_subject_with_reporter: Optional[str] = None,
+) -> bool:
+    return send_batch([{
+        "subject": subject,
+        "body": body,
+        "to": to,
+        "reply_to": reply_to,
+        "cc": cc,
+        "bcc": bcc,
+        "from_name_extra": from_name_extra,
+        "extra_headers": extra_headers,
+        "enrich_subject_with_reporter": enrich_subject_with_reporter,
+    }])[0]
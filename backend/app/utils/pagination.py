@@ -0,0 +1,168 @@
+# backend/app/utils/pagination.py
+"""
+Paginación por cursor (keyset).
+
+En vez de LIMIT/OFFSET, el cliente devuelve el cursor opaco de la página
+anterior y la consulta arranca con `WHERE (claves) > (valores del cursor)`,
+así la página 500 cuesta lo mismo que la 1 (el índice salta directo).
+
+Convención de los listados:
+  - Se piden size+1 filas; si sobra una, hay más (has_more) y el cursor
+    se arma con las claves de la última fila devuelta.
+  - En modo cursor no se calcula `total` (ese COUNT es justo lo que se evita).
+  - Las claves deben ser NOT NULL y terminar en una columna única (id).
+
+Conteo del total en modo página (`count=`):
+  - exact    → COUNT(*) OVER() en la misma consulta (materializa todo el filtro).
+  - estimate → estimación del planner (EXPLAIN), solo si hay más páginas.
+  - none     → sin total; has_more sale de pedir size+1 filas.
+"""
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+COUNT_MODES = ("exact", "estimate", "none")
+
+
+def _enc(v: Any) -> Any:
+    if isinstance(v, datetime):
+        return {"dt": v.isoformat()}
+    if isinstance(v, date):
+        return {"d": v.isoformat()}
+    return v
+
+
+def _dec(v: Any) -> Any:
+    if isinstance(v, dict):
+        if "dt" in v:
+            return datetime.fromisoformat(v["dt"])
+        if "d" in v:
+            return date.fromisoformat(v["d"])
+        raise ValueError("cursor inválido")
+    return v
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps([_enc(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], types: Sequence[type]) -> Optional[List[Any]]:
+    """
+    Devuelve la lista de valores o None si no vino cursor.
+    `types` valida cantidad y tipo de cada clave; cualquier cosa rara → ValueError
+    (las rutas responden 400 "cursor inválido").
+    """
+    if not cursor:
+        return None
+    try:
+        pad = "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(cursor + pad).decode("utf-8"))
+        values = [_dec(v) for v in data]
+    except Exception:
+        raise ValueError("cursor inválido")
+    if not isinstance(data, list) or len(values) != len(types):
+        raise ValueError("cursor inválido")
+    for v, t in zip(values, types):
+        # bool es subclase de int: se compara el tipo exacto
+        if type(v) is not t and not (t is float and type(v) is int):
+            raise ValueError("cursor inválido")
+    return values
+
+
+def keyset_predicate(keys: Sequence[Tuple[str, str]], values: Sequence[Any]) -> Tuple[str, List[Any]]:
+    """
+    Condición "fila posterior al cursor" para un ORDER BY dado como
+    [(expresión, "ASC"|"DESC"), ...].
+    Con una sola dirección usa comparación de filas (aprovecha índices
+    compuestos); con direcciones mezcladas la expande en ORs.
+    """
+    dirs = {d.upper() for _, d in keys}
+    if len(dirs) == 1:
+        op = "<" if "DESC" in dirs else ">"
+        cols = ", ".join(e for e, _ in keys)
+        marks = ", ".join(["%s"] * len(keys))
+        return f"({cols}) {op} ({marks})", list(values)
+
+    ors: List[str] = []
+    params: List[Any] = []
+    for i, (expr, d) in enumerate(keys):
+        conds: List[str] = []
+        for j in range(i):
+            conds.append(f"{keys[j][0]} = %s")
+            params.append(values[j])
+        conds.append(f"{expr} {'<' if d.upper() == 'DESC' else '>'} %s")
+        params.append(values[i])
+        ors.append("(" + " AND ".join(conds) + ")")
+    return "(" + " OR ".join(ors) + ")", params
+
+
+def parse_count_mode(value: Optional[str]) -> str:
+    v = (value or "exact").strip().lower()
+    return v if v in COUNT_MODES else "exact"
+
+
+def estimate_count(cur, sql: str, params: Any) -> int:
+    """Filas estimadas por el planner para `sql` (si el plan empieza en LIMIT, se mira debajo)."""
+    cur.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+    plan = cur.fetchone()[0][0]["Plan"]
+    while plan.get("Node Type") == "Limit" and plan.get("Plans"):
+        plan = plan["Plans"][0]
+    return int(plan.get("Plan Rows") or 0)
+
+
+def needs_estimate(rows: List[Any], size: int, offset: int, keyset: bool, count: str) -> bool:
+    """Con count=estimate solo se consulta al planner si el total no sale de la propia página."""
+    if keyset or count != "estimate":
+        return False
+    return len(rows) > size or (not rows and offset > 0)
+
+
+def page_meta(
+    rows: List[Any],
+    *,
+    size: int,
+    page: int,
+    offset: int,
+    keyset: bool,
+    count: str,
+    total_idx: int,
+    cursor_of: Callable[[Any], Sequence[Any]],
+    estimate: Optional[int] = None,
+) -> Tuple[List[Any], Dict[str, Any]]:
+    """
+    Recorta `rows` y arma los metadatos comunes de un listado paginado.
+    En modo cursor o con count != exact las filas se pidieron con LIMIT size+1;
+    con count=exact se pidieron `size` y el total viene en rows[*][total_idx].
+    """
+    if keyset or count != "exact":
+        has_more = len(rows) > size
+        rows = rows[:size]
+        total = None
+    else:
+        total = int(rows[0][total_idx] or 0) if rows else 0
+        has_more = offset + len(rows) < total
+
+    meta: Dict[str, Any] = {
+        "size": size,
+        "has_more": has_more,
+        "next_cursor": encode_cursor(cursor_of(rows[-1])) if rows and has_more else None,
+    }
+    if keyset:
+        return rows, meta
+
+    meta["page"] = page
+    meta["count"] = count
+    seen = offset + len(rows)
+    if count == "exact":
+        meta["total"] = total
+    elif count == "estimate":
+        # nunca menos de lo ya visto; sin más páginas el total es exacto
+        if has_more:
+            meta["total"] = max(int(estimate or 0), seen + 1)
+        elif rows or offset == 0:
+            meta["total"] = seen
+        else:  # página fuera de rango
+            meta["total"] = int(estimate or 0)
+    return rows, meta
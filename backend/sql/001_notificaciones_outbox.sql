@@ -0,0 +1,28 @@
+-- backend/sql/001_notificaciones_outbox.sql
+-- Outbox de correos sobre inv.notificaciones.
+-- Los modelos encolan el correo en la MISMA transacción del evento y el
+-- worker (app/jobs/mail_worker.py) lo entrega fuera de la transacción.
+--
+-- Aplicar con: psql "$DATABASE_URL" -f backend/sql/001_notificaciones_outbox.sql
+
+BEGIN;
+
+ALTER TABLE inv.notificaciones
+  ADD COLUMN IF NOT EXISTS destinatario_email text,
+  ADD COLUMN IF NOT EXISTS reply_to          text,
+  ADD COLUMN IF NOT EXISTS from_name         text,
+  ADD COLUMN IF NOT EXISTS headers           jsonb,
+  ADD COLUMN IF NOT EXISTS intentos          integer     NOT NULL DEFAULT 0,
+  ADD COLUMN IF NOT EXISTS ultimo_error      text,
+  ADD COLUMN IF NOT EXISTS proximo_intento   timestamptz NOT NULL DEFAULT now();
+
+-- Los correos del outbox se dirigen por email (admins, reportante, practicante)
+ALTER TABLE inv.notificaciones
+  ALTER COLUMN destinatario_usuario_id DROP NOT NULL;
+
+-- Cola de pendientes: el worker solo recorre lo no enviado
+CREATE INDEX IF NOT EXISTS ix_notificaciones_pendientes
+  ON inv.notificaciones (proximo_intento, notif_id)
+  WHERE sent_at IS NULL;
+
+COMMIT;
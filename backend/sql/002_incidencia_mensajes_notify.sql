@@ -0,0 +1,47 @@
+-- backend/sql/002_incidencia_mensajes_notify.sql
+-- Publica cada fila nueva de inv.incidencia_mensajes (NEW_INC, MSG, ASSIGNED)
+-- en el canal LISTEN/NOTIFY 'inv_incidencias'. El hub de cada proceso
+-- (app/core/inc_events.py) escucha con UNA conexión dedicada y reparte los
+-- eventos en memoria a los clientes en long-poll.
+--
+-- El payload lleva solo lo necesario para decidir visibilidad; el texto del
+-- mensaje se lee de la BD únicamente cuando el evento es visible.
+-- pg_notify se entrega al hacer COMMIT (nunca se publica algo que luego se revierte).
+--
+-- Aplicar con: psql "$DATABASE_URL" -f backend/sql/002_incidencia_mensajes_notify.sql
+
+BEGIN;
+
+CREATE OR REPLACE FUNCTION inv.fn_incidencia_mensaje_notify()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_reportado_por text;
+  v_asignado_a    text;
+BEGIN
+  SELECT i.reportado_por, i.asignado_a
+    INTO v_reportado_por, v_asignado_a
+    FROM inv.incidencias i
+   WHERE i.inc_id = NEW.inc_id;
+
+  PERFORM pg_notify('inv_incidencias', json_build_object(
+    'msg_id',        NEW.msg_id,
+    'inc_id',        NEW.inc_id,
+    'tipo',          NEW.tipo,
+    'visibilidad',   NEW.visibilidad,
+    'usuario',       NEW.usuario,
+    'reportado_por', v_reportado_por,
+    'asignado_a',    v_asignado_a
+  )::text);
+
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_incidencia_mensajes_notify ON inv.incidencia_mensajes;
+CREATE TRIGGER trg_incidencia_mensajes_notify
+  AFTER INSERT ON inv.incidencia_mensajes
+  FOR EACH ROW EXECUTE FUNCTION inv.fn_incidencia_mensaje_notify();
+
+COMMIT;
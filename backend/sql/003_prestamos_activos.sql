@@ -0,0 +1,60 @@
+-- backend/sql/003_prestamos_activos.sql
+-- Proyección de préstamos activos: una fila por ítem prestado.
+-- La mantienen prestar_item (upsert) y devolver_item (delete) en la MISMA
+-- transacción que el TRASLADO, así que los lectores (_get_active_loan, bi-vista
+-- por área) no recorren el historial de inv.movimientos.
+--
+-- inv.fn_prestamos_activos_rebuild() la reconstruye desde el historial
+-- (último TRASLADO por ítem con mov_detalle.es_prestamo = true). Se llama al
+-- final de este script y desde `flask prestamos-rebuild`.
+--
+-- Aplicar con: psql "$DATABASE_URL" -f backend/sql/003_prestamos_activos.sql
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS inv.prestamos_activos (
+  item_id          bigint      PRIMARY KEY REFERENCES inv.items(item_id) ON DELETE CASCADE,
+  origen_area_id   bigint,
+  destino_area_id  bigint,
+  mov_id           bigint      NOT NULL,   -- TRASLADO que abrió el préstamo
+  equipo_id        bigint,
+  desde            timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS ix_prestamos_activos_destino ON inv.prestamos_activos(destino_area_id);
+CREATE INDEX IF NOT EXISTS ix_prestamos_activos_origen  ON inv.prestamos_activos(origen_area_id);
+
+CREATE OR REPLACE FUNCTION inv.fn_prestamos_activos_rebuild()
+RETURNS integer
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  n integer;
+BEGIN
+  -- bloquea escrituras concurrentes (prestar/devolver) mientras se reconstruye
+  LOCK TABLE inv.prestamos_activos IN EXCLUSIVE MODE;
+
+  DELETE FROM inv.prestamos_activos;
+
+  INSERT INTO inv.prestamos_activos(item_id, origen_area_id, destino_area_id, mov_id, equipo_id, desde)
+  SELECT t.mov_item_id, t.mov_origen_area_id, t.mov_destino_area_id, t.mov_id, t.mov_equipo_id, t.mov_fecha
+    FROM (
+      SELECT DISTINCT ON (m.mov_item_id)
+             m.mov_item_id, m.mov_origen_area_id, m.mov_destino_area_id,
+             m.mov_id, m.mov_equipo_id, m.mov_fecha, m.mov_detalle
+        FROM inv.movimientos m
+       WHERE m.mov_tipo = 'TRASLADO'
+         AND m.mov_item_id IS NOT NULL
+       ORDER BY m.mov_item_id, m.mov_id DESC
+    ) t
+   WHERE COALESCE((t.mov_detalle->>'es_prestamo')::boolean, false)
+     AND EXISTS (SELECT 1 FROM inv.items i WHERE i.item_id = t.mov_item_id);
+
+  GET DIAGNOSTICS n = ROW_COUNT;
+  RETURN n;
+END;
+$$;
+
+SELECT inv.fn_prestamos_activos_rebuild();
+
+COMMIT;
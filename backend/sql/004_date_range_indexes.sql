@@ -0,0 +1,20 @@
+-- backend/sql/004_date_range_indexes.sql
+-- Índices btree para los filtros de fecha de los listados. Desde
+-- app/utils/filters.py los filtros desde/hasta se compilan a rangos
+-- semiabiertos sobre la columna sin castear (col >= desde AND col < hasta + 1),
+-- así que estos índices se usan con range scans.
+--
+-- Aplicar con: psql "$DATABASE_URL" -f backend/sql/004_date_range_indexes.sql
+
+BEGIN;
+
+-- Auditoría / movimientos (orden por fecha DESC, id DESC)
+CREATE INDEX IF NOT EXISTS ix_movimientos_fecha   ON inv.movimientos(mov_fecha DESC, mov_id DESC);
+CREATE INDEX IF NOT EXISTS ix_audit_log_created   ON inv.audit_log(created_at DESC, audit_id DESC);
+
+-- Listados por área
+CREATE INDEX IF NOT EXISTS ix_equipos_area_created ON inv.equipos(equipo_area_id, created_at DESC);
+-- (vw_items_con_ficha_y_fotos expone items.creado_en como created_at)
+CREATE INDEX IF NOT EXISTS ix_items_area_creado_en  ON inv.items(area_id, creado_en);
+
+COMMIT;
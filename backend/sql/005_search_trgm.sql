@@ -0,0 +1,61 @@
+-- backend/sql/005_search_trgm.sql
+-- Búsqueda `q` de la grilla de auditoría (movimientos / audit_log) por índice.
+--
+-- Antes: 7 ILIKE '%q%' por fila, incluyendo mov_detalle::text / antes::text /
+-- despues::text / extra::text => seq scan + serializar el JSON de cada fila.
+-- Ahora: cada tabla tiene `search_text` (columna generada STORED, la mantiene
+-- Postgres en cada INSERT/UPDATE) con los mismos campos, indexada con pg_trgm.
+-- ILIKE '%q%' sobre ella usa el índice GIN (q de 3+ caracteres).
+--
+-- Los campos de otras tablas (código de ítem, tipo, código/nombre de equipo) no
+-- se copian: se buscan en su tabla (chica, también con trigram) y se cruzan por
+-- id, así un renombre se refleja sin reescribir el historial.
+--
+-- El separador \x1f evita que un patrón matchee "pegando" dos campos.
+--
+-- Aplicar con: psql "$DATABASE_URL" -f backend/sql/005_search_trgm.sql
+
+BEGIN;
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- ---------- movimientos ----------
+ALTER TABLE inv.movimientos
+  ADD COLUMN IF NOT EXISTS search_text text GENERATED ALWAYS AS (
+        COALESCE(mov_usuario_app, '') || E'\x1f' ||
+        COALESCE(mov_motivo, '')      || E'\x1f' ||
+        COALESCE(mov_detalle::text, '')
+  ) STORED;
+
+CREATE INDEX IF NOT EXISTS ix_movimientos_search_trgm
+  ON inv.movimientos USING gin (search_text gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS ix_movimientos_item   ON inv.movimientos(mov_item_id);
+CREATE INDEX IF NOT EXISTS ix_movimientos_equipo ON inv.movimientos(mov_equipo_id);
+
+-- ---------- audit_log ----------
+ALTER TABLE inv.audit_log
+  ADD COLUMN IF NOT EXISTS search_text text GENERATED ALWAYS AS (
+        COALESCE(actor_user, '')        || E'\x1f' ||
+        COALESCE(accion, '')            || E'\x1f' ||
+        COALESCE(entidad, '')           || E'\x1f' ||
+        COALESCE(entidad_id::text, '')  || E'\x1f' ||
+        COALESCE(extra::text, '')       || E'\x1f' ||
+        COALESCE(antes::text, '')       || E'\x1f' ||
+        COALESCE(despues::text, '')
+  ) STORED;
+
+CREATE INDEX IF NOT EXISTS ix_audit_log_search_trgm
+  ON inv.audit_log USING gin (search_text gin_trgm_ops);
+
+-- ---------- tablas referenciadas por la búsqueda de movimientos ----------
+CREATE INDEX IF NOT EXISTS ix_items_codigo_trgm
+  ON inv.items USING gin (item_codigo gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS ix_item_tipos_nombre_trgm
+  ON inv.item_tipos USING gin (nombre gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS ix_equipos_codigo_nombre_trgm
+  ON inv.equipos USING gin (equipo_codigo gin_trgm_ops, equipo_nombre gin_trgm_ops);
+
+ANALYZE inv.movimientos;
+ANALYZE inv.audit_log;
+
+COMMIT;
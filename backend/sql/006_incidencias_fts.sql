@@ -0,0 +1,119 @@
+-- backend/sql/006_incidencias_fts.sql
+-- Búsqueda de texto completo (español) en incidencias, con índice GIN.
+--
+-- Columnas en inv.incidencias:
+--   msgs_tsv_public  mensajes MSG públicos (peso C), los ve el reportante
+--   msgs_tsv_staff   mensajes MSG solo staff (peso C), los ve ADMIN/PRACTICANTE
+--   search_tsv       columna generada: titulo (A) + descripcion (B) + msgs_tsv_public
+--
+-- Los msgs_tsv_* los mantiene un trigger de inv.incidencia_mensajes (INSERT
+-- concatena; UPDATE/DELETE recalcula la incidencia). titulo/descripcion los
+-- recalcula Postgres solo por ser columna generada.
+--
+-- inv.fn_inc_tsquery(q): texto libre -> tsquery con prefijo por palabra
+-- ('impres' encuentra 'impresora'); IMMUTABLE, así el planner la evalúa una vez.
+--
+-- Aplicar con: psql "$DATABASE_URL" -f backend/sql/006_incidencias_fts.sql
+
+BEGIN;
+
+ALTER TABLE inv.incidencias
+  ADD COLUMN IF NOT EXISTS msgs_tsv_public tsvector NOT NULL DEFAULT ''::tsvector,
+  ADD COLUMN IF NOT EXISTS msgs_tsv_staff  tsvector NOT NULL DEFAULT ''::tsvector;
+
+ALTER TABLE inv.incidencias
+  ADD COLUMN IF NOT EXISTS search_tsv tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('spanish'::regconfig, COALESCE(titulo, '')), 'A') ||
+        setweight(to_tsvector('spanish'::regconfig, COALESCE(descripcion, '')), 'B') ||
+        msgs_tsv_public
+  ) STORED;
+
+-- ---------- mantenimiento desde incidencia_mensajes ----------
+CREATE OR REPLACE FUNCTION inv.fn_incidencia_msgs_tsv_refresh(p_inc_id bigint)
+RETURNS void
+LANGUAGE sql
+AS $$
+  UPDATE inv.incidencias i
+     SET msgs_tsv_public = COALESCE((
+           SELECT setweight(to_tsvector('spanish'::regconfig,
+                    string_agg(m.mensaje, ' ' ORDER BY m.msg_id)), 'C')
+             FROM inv.incidencia_mensajes m
+            WHERE m.inc_id = p_inc_id AND m.tipo = 'MSG' AND m.visibilidad = 'PUBLIC'
+         ), ''::tsvector),
+         msgs_tsv_staff = COALESCE((
+           SELECT setweight(to_tsvector('spanish'::regconfig,
+                    string_agg(m.mensaje, ' ' ORDER BY m.msg_id)), 'C')
+             FROM inv.incidencia_mensajes m
+            WHERE m.inc_id = p_inc_id AND m.tipo = 'MSG' AND m.visibilidad <> 'PUBLIC'
+         ), ''::tsvector)
+   WHERE i.inc_id = p_inc_id;
+$$;
+
+CREATE OR REPLACE FUNCTION inv.fn_incidencia_mensaje_tsv()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v tsvector;
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    IF NEW.tipo = 'MSG' THEN
+      v := setweight(to_tsvector('spanish'::regconfig, COALESCE(NEW.mensaje, '')), 'C');
+      IF NEW.visibilidad = 'PUBLIC' THEN
+        UPDATE inv.incidencias SET msgs_tsv_public = msgs_tsv_public || v WHERE inc_id = NEW.inc_id;
+      ELSE
+        UPDATE inv.incidencias SET msgs_tsv_staff = msgs_tsv_staff || v WHERE inc_id = NEW.inc_id;
+      END IF;
+    END IF;
+    RETURN NULL;
+  END IF;
+
+  IF TG_OP IN ('UPDATE', 'DELETE') THEN
+    PERFORM inv.fn_incidencia_msgs_tsv_refresh(OLD.inc_id);
+  END IF;
+  IF TG_OP = 'UPDATE' AND NEW.inc_id IS DISTINCT FROM OLD.inc_id THEN
+    PERFORM inv.fn_incidencia_msgs_tsv_refresh(NEW.inc_id);
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_incidencia_mensajes_tsv ON inv.incidencia_mensajes;
+CREATE TRIGGER trg_incidencia_mensajes_tsv
+  AFTER INSERT OR UPDATE OF mensaje, visibilidad, tipo, inc_id OR DELETE ON inv.incidencia_mensajes
+  FOR EACH ROW EXECUTE FUNCTION inv.fn_incidencia_mensaje_tsv();
+
+-- ---------- consulta ----------
+CREATE OR REPLACE FUNCTION inv.fn_inc_tsquery(q text)
+RETURNS tsquery
+LANGUAGE sql
+IMMUTABLE
+AS $$
+  SELECT to_tsquery('spanish'::regconfig, string_agg(
+           '''' || replace(replace(t.lexeme, '\', '\\'), '''', '''''') || ''':*', ' & '))
+    FROM unnest(to_tsvector('spanish'::regconfig, COALESCE(q, ''))) AS t
+$$;
+
+CREATE INDEX IF NOT EXISTS ix_incidencias_search_tsv ON inv.incidencias USING gin (search_tsv);
+CREATE INDEX IF NOT EXISTS ix_incidencias_msgs_staff ON inv.incidencias USING gin (msgs_tsv_staff);
+CREATE INDEX IF NOT EXISTS ix_incidencias_equipo     ON inv.incidencias(equipo_id);
+
+-- ---------- backfill ----------
+UPDATE inv.incidencias i
+   SET msgs_tsv_public = COALESCE(s.pub, ''::tsvector),
+       msgs_tsv_staff  = COALESCE(s.stf, ''::tsvector)
+  FROM (
+    SELECT m.inc_id,
+           setweight(to_tsvector('spanish'::regconfig, string_agg(m.mensaje, ' ' ORDER BY m.msg_id)
+                       FILTER (WHERE m.visibilidad = 'PUBLIC')), 'C') AS pub,
+           setweight(to_tsvector('spanish'::regconfig, string_agg(m.mensaje, ' ' ORDER BY m.msg_id)
+                       FILTER (WHERE m.visibilidad <> 'PUBLIC')), 'C') AS stf
+      FROM inv.incidencia_mensajes m
+     WHERE m.tipo = 'MSG'
+     GROUP BY m.inc_id
+  ) s
+ WHERE s.inc_id = i.inc_id;
+
+ANALYZE inv.incidencias;
+
+COMMIT;
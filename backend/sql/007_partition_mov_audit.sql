@@ -0,0 +1,213 @@
+-- backend/sql/007_partition_mov_audit.sql
+-- Particionado mensual (RANGE) de inv.movimientos (mov_fecha) e inv.audit_log
+-- (created_at). Son tablas de solo-inserción: cada mes queda en su partición,
+-- los filtros desde/hasta (rangos semiabiertos, ver app/utils/filters.py) solo
+-- leen las particiones del rango y los meses viejos se archivan con
+-- `flask partitions-maintain` (app/jobs/partitions_job.py).
+--
+-- Conversión (una vez, en una transacción):
+--   1. la tabla actual pasa a <tabla>_legacy;
+--   2. se crea la nueva particionada con las mismas columnas, defaults,
+--      CHECKs y columnas generadas; la PK pasa a (id, fecha) porque en una
+--      tabla particionada toda clave única debe incluir la columna de partición;
+--   3. se recrean índices y triggers, se crean las particiones de cada mes con
+--      datos + los próximos meses, se copian las filas y la secuencia del id
+--      pasa a pertenecer a la tabla nueva;
+--   4. las vistas que usaban la tabla se recrean sobre la nueva y se borra la vieja.
+-- Si otra tabla tiene una FK hacia estas, se aborta (no se puede mantener).
+--
+-- NO hay partición DEFAULT: inv.fn_ensure_month_partitions() debe ir por
+-- delante. La migración crea 3 meses; después cada proceso web los asegura al
+-- arrancar y una vez por día (PartitionsWorker, app/jobs/partitions_job.py,
+-- PARTITIONS_ENSURE_*), y `flask partitions-maintain` hace lo mismo a mano.
+--
+-- Índices únicos que no incluyan la columna de partición no se pueden
+-- mantener en la tabla particionada: la conversión ABORTA si encuentra uno
+-- (hay que agregarle la columna de fecha o quitarlo antes de aplicar).
+--
+-- Aplicar con: psql "$DATABASE_URL" -f backend/sql/007_partition_mov_audit.sql
+
+BEGIN;
+
+-- ============================================================
+-- Particiones mensuales: <tabla>_pYYYYMM, [primer día del mes, primer día del siguiente)
+-- ============================================================
+CREATE OR REPLACE FUNCTION inv.fn_ensure_month_partitions(p_parent regclass, p_from date, p_to date)
+RETURNS integer
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_schema text;
+  v_table  text;
+  v_month  date := date_trunc('month', p_from)::date;
+  v_name   text;
+  n        integer := 0;
+BEGIN
+  SELECT n.nspname, c.relname INTO v_schema, v_table
+    FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+   WHERE c.oid = p_parent;
+
+  WHILE v_month < p_to LOOP
+    v_name := format('%s_p%s', v_table, to_char(v_month, 'YYYYMM'));
+    IF to_regclass(format('%I.%I', v_schema, v_name)) IS NULL THEN
+      EXECUTE format('CREATE TABLE %I.%I PARTITION OF %s FOR VALUES FROM (%L) TO (%L)',
+                     v_schema, v_name, p_parent, v_month, (v_month + interval '1 month')::date);
+      n := n + 1;
+    END IF;
+    v_month := (v_month + interval '1 month')::date;
+  END LOOP;
+  RETURN n;
+END;
+$$;
+
+-- Particiones de una tabla con su rango (para el job de archivo)
+CREATE OR REPLACE FUNCTION inv.fn_month_partitions(p_parent regclass)
+RETURNS TABLE(partition regclass, desde timestamptz, hasta timestamptz)
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT c.oid::regclass,
+         (regexp_match(pg_get_expr(c.relpartbound, c.oid), 'FROM \(''([^'']+)''\)'))[1]::timestamptz,
+         (regexp_match(pg_get_expr(c.relpartbound, c.oid), 'TO \(''([^'']+)''\)'))[1]::timestamptz
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+   WHERE i.inhparent = p_parent
+   ORDER BY 2;
+$$;
+
+-- ============================================================
+-- Conversión (función temporal de esta sesión)
+-- ============================================================
+CREATE FUNCTION pg_temp.convert_to_monthly(p_table text, p_id text, p_col text, p_ahead integer)
+RETURNS void
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_old     regclass := format('inv.%I', p_table)::regclass;
+  v_legacy  text := p_table || '_legacy';
+  v_seq     text := pg_get_serial_sequence(format('inv.%I', p_table), p_id);
+  v_views   text[][] := '{}';
+  v_idx     text[] := '{}';
+  v_trg     text[] := '{}';
+  v_cols    text;
+  v_pkname  text;
+  r         record;
+  s         text;
+  m         date;
+BEGIN
+  IF (SELECT c.relkind FROM pg_class c WHERE c.oid = v_old) = 'p' THEN
+    RAISE NOTICE 'inv.% ya está particionada', p_table;
+    RETURN;
+  END IF;
+
+  IF EXISTS (SELECT 1 FROM pg_constraint WHERE confrelid = v_old AND contype = 'f') THEN
+    RAISE EXCEPTION 'inv.% es referenciada por FKs: no se puede particionar', p_table;
+  END IF;
+
+  -- vistas que dependen de la tabla (se recrean sobre la nueva)
+  FOR r IN
+    SELECT DISTINCT rw.ev_class::regclass AS v
+      FROM pg_depend d JOIN pg_rewrite rw ON rw.oid = d.objid
+     WHERE d.refobjid = v_old AND rw.ev_class <> v_old
+  LOOP
+    v_views := v_views || ARRAY[[r.v::text, pg_get_viewdef(r.v, true)]];
+  END LOOP;
+
+  -- índices (menos la PK) y triggers de usuario
+  FOR r IN
+    SELECT i.indexrelid, i.indisunique, c.relname, k.oid AS conoid, k.conname,
+           EXISTS (SELECT 1 FROM pg_attribute a
+                    WHERE a.attrelid = v_old AND a.attname = p_col
+                      AND a.attnum = ANY (i.indkey::int2[])) AS has_col
+      FROM pg_index i
+      JOIN pg_class c ON c.oid = i.indexrelid
+      LEFT JOIN pg_constraint k ON k.conindid = i.indexrelid AND k.conrelid = v_old
+     WHERE i.indrelid = v_old AND NOT i.indisprimary
+  LOOP
+    IF r.indisunique AND NOT r.has_col THEN
+      RAISE EXCEPTION 'índice único inv.% no incluye %: no se puede mantener al particionar inv.%',
+                      r.relname, p_col, p_table
+        USING HINT = 'Agregar la columna de partición al índice o quitarlo antes de aplicar la migración.';
+    END IF;
+    IF r.conoid IS NOT NULL THEN
+      -- índice de una constraint UNIQUE/EXCLUDE: se recrea como constraint
+      v_idx := v_idx || format('ALTER TABLE inv.%I ADD CONSTRAINT %I %s',
+                               p_table, r.conname, pg_get_constraintdef(r.conoid));
+      EXECUTE format('ALTER TABLE %s DROP CONSTRAINT %I', v_old, r.conname);
+    ELSE
+      v_idx := v_idx || pg_get_indexdef(r.indexrelid);
+      EXECUTE format('DROP INDEX inv.%I', r.relname);
+    END IF;
+  END LOOP;
+
+  FOR r IN SELECT t.oid, t.tgname FROM pg_trigger t WHERE t.tgrelid = v_old AND NOT t.tgisinternal LOOP
+    v_trg := v_trg || pg_get_triggerdef(r.oid);
+    EXECUTE format('DROP TRIGGER %I ON %s', r.tgname, v_old);
+  END LOOP;
+
+  -- la PK vieja libera su nombre (los índices comparten espacio de nombres)
+  SELECT conname INTO v_pkname FROM pg_constraint WHERE conrelid = v_old AND contype = 'p';
+  EXECUTE format('ALTER TABLE %s RENAME TO %I', v_old, v_legacy);
+  IF v_pkname IS NOT NULL THEN
+    EXECUTE format('ALTER TABLE inv.%I RENAME CONSTRAINT %I TO %I', v_legacy, v_pkname, v_legacy || '_pkey');
+  END IF;
+
+  EXECUTE format($f$
+    CREATE TABLE inv.%I (
+      LIKE inv.%I INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING GENERATED
+                  INCLUDING IDENTITY INCLUDING STORAGE INCLUDING COMMENTS,
+      PRIMARY KEY (%I, %I)
+    ) PARTITION BY RANGE (%I)
+  $f$, p_table, v_legacy, p_id, p_col, p_col);
+
+  -- la columna de partición no puede ser NULL
+  EXECUTE format('ALTER TABLE inv.%I ALTER COLUMN %I SET NOT NULL', p_table, p_col);
+
+  -- particiones: cada mes con datos + los próximos p_ahead meses
+  FOR m IN EXECUTE format('SELECT DISTINCT date_trunc(''month'', %I)::date FROM inv.%I', p_col, v_legacy) LOOP
+    PERFORM inv.fn_ensure_month_partitions(format('inv.%I', p_table)::regclass, m, (m + interval '1 month')::date);
+  END LOOP;
+  PERFORM inv.fn_ensure_month_partitions(format('inv.%I', p_table)::regclass,
+            date_trunc('month', now())::date,
+            (date_trunc('month', now()) + make_interval(months => p_ahead + 1))::date);
+
+  -- copia (sin columnas generadas)
+  SELECT string_agg(quote_ident(a.attname), ', ' ORDER BY a.attnum) INTO v_cols
+    FROM pg_attribute a
+   WHERE a.attrelid = format('inv.%I', v_legacy)::regclass
+     AND a.attnum > 0 AND NOT a.attisdropped AND a.attgenerated = '';
+  EXECUTE format('INSERT INTO inv.%I (%s) OVERRIDING SYSTEM VALUE SELECT %s FROM inv.%I',
+                 p_table, v_cols, v_cols, v_legacy);
+
+  -- secuencia del id: serial → pasa a la tabla nueva; identity → continuar numeración
+  IF v_seq IS NOT NULL AND pg_get_serial_sequence(format('inv.%I', p_table), p_id) IS NULL THEN
+    EXECUTE format('ALTER SEQUENCE %s OWNED BY inv.%I.%I', v_seq, p_table, p_id);
+  END IF;
+  v_seq := pg_get_serial_sequence(format('inv.%I', p_table), p_id);
+  IF v_seq IS NOT NULL THEN
+    EXECUTE format('SELECT setval(%L, GREATEST((SELECT COALESCE(MAX(%I), 0) FROM inv.%I), 1))',
+                   v_seq, p_id, p_table);
+  END IF;
+
+  -- definiciones leídas antes del RENAME: ya nombran inv.<tabla> (la nueva)
+  FOREACH s IN ARRAY v_idx LOOP
+    EXECUTE s;
+  END LOOP;
+  FOREACH s IN ARRAY v_trg LOOP
+    EXECUTE s;
+  END LOOP;
+  FOR i IN 1 .. coalesce(array_length(v_views, 1), 0) LOOP
+    EXECUTE format('CREATE OR REPLACE VIEW %s AS %s', v_views[i][1], v_views[i][2]);
+  END LOOP;
+
+  EXECUTE format('DROP TABLE inv.%I', v_legacy);
+END;
+$$;
+
+SELECT pg_temp.convert_to_monthly('movimientos', 'mov_id',   'mov_fecha',  3);
+SELECT pg_temp.convert_to_monthly('audit_log',   'audit_id', 'created_at', 3);
+
+ANALYZE inv.movimientos;
+ANALYZE inv.audit_log;
+
+COMMIT;
@@ -0,0 +1,126 @@
+-- backend/sql/008_equipo_reparaciones.sql
+-- Ciclos de reparación de equipos (USO -> MANTENIMIENTO -> USO): una fila por
+-- ciclo con inicio, fin y duración. La mantiene un trigger AFTER INSERT sobre
+-- inv.movimientos (registros EQUIPO_ESTADO) en la misma transacción que el
+-- cambio de estado, así el listado REPARACION de auditorías y los reportes de
+-- tiempo fuera de servicio leen esta tabla en vez de recorrer todo el historial
+-- de estados con LAG/LEAD.
+--
+-- Reglas (las mismas que usaba la consulta con LAG/LEAD):
+--   - USO -> MANTENIMIENTO abre un ciclo (fin NULL);
+--   - con un ciclo abierto, el siguiente cambio a USO lo cierra; cualquier otro
+--     cambio (BAJA, ALMACEN, ...) lo descarta: no fue un ciclo de reparación.
+-- El trigger toma el estado anterior de mov_detalle.before; la reconstrucción,
+-- del registro EQUIPO_ESTADO previo (o de `before` si es el primero).
+--
+-- inv.fn_equipo_reparaciones_rebuild() la reconstruye desde el historial. Se
+-- llama al final de este script y desde `flask reparaciones-rebuild`.
+--
+-- Aplicar con: psql "$DATABASE_URL" -f backend/sql/008_equipo_reparaciones.sql
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS inv.equipo_reparaciones (
+  rep_id         bigserial   PRIMARY KEY,
+  equipo_id      bigint      NOT NULL REFERENCES inv.equipos(equipo_id) ON DELETE CASCADE,
+  inicio_mov_id  bigint      NOT NULL,   -- EQUIPO_ESTADO USO -> MANTENIMIENTO
+  inicio         timestamptz NOT NULL,
+  fin_mov_id     bigint,                 -- EQUIPO_ESTADO MANTENIMIENTO -> USO (NULL = en curso)
+  fin            timestamptz,
+  duracion       interval    GENERATED ALWAYS AS (fin - inicio) STORED
+);
+
+-- a lo sumo un ciclo abierto por equipo
+CREATE UNIQUE INDEX IF NOT EXISTS ux_equipo_reparaciones_abierta
+  ON inv.equipo_reparaciones(equipo_id) WHERE fin IS NULL;
+CREATE INDEX IF NOT EXISTS ix_equipo_reparaciones_inicio
+  ON inv.equipo_reparaciones(inicio DESC, inicio_mov_id DESC);
+CREATE INDEX IF NOT EXISTS ix_equipo_reparaciones_equipo
+  ON inv.equipo_reparaciones(equipo_id, inicio DESC);
+
+-- ============================================================
+-- Trigger: avanza el ciclo con cada EQUIPO_ESTADO
+-- ============================================================
+CREATE OR REPLACE FUNCTION inv.fn_equipo_reparaciones_on_estado()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_before text := NEW.mov_detalle->>'before';
+  v_after  text := NEW.mov_detalle->>'after';
+BEGIN
+  IF NEW.mov_equipo_id IS NULL THEN
+    RETURN NULL;
+  END IF;
+
+  IF v_after = 'USO' THEN
+    UPDATE inv.equipo_reparaciones
+       SET fin_mov_id = NEW.mov_id, fin = NEW.mov_fecha
+     WHERE equipo_id = NEW.mov_equipo_id AND fin IS NULL;
+  ELSE
+    DELETE FROM inv.equipo_reparaciones
+     WHERE equipo_id = NEW.mov_equipo_id AND fin IS NULL;
+  END IF;
+
+  IF v_after = 'MANTENIMIENTO' AND v_before = 'USO' THEN
+    INSERT INTO inv.equipo_reparaciones(equipo_id, inicio_mov_id, inicio)
+    VALUES (NEW.mov_equipo_id, NEW.mov_id, NEW.mov_fecha);
+  END IF;
+
+  RETURN NULL;
+END;
+$$;
+
+-- en la tabla particionada: se clona en cada partición (actual y futura)
+DROP TRIGGER IF EXISTS trg_equipo_reparaciones ON inv.movimientos;
+CREATE TRIGGER trg_equipo_reparaciones
+  AFTER INSERT ON inv.movimientos
+  FOR EACH ROW
+  WHEN (NEW.mov_tipo = 'EQUIPO_ESTADO')
+  EXECUTE FUNCTION inv.fn_equipo_reparaciones_on_estado();
+
+-- ============================================================
+-- Reconstrucción desde el historial (backfill)
+-- ============================================================
+CREATE OR REPLACE FUNCTION inv.fn_equipo_reparaciones_rebuild()
+RETURNS integer
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  n integer;
+BEGIN
+  -- bloquea cambios de estado concurrentes (el trigger escribe aquí)
+  LOCK TABLE inv.equipo_reparaciones IN EXCLUSIVE MODE;
+
+  DELETE FROM inv.equipo_reparaciones;
+
+  INSERT INTO inv.equipo_reparaciones(equipo_id, inicio_mov_id, inicio, fin_mov_id, fin)
+  SELECT s.mov_equipo_id, s.mov_id, s.mov_fecha, s.next_id, s.next_fecha
+    FROM (
+      SELECT m.mov_id, m.mov_fecha, m.mov_equipo_id,
+             m.mov_detalle->>'after' AS after,
+             COALESCE(LAG(m.mov_detalle->>'after') OVER w,
+                      m.mov_detalle->>'before') AS prev_after,
+             LEAD(m.mov_detalle->>'after') OVER w AS next_after,
+             LEAD(m.mov_id)                OVER w AS next_id,
+             LEAD(m.mov_fecha)             OVER w AS next_fecha
+        FROM inv.movimientos m
+       WHERE m.mov_tipo = 'EQUIPO_ESTADO'
+         AND m.mov_equipo_id IS NOT NULL
+      WINDOW w AS (PARTITION BY m.mov_equipo_id ORDER BY m.mov_fecha, m.mov_id)
+    ) s
+   WHERE s.after = 'MANTENIMIENTO'
+     AND s.prev_after = 'USO'
+     AND (s.next_after = 'USO' OR s.next_id IS NULL)   -- cerrado o en curso
+     AND EXISTS (SELECT 1 FROM inv.equipos e WHERE e.equipo_id = s.mov_equipo_id);
+
+  GET DIAGNOSTICS n = ROW_COUNT;
+  RETURN n;
+END;
+$$;
+
+SELECT inv.fn_equipo_reparaciones_rebuild();
+
+ANALYZE inv.equipo_reparaciones;
+
+COMMIT;
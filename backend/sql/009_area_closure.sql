@@ -0,0 +1,125 @@
+-- backend/sql/009_area_closure.sql
+-- Tabla de clausura del árbol de áreas: una fila (ancestro, descendiente,
+-- profundidad) por cada par, incluida la del área consigo misma (depth 0).
+-- Los listados con include_descendants=true filtran por
+--
+--   area_id IN (SELECT descendant_id FROM inv.area_closure WHERE ancestor_id = X)
+--
+-- (un index-only scan sobre la PK) en vez de una CTE recursiva por consulta.
+--
+-- La mantienen triggers sobre inv.areas (alta, cambio de padre); las bajas
+-- caen por ON DELETE CASCADE. inv.fn_area_closure_rebuild() la reconstruye
+-- desde area_padre_id y se llama al final de este script.
+--
+-- Aplicar con: psql "$DATABASE_URL" -f backend/sql/009_area_closure.sql
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS inv.area_closure (
+  ancestor_id    bigint  NOT NULL REFERENCES inv.areas(area_id) ON DELETE CASCADE,
+  descendant_id  bigint  NOT NULL REFERENCES inv.areas(area_id) ON DELETE CASCADE,
+  depth          integer NOT NULL,
+  PRIMARY KEY (ancestor_id, descendant_id)
+);
+
+CREATE INDEX IF NOT EXISTS ix_area_closure_descendant ON inv.area_closure(descendant_id, depth);
+
+-- ============================================================
+-- Mantenimiento
+-- ============================================================
+CREATE OR REPLACE FUNCTION inv.fn_area_closure_on_insert()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  INSERT INTO inv.area_closure(ancestor_id, descendant_id, depth)
+  SELECT c.ancestor_id, NEW.area_id, c.depth + 1
+    FROM inv.area_closure c
+   WHERE c.descendant_id = NEW.area_padre_id
+  UNION ALL
+  SELECT NEW.area_id, NEW.area_id, 0;
+  RETURN NULL;
+END;
+$$;
+
+-- Mover un subárbol: se cortan los vínculos de los ancestros viejos con todo
+-- el subárbol y se cruzan los ancestros del nuevo padre con él.
+CREATE OR REPLACE FUNCTION inv.fn_area_closure_on_move()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  IF NEW.area_padre_id IS NOT NULL AND EXISTS (
+       SELECT 1 FROM inv.area_closure
+        WHERE ancestor_id = NEW.area_id AND descendant_id = NEW.area_padre_id) THEN
+    RAISE EXCEPTION 'El área % no puede colgar de su propio subárbol', NEW.area_id;
+  END IF;
+
+  DELETE FROM inv.area_closure l
+   USING inv.area_closure sub, inv.area_closure sup
+   WHERE sub.ancestor_id = NEW.area_id
+     AND sup.descendant_id = NEW.area_id AND sup.ancestor_id <> NEW.area_id
+     AND l.ancestor_id = sup.ancestor_id
+     AND l.descendant_id = sub.descendant_id;
+
+  INSERT INTO inv.area_closure(ancestor_id, descendant_id, depth)
+  SELECT sup.ancestor_id, sub.descendant_id, sup.depth + sub.depth + 1
+    FROM inv.area_closure sup
+    JOIN inv.area_closure sub ON sub.ancestor_id = NEW.area_id
+   WHERE sup.descendant_id = NEW.area_padre_id;
+
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_area_closure_ins ON inv.areas;
+CREATE TRIGGER trg_area_closure_ins
+  AFTER INSERT ON inv.areas
+  FOR EACH ROW
+  EXECUTE FUNCTION inv.fn_area_closure_on_insert();
+
+DROP TRIGGER IF EXISTS trg_area_closure_move ON inv.areas;
+CREATE TRIGGER trg_area_closure_move
+  AFTER UPDATE OF area_padre_id ON inv.areas
+  FOR EACH ROW
+  WHEN (OLD.area_padre_id IS DISTINCT FROM NEW.area_padre_id)
+  EXECUTE FUNCTION inv.fn_area_closure_on_move();
+
+-- ============================================================
+-- Reconstrucción desde area_padre_id
+-- ============================================================
+CREATE OR REPLACE FUNCTION inv.fn_area_closure_rebuild()
+RETURNS integer
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  n integer;
+BEGIN
+  LOCK TABLE inv.area_closure IN EXCLUSIVE MODE;
+
+  DELETE FROM inv.area_closure;
+
+  INSERT INTO inv.area_closure(ancestor_id, descendant_id, depth)
+  WITH RECURSIVE t AS (
+    SELECT a.area_id AS ancestor_id, a.area_id AS descendant_id, 0 AS depth
+      FROM inv.areas a
+    UNION ALL
+    SELECT t.ancestor_id, c.area_id, t.depth + 1
+      FROM t
+      JOIN inv.areas c ON c.area_padre_id = t.descendant_id
+     WHERE t.depth < 64   -- corta ciclos en datos corruptos
+  )
+  SELECT DISTINCT ON (ancestor_id, descendant_id) ancestor_id, descendant_id, depth
+    FROM t
+   ORDER BY ancestor_id, descendant_id, depth;
+
+  GET DIAGNOSTICS n = ROW_COUNT;
+  RETURN n;
+END;
+$$;
+
+SELECT inv.fn_area_closure_rebuild();
+
+ANALYZE inv.area_closure;
+
+COMMIT;
@@ -0,0 +1,50 @@
+-- backend/sql/010_items_ficha_json.sql
+-- Ficha y fotos desnormalizadas en inv.items (ficha_json / fotos_json).
+-- inv.vw_items_con_ficha_y_fotos re-agrega inv.spec_valores (EAV) e
+-- inv.item_media en cada lectura; el detalle y los listados pasan a leer estas
+-- columnas (una fila, sin agregación).
+--
+-- Las mantiene la app en la MISMA transacción que la escritura
+-- (create_item_with_specs, upsert_attribute_and_value, add_photo/add_media,
+-- remove_photo/delete_media) llamando a inv.fn_items_refresh_json(ids, ficha, fotos).
+-- El armado sigue siendo el de la vista (se lee de ella solo para esos ids), así
+-- que ambas coinciden por construcción.
+--
+-- Si se escriben specs/fotos por fuera de la app: `flask items-json-rebuild`
+-- (o SELECT inv.fn_items_refresh_json(NULL)) recalcula todo.
+--
+-- Aplicar con: psql "$DATABASE_URL" -f backend/sql/010_items_ficha_json.sql
+
+BEGIN;
+
+ALTER TABLE inv.items
+  ADD COLUMN IF NOT EXISTS ficha_json jsonb NOT NULL DEFAULT '{}'::jsonb,
+  ADD COLUMN IF NOT EXISTS fotos_json jsonb NOT NULL DEFAULT '[]'::jsonb;
+
+-- p_item_ids NULL = todos los ítems
+CREATE OR REPLACE FUNCTION inv.fn_items_refresh_json(
+  p_item_ids bigint[],
+  p_ficha    boolean DEFAULT true,
+  p_fotos    boolean DEFAULT true
+)
+RETURNS integer
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  n integer;
+BEGIN
+  UPDATE inv.items i
+     SET ficha_json = CASE WHEN p_ficha THEN COALESCE(v.ficha, '{}'::jsonb) ELSE i.ficha_json END,
+         fotos_json = CASE WHEN p_fotos THEN COALESCE(v.fotos, '[]'::jsonb) ELSE i.fotos_json END
+    FROM inv.vw_items_con_ficha_y_fotos v
+   WHERE v.item_id = i.item_id
+     AND (p_item_ids IS NULL OR i.item_id = ANY(p_item_ids));
+
+  GET DIAGNOSTICS n = ROW_COUNT;
+  RETURN n;
+END;
+$$;
+
+SELECT inv.fn_items_refresh_json(NULL);
+
+COMMIT;
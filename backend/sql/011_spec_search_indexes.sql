@@ -0,0 +1,35 @@
+-- backend/sql/011_spec_search_indexes.sql
+-- Índices por tipo de valor para la búsqueda por specs (POST /api/items/search,
+-- item_model.search_items). Cada predicado se compila a
+--
+--   v.item_id IN (SELECT item_id FROM inv.spec_valores
+--                  WHERE attr_id = X AND val_<tipo> <op> valor)
+--
+-- que es un range scan (index-only) sobre (attr_id, val_<tipo>, item_id).
+-- Texto: igualdad y prefijo sin distinguir mayúsculas sobre lower(val_text)
+-- (text_pattern_ops permite LIKE 'abc%' con cualquier collation).
+-- Parciales: cada fila tiene un solo val_* no nulo.
+--
+-- Aplicar con: psql "$DATABASE_URL" -f backend/sql/011_spec_search_indexes.sql
+
+BEGIN;
+
+CREATE INDEX IF NOT EXISTS ix_spec_valores_int
+  ON inv.spec_valores(attr_id, val_int, item_id) WHERE val_int IS NOT NULL;
+CREATE INDEX IF NOT EXISTS ix_spec_valores_numeric
+  ON inv.spec_valores(attr_id, val_numeric, item_id) WHERE val_numeric IS NOT NULL;
+CREATE INDEX IF NOT EXISTS ix_spec_valores_date
+  ON inv.spec_valores(attr_id, val_date, item_id) WHERE val_date IS NOT NULL;
+CREATE INDEX IF NOT EXISTS ix_spec_valores_bool
+  ON inv.spec_valores(attr_id, val_bool, item_id) WHERE val_bool IS NOT NULL;
+CREATE INDEX IF NOT EXISTS ix_spec_valores_text
+  ON inv.spec_valores(attr_id, lower(val_text) text_pattern_ops, item_id) WHERE val_text IS NOT NULL;
+
+-- facetas: valores de los atributos pedidos para el conjunto de ítems filtrado
+-- (sql/014 lo reemplaza por ux_spec_valores_item_attr, UNIQUE)
+CREATE INDEX IF NOT EXISTS ix_spec_valores_item_attr
+  ON inv.spec_valores(item_id, attr_id) INCLUDE (val_text, val_int, val_numeric, val_bool, val_date);
+
+ANALYZE inv.spec_valores;
+
+COMMIT;
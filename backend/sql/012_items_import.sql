@@ -0,0 +1,36 @@
+-- backend/sql/012_items_import.sql
+-- Soporte de la importación masiva de ítems (app/models/item_import.py):
+-- validar el valor de una spec contra el data_type de su atributo SIN abortar
+-- la transacción, para marcar la fila con error en vez de fallar el lote.
+--
+-- Aplicar con: psql "$DATABASE_URL" -f backend/sql/012_items_import.sql
+
+BEGIN;
+
+CREATE OR REPLACE FUNCTION inv.fn_spec_valor_ok(p_valor text, p_data_type text)
+RETURNS boolean
+LANGUAGE plpgsql
+STABLE   -- el cast a date depende de DateStyle
+AS $$
+BEGIN
+  IF p_valor IS NULL OR p_data_type = 'text' THEN
+    RETURN true;
+  END IF;
+  -- camino rápido sin excepciones para los tipos comunes
+  IF p_data_type = 'int' THEN
+    RETURN p_valor ~ '^\s*[+-]?\d{1,18}\s*$';
+  ELSIF p_data_type = 'numeric' THEN
+    RETURN p_valor ~ '^\s*[+-]?(\d+(\.\d*)?|\.\d+)([eE][+-]?\d+)?\s*$';
+  ELSIF p_data_type = 'bool' THEN
+    RETURN lower(btrim(p_valor)) IN ('t', 'f', 'true', 'false', 'y', 'n', 'yes', 'no', 'on', 'off', '1', '0');
+  ELSIF p_data_type = 'date' THEN
+    PERFORM p_valor::date;
+    RETURN true;
+  END IF;
+  RETURN false;
+EXCEPTION WHEN others THEN
+  RETURN false;
+END;
+$$;
+
+COMMIT;
@@ -0,0 +1,213 @@
+-- backend/sql/013_code_counters.sql
+-- Contadores de códigos sugeridos (ítems y equipos).
+-- Antes: suggest_next_code leía los últimos 200 códigos del (tipo, área) y
+-- get_next_equipo_code hacía MAX(regexp_replace(...)) sobre los equipos del
+-- área; dos usuarios simultáneos recibían el mismo código.
+--
+-- Ahora cada (scope, prefix) tiene su último número en inv.code_counters y
+-- inv.fn_code_reserve(scope, prefix, n) reserva n números consecutivos con un
+-- solo INSERT ... ON CONFLICT DO UPDATE ... RETURNING (el lock de la fila
+-- serializa a los concurrentes). Scopes: 'item:<area_id>' (prefix = nombre
+-- del tipo) y 'equipo:<area_id>' (prefix = p.ej. 'PC-'); prefix en mayúsculas.
+--
+-- Los códigos escritos a mano (o importados) adelantan el contador con
+-- triggers sobre inv.items / inv.equipos (altas por sentencia; cambios de
+-- código/área por fila), así una reserva nunca devuelve un código ya usado en
+-- su scope. El contador solo avanza: un número reservado y no usado queda
+-- como hueco. GET .../next-code solo lee el contador (no reserva).
+--
+-- Aplicar con: psql "$DATABASE_URL" -f backend/sql/013_code_counters.sql
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS inv.code_counters (
+  scope       text        NOT NULL,
+  prefix      text        NOT NULL,
+  last_value  bigint      NOT NULL DEFAULT 0,
+  updated_at  timestamptz NOT NULL DEFAULT now(),
+  PRIMARY KEY (scope, prefix)
+);
+
+-- Sufijo numérico final de un código que empieza con `prefix` (sin distinguir
+-- mayúsculas); NULL si no aplica. 'DISCO07' con 'disco' -> 7.
+CREATE OR REPLACE FUNCTION inv.fn_code_suffix(p_code text, p_prefix text)
+RETURNS bigint
+LANGUAGE sql
+IMMUTABLE
+AS $$
+  SELECT CASE
+           WHEN upper(left(p_code, length(p_prefix))) = upper(p_prefix)
+           THEN substring(substr(p_code, length(p_prefix) + 1) FROM '(\d{1,18})$')::bigint
+         END
+$$;
+
+-- Reserva p_n números; devuelve el primero (los demás son los siguientes).
+CREATE OR REPLACE FUNCTION inv.fn_code_reserve(p_scope text, p_prefix text, p_n integer DEFAULT 1)
+RETURNS bigint
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_last bigint;
+BEGIN
+  IF p_n IS NULL OR p_n < 1 THEN
+    RAISE EXCEPTION 'Cantidad de códigos inválida: %', p_n;
+  END IF;
+
+  INSERT INTO inv.code_counters AS c (scope, prefix, last_value)
+  VALUES (p_scope, upper(p_prefix), p_n)
+  ON CONFLICT (scope, prefix) DO UPDATE
+     SET last_value = c.last_value + EXCLUDED.last_value,
+         updated_at = now()
+  RETURNING c.last_value INTO v_last;
+
+  RETURN v_last - p_n + 1;
+END;
+$$;
+
+-- ============================================================
+-- Adelantar contadores con los códigos escritos
+-- ============================================================
+-- Solo se tocan los contadores que quedan atrás (sin lock en el caso común).
+CREATE OR REPLACE FUNCTION inv.fn_code_counters_items()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  INSERT INTO inv.code_counters AS c (scope, prefix, last_value)
+  SELECT x.scope, x.prefix, x.n
+    FROM (SELECT 'item:' || n.area_id AS scope, upper(it.nombre) AS prefix,
+                 max(inv.fn_code_suffix(n.item_codigo, it.nombre)) AS n
+            FROM nuevos n
+            JOIN inv.item_tipos it ON it.item_tipo_id = n.item_tipo_id
+           WHERE n.area_id IS NOT NULL
+           GROUP BY 1, 2) x
+   WHERE x.n IS NOT NULL
+     AND NOT EXISTS (SELECT 1 FROM inv.code_counters k
+                      WHERE k.scope = x.scope AND k.prefix = x.prefix AND k.last_value >= x.n)
+  ON CONFLICT (scope, prefix) DO UPDATE
+     SET last_value = GREATEST(c.last_value, EXCLUDED.last_value),
+         updated_at = now();
+  RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION inv.fn_code_counters_equipos()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  INSERT INTO inv.code_counters AS c (scope, prefix, last_value)
+  SELECT x.scope, x.prefix, x.n
+    FROM (SELECT 'equipo:' || n.equipo_area_id AS scope,
+                 upper(m[1]) AS prefix, max(m[2]::bigint) AS n
+            FROM nuevos n
+            CROSS JOIN LATERAL regexp_match(n.equipo_codigo, '^(.*?)(\d{1,18})$') AS m
+           WHERE n.equipo_area_id IS NOT NULL
+           GROUP BY 1, 2) x
+   WHERE NOT EXISTS (SELECT 1 FROM inv.code_counters k
+                      WHERE k.scope = x.scope AND k.prefix = x.prefix AND k.last_value >= x.n)
+  ON CONFLICT (scope, prefix) DO UPDATE
+     SET last_value = GREATEST(c.last_value, EXCLUDED.last_value),
+         updated_at = now();
+  RETURN NULL;
+END;
+$$;
+
+-- Cambio de código/área/tipo de UNA fila (raro): mismo ajuste, por fila.
+CREATE OR REPLACE FUNCTION inv.fn_code_advance(p_scope text, p_prefix text, p_n bigint)
+RETURNS void
+LANGUAGE sql
+AS $$
+  INSERT INTO inv.code_counters AS c (scope, prefix, last_value)
+  SELECT p_scope, upper(p_prefix), p_n
+   WHERE p_scope IS NOT NULL AND p_n IS NOT NULL
+     AND NOT EXISTS (SELECT 1 FROM inv.code_counters k
+                      WHERE k.scope = p_scope AND k.prefix = upper(p_prefix) AND k.last_value >= p_n)
+  ON CONFLICT (scope, prefix) DO UPDATE
+     SET last_value = GREATEST(c.last_value, EXCLUDED.last_value),
+         updated_at = now();
+$$;
+
+CREATE OR REPLACE FUNCTION inv.fn_code_counters_item_row()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  PERFORM inv.fn_code_advance('item:' || NEW.area_id, it.nombre,
+                              inv.fn_code_suffix(NEW.item_codigo, it.nombre))
+     FROM inv.item_tipos it
+    WHERE it.item_tipo_id = NEW.item_tipo_id;
+  RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION inv.fn_code_counters_equipo_row()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  m text[] := regexp_match(NEW.equipo_codigo, '^(.*?)(\d{1,18})$');
+BEGIN
+  IF m IS NOT NULL THEN
+    PERFORM inv.fn_code_advance('equipo:' || NEW.equipo_area_id, m[1], m[2]::bigint);
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+-- Altas: por sentencia con transition table (una importación = un solo ajuste).
+-- Cambios: por fila y solo si cambian las columnas del código; así los UPDATE
+-- de estado o de ficha_json no pagan nada.
+DROP TRIGGER IF EXISTS trg_code_counters_items_ins ON inv.items;
+CREATE TRIGGER trg_code_counters_items_ins
+  AFTER INSERT ON inv.items
+  REFERENCING NEW TABLE AS nuevos
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION inv.fn_code_counters_items();
+
+DROP TRIGGER IF EXISTS trg_code_counters_items_upd ON inv.items;
+CREATE TRIGGER trg_code_counters_items_upd
+  AFTER UPDATE OF item_codigo, area_id, item_tipo_id ON inv.items
+  FOR EACH ROW
+  WHEN ((OLD.item_codigo, OLD.area_id, OLD.item_tipo_id)
+        IS DISTINCT FROM (NEW.item_codigo, NEW.area_id, NEW.item_tipo_id))
+  EXECUTE FUNCTION inv.fn_code_counters_item_row();
+
+DROP TRIGGER IF EXISTS trg_code_counters_equipos_ins ON inv.equipos;
+CREATE TRIGGER trg_code_counters_equipos_ins
+  AFTER INSERT ON inv.equipos
+  REFERENCING NEW TABLE AS nuevos
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION inv.fn_code_counters_equipos();
+
+DROP TRIGGER IF EXISTS trg_code_counters_equipos_upd ON inv.equipos;
+CREATE TRIGGER trg_code_counters_equipos_upd
+  AFTER UPDATE OF equipo_codigo, equipo_area_id ON inv.equipos
+  FOR EACH ROW
+  WHEN ((OLD.equipo_codigo, OLD.equipo_area_id)
+        IS DISTINCT FROM (NEW.equipo_codigo, NEW.equipo_area_id))
+  EXECUTE FUNCTION inv.fn_code_counters_equipo_row();
+
+-- ============================================================
+-- Carga inicial desde los códigos existentes
+-- ============================================================
+INSERT INTO inv.code_counters AS c (scope, prefix, last_value)
+SELECT 'item:' || i.area_id, upper(it.nombre), max(inv.fn_code_suffix(i.item_codigo, it.nombre))
+  FROM inv.items i
+  JOIN inv.item_tipos it ON it.item_tipo_id = i.item_tipo_id
+ WHERE i.area_id IS NOT NULL
+ GROUP BY 1, 2
+HAVING max(inv.fn_code_suffix(i.item_codigo, it.nombre)) IS NOT NULL
+ON CONFLICT (scope, prefix) DO UPDATE
+   SET last_value = GREATEST(c.last_value, EXCLUDED.last_value);
+
+INSERT INTO inv.code_counters AS c (scope, prefix, last_value)
+SELECT 'equipo:' || e.equipo_area_id, upper(m[1]), max(m[2]::bigint)
+  FROM inv.equipos e
+  CROSS JOIN LATERAL regexp_match(e.equipo_codigo, '^(.*?)(\d{1,18})$') AS m
+ WHERE e.equipo_area_id IS NOT NULL
+ GROUP BY 1, 2
+ON CONFLICT (scope, prefix) DO UPDATE
+   SET last_value = GREATEST(c.last_value, EXCLUDED.last_value);
+
+COMMIT;
@@ -0,0 +1,37 @@
+-- backend/sql/014_spec_valores_unique.sql
+-- Un valor por (item_id, attr_id) en inv.spec_valores.
+-- El guardado en lote de specs (item_model._SPECS_UPSERT_SQL) hace
+-- INSERT ... ON CONFLICT (item_id, attr_id), que exige un índice único con
+-- exactamente esas columnas; el esquema base no lo garantizaba.
+--
+-- El índice de facetas de sql/011 (ix_spec_valores_item_attr, mismas columnas
+-- + INCLUDE de los valores) se reemplaza por su versión UNIQUE: sigue sirviendo
+-- a las facetas (index-only) y al ON CONFLICT, sin un índice más.
+--
+-- Si hubiera filas repetidas se conserva una sola (la de mayor ctid: no hay
+-- columna que diga cuál es la última) y se recalcula la ficha_json de esos ítems.
+--
+-- Aplicar con: psql "$DATABASE_URL" -f backend/sql/014_spec_valores_unique.sql
+
+BEGIN;
+
+WITH dup AS (
+  DELETE FROM inv.spec_valores v
+   USING inv.spec_valores w
+   WHERE w.item_id = v.item_id
+     AND w.attr_id = v.attr_id
+     AND w.ctid > v.ctid
+  RETURNING v.item_id
+)
+SELECT inv.fn_items_refresh_json(array_agg(DISTINCT item_id), true, false)
+  FROM dup
+HAVING count(*) > 0;
+
+CREATE UNIQUE INDEX IF NOT EXISTS ux_spec_valores_item_attr
+  ON inv.spec_valores(item_id, attr_id) INCLUDE (val_text, val_int, val_numeric, val_bool, val_date);
+
+DROP INDEX IF EXISTS inv.ix_spec_valores_item_attr;
+
+ANALYZE inv.spec_valores;
+
+COMMIT;
@@ -0,0 +1,50 @@
+from app.utils.cache import TTLCache
+
+
+def test_get_or_load_caches_value():
+    cache = TTLCache(ttl=60)
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return "v"
+
+    assert cache.get_or_load("k", loader) == "v"
+    assert cache.get_or_load("k", loader) == "v"
+    assert len(calls) == 1
+
+
+def test_invalidate_during_load_discards_stale_value():
+    cache = TTLCache(ttl=60)
+
+    def stale_loader():
+        # otra escritura confirma e invalida mientras esta carga está en curso
+        cache.invalidate()
+        return "viejo"
+
+    assert cache.get_or_load("k", stale_loader) == "viejo"
+    assert cache.get("k") is None
+    assert cache.get_or_load("k", lambda: "nuevo") == "nuevo"
+    assert cache.get("k") == "nuevo"
+
+
+def test_invalidate_other_key_keeps_load():
+    cache = TTLCache(ttl=60)
+
+    def loader():
+        cache.invalidate("otra")
+        return "a"
+
+    assert cache.get_or_load("k", loader) == "a"
+    assert cache.get("k") == "a"
+
+
+def test_invalidate_same_key_discards_in_flight_load():
+    cache = TTLCache(ttl=60)
+
+    def loader():
+        cache.invalidate("k")
+        return "a"
+
+    cache.get_or_load("k", loader)
+    assert cache.get("k") is None
@@ -0,0 +1,69 @@
+# backend/tests/test_mailer.py
+"""send_batch contra un sink SMTP local (aiosmtpd)."""
+import socket
+
+import pytest
+
+pytest.importorskip("aiosmtpd")
+from aiosmtpd.controller import Controller
+
+from app.utils import mailer
+
+REFUSED = "rechazado@example.com"
+
+
+class _Sink:
+    """Guarda los mensajes recibidos y rechaza RCPT TO de REFUSED."""
+
+    def __init__(self):
+        self.received = []
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address == REFUSED:
+            return "550 5.1.1 buzón inexistente"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received.append((list(envelope.rcpt_tos), envelope.content))
+        return "250 OK"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def sink(monkeypatch):
+    handler = _Sink()
+    ctl = Controller(handler, hostname="127.0.0.1", port=_free_port())
+    ctl.start()
+    monkeypatch.setattr(mailer, "MAIL_HOST", "127.0.0.1")
+    monkeypatch.setattr(mailer, "MAIL_PORT", ctl.port)
+    monkeypatch.setattr(mailer, "MAIL_USE_SSL", False)
+    monkeypatch.setattr(mailer, "MAIL_USE_TLS", False)
+    monkeypatch.setattr(mailer, "MAIL_USER", None)
+    monkeypatch.setattr(mailer, "MAIL_FROM", "noreply@example.com")
+    monkeypatch.setattr(mailer, "_pool", mailer.SmtpPool(size=1))
+    yield handler
+    mailer._pool.close_all()
+    ctl.stop()
+
+
+def _msg(to):
+    return {"subject": f"prueba {to}", "body": "hola", "to": to}
+
+
+def test_send_batch_sigue_tras_destinatario_rechazado(sink):
+    batch = [_msg("a@example.com"), _msg(REFUSED), _msg("b@example.com")]
+
+    assert mailer.send_batch(batch) == [True, False, True]
+    assert [r for r, _ in sink.received] == [["a@example.com"], ["b@example.com"]]
+
+
+def test_send_batch_reutiliza_la_sesion_en_lotes_siguientes(sink):
+    assert mailer.send_batch([_msg(REFUSED)]) == [False]
+    assert mailer.send_batch([_msg("c@example.com")]) == [True]
+    assert [r for r, _ in sink.received] == [["c@example.com"]]
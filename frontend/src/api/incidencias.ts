@@ -11,6 +11,9 @@ export type Incidencia = {
   area_id?: number | null;
   area_nombre?: string | null;
   created_at?: string;
+  /** Solo con búsqueda `q`: relevancia y fragmento con coincidencias entre <mark></mark> */
+  rank?: number;
+  snippet?: string | null;
 };
 
 /* =========================
@@ -23,6 +26,7 @@ export async function listarIncidencias(params: {
   page?: number;
   size?: number;
   mine?: boolean; // cuando es true, trae solo del usuario autenticado
+  orden?: "relevancia" | "reciente"; // con q: relevancia por defecto
 }) {
   const { data } = await http.get("/api/incidencias", { params });
   return data as { items: Incidencia[]; total: number; page: number; size: number };
@@ -85,7 +89,7 @@ export async function cambiarEstado(inc_id: number, estado: Incidencia["estado"]
 }
 
 /* =========================
- * NOTIFICACIONES (polling)
+ * NOTIFICACIONES (long-poll)
  * ========================= */
 export type UpdateItem = {
   msg_id: number;
@@ -99,8 +103,9 @@ export type UpdateItem = {
   type: "MSG" | "NEW_INC" | "ASSIGNED"; // <- usado por IncidenciaNotifier
 };
 
-export async function fetchUpdates(since_id?: number) {
-  const { data } = await http.get("/api/incidencias/updates", { params: { since_id } });
+/** `wait` (segundos): el backend retiene la petición hasta que haya novedades o venza. */
+export async function fetchUpdates(since_id?: number, wait?: number) {
+  const { data } = await http.get("/api/incidencias/updates", { params: { since_id, wait } });
   return data as {
     items: UpdateItem[];
     last_id: number;
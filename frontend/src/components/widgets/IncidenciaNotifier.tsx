@@ -4,7 +4,8 @@ import { getUser } from "@/services/authService";
 
 const HEARTBEAT_MS = 4000;
 const LOCK_TTL_MS  = 7000;
-const BASE_POLL_MS = 1500;
+const BASE_POLL_MS = 1500;   // pausa entre reintentos (pestaña oculta / error)
+const LONG_POLL_S  = 25;     // espera máxima por petición en el backend
 
 type BroadcastMsg =
   | { type: "prime"; last_id: number }
@@ -164,7 +165,7 @@ export default function IncidenciaNotifier({
     if (busyRef.current) return;
     busyRef.current = true;
     try {
-      const r = await fetchUpdates(lastIdRef.current || 0);
+      const r = await fetchUpdates(lastIdRef.current || 0, LONG_POLL_S);
       if ((r.items?.length ?? 0) > 0 || (typeof r.last_id === "number" && r.last_id > lastIdRef.current)) {
         bcRef.current?.postMessage({ type: "updates", items: r.items || [], last_id: r.last_id || lastIdRef.current } as BroadcastMsg);
         handleIncoming(r.items || [], r.last_id || lastIdRef.current);
@@ -218,14 +219,31 @@ export default function IncidenciaNotifier({
       }
     }, HEARTBEAT_MS);
 
-    prime().catch(() => {});
-    const base = setInterval(() => {
-      if (document.visibilityState === "hidden") return;
-      tick().catch(() => {});
-    }, pollMs);
+    // Bucle de long-poll: solo el líder consulta; cada petición queda abierta
+    // en el backend hasta que haya novedades, así que no hace falta intervalo.
+    let alive = true;
+    const sleep = (ms: number) => new Promise((res) => setTimeout(res, ms));
+    const loop = async () => {
+      await prime().catch(() => {});
+      while (alive) {
+        if (!isLeaderRef.current || document.visibilityState === "hidden") {
+          await sleep(pollMs);
+          continue;
+        }
+        try {
+          const t0 = Date.now();
+          await tick();
+          // respuesta inmediata (hubo novedades o backend sin long-poll): no martillar
+          if (Date.now() - t0 < 250) await sleep(pollMs);
+        } catch {
+          await sleep(pollMs * 2);
+        }
+      }
+    };
+    loop();
 
     return () => {
-      clearInterval(base);
+      alive = false;
       clearInterval(hb);
       release();
       bc.removeEventListener("message", onMsg as any);
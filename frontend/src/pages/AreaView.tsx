@@ -261,7 +261,8 @@ export default function AreaView() {
   };
 
   const loadPagedItems = async (clase: Clase, page = 1, size = 10, filtro?: { tipo?: string; desde?: string; hasta?: string }) => {
-    const params: any = { clase, page, size };
+    // la grilla no muestra la ficha: listado liviano (sin ficha/fotos)
+    const params: any = { clase, page, size, fields: "" };
     if (filtro?.tipo) params.tipo = filtro.tipo;
     if (filtro?.desde) params.desde = filtro.desde;
     if (filtro?.hasta) params.hasta = filtro.hasta;
@@ -36,7 +36,14 @@ type MovRow = {
   mov_detalle: any; // json
   es_audit?: boolean;
 };
-type MovPage = { items: MovRow[]; total: number; page: number; size: number };
+type MovPage = {
+  items: MovRow[];
+  total: number;
+  page: number;
+  size: number;
+  has_more?: boolean;
+  count?: "exact" | "estimate" | "none";
+};
 type Fuente = "mov" | "audit" | "both";
 
 /* =========================
@@ -203,7 +210,8 @@ export default function AuditoriasPage() {
     setLoading(true);
     setErr(null);
     try {
-      const params: any = { page: p, size: s, fuente };
+      // total estimado: la grilla no paga un COUNT exacto en cada clic
+      const params: any = { page: p, size: s, fuente, count: "estimate" };
       if (fuente === "mov" && tipoMov) params.tipo = tipoMov;
       if (desde) params.desde = desde;
       if (hasta) params.hasta = hasta;
@@ -215,6 +223,8 @@ export default function AuditoriasPage() {
         total: Number(r.data.total || 0),
         page: Number(r.data.page || p),
         size: Number(r.data.size || s),
+        has_more: Boolean(r.data.has_more),
+        count: r.data.count,
       });
     } catch (e: any) {
       setErr(e?.response?.data?.error || "No se pudo cargar la auditoría");
@@ -642,6 +652,8 @@ export default function AuditoriasPage() {
           {/* Paginación */}
           <TablePager
             total={page.total}
+            approx={page.count === "estimate" && !!page.has_more}
+            hasMore={page.has_more}
             page={page.page}
             size={page.size}
             totalPages={totalPages}
@@ -706,6 +718,8 @@ export default function AuditoriasPage() {
 ========================= */
 function TablePager({
   total,
+  approx = false,
+  hasMore,
   page,
   size,
   totalPages,
@@ -713,6 +727,8 @@ function TablePager({
   onSize,
 }: {
   total: number;
+  approx?: boolean;
+  hasMore?: boolean;
   page: number;
   size: number;
   totalPages: number;
@@ -721,15 +737,23 @@ function TablePager({
 }) {
   return (
     <div className="flex flex-wrap gap-3 items-center justify-between p-3 border-t border-slate-200 bg-white">
-      <div className="text-sm text-slate-600">Total: {total.toLocaleString()}</div>
+      <div className="text-sm text-slate-600">
+        Total: {approx ? "≈ " : ""}
+        {total.toLocaleString()}
+      </div>
       <div className="flex items-center gap-2">
         <Button variant="secondary" disabled={page <= 1} onClick={() => onPage(page - 1)}>
           <Icon name="chevL" />
         </Button>
         <span className="text-sm">
-          Página {page} / {totalPages}
+          Página {page} / {approx ? "≈ " : ""}
+          {totalPages}
         </span>
-        <Button variant="secondary" disabled={page >= totalPages} onClick={() => onPage(page + 1)}>
+        <Button
+          variant="secondary"
+          disabled={hasMore === undefined ? page >= totalPages : !hasMore}
+          onClick={() => onPage(page + 1)}
+        >
           <Icon name="chevR" />
         </Button>
         <select
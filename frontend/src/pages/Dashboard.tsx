@@ -11,6 +11,9 @@ type Counts = {
   perifericos: number;
   en_almacen: number;
   en_uso: number;
+  // desgloses (misma consulta en el backend)
+  por_estado?: Record<string, number>;
+  por_area?: { area_id: number; nombre: string; items: number; equipos: number }[];
 };
 
 const BG_APP = "bg-[#FFFCF3]";
@@ -37,6 +37,24 @@ function BadgeEstado({ value }: { value?: string }) {
   return <span className={`text-[11px] px-2 py-0.5 rounded-full ${cls}`}>{v || "—"}</span>;
 }
 
+/** Pinta el snippet de la búsqueda: el backend marca coincidencias con <mark></mark>.
+ *  Se arma con nodos de texto (nunca como HTML). */
+function Snippet({ text }: { text?: string | null }) {
+  if (!text) return null;
+  const parts = text.split(/<\/?mark>/);
+  return (
+    <div className="text-xs text-slate-500 line-clamp-2">
+      {parts.map((p, i) =>
+        i % 2 === 1 ? (
+          <mark key={i} className="bg-[#E6FEFF] text-slate-900 rounded px-0.5">{p}</mark>
+        ) : (
+          <span key={i}>{p}</span>
+        )
+      )}
+    </div>
+  );
+}
+
 type Pract = { id: number; username: string };
 
 export default function IncidenciasAdmin() {
@@ -215,6 +233,7 @@ export default function IncidenciasAdmin() {
                   <div className="text-sm text-slate-600 truncate">
                     <span className="font-mono">#{r.inc_id}</span> · {r.area_nombre || "—"} · {r.equipo_codigo || "sinequipo"}
                   </div>
+                  <Snippet text={r.snippet} />
                 </div>
                 <div className="flex items-center gap-2">
                   <button className={btnPrimary} onClick={() => openDetail(r.inc_id)}>
@@ -194,6 +194,7 @@ export default function ItemDetailPage() {
     setOk(null);
 
     try {
+      const specs: { attr: string; data_type: string; value: any }[] = [];
       for (const a of schema) {
         if (!dirty[a.nombre]) continue;
         const raw = editValues[a.nombre];
@@ -203,14 +204,10 @@ export default function ItemDetailPage() {
           setSavingAll(false);
           return;
         }
-        await http.post(`/api/items/${itemId}/specs`, {
-          attr: a.nombre,
-          data_type: a.data_type,
-          value: val,
-          clase: data.clase,
-          tipo_nombre: data.tipo,
-        });
+        specs.push({ attr: a.nombre, data_type: a.data_type, value: val });
       }
+      // todos los cambios en una sola llamada / transacción
+      if (specs.length) await http.post(`/api/items/${itemId}/specs:batch`, { specs });
 
       await load();
       setOk("Cambios guardados");